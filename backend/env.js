@@ -0,0 +1,10 @@
+import dotenv from 'dotenv';
+import path from 'path';
+import { fileURLToPath } from 'url';
+
+// Load environment variables before any other module is evaluated.
+// ES module imports are hoisted, so server.js imports this file first;
+// services that read tunables at module load then see values from .env.
+// dotenv won't override existing env vars (like those set by Render)
+const __dirname = path.dirname(fileURLToPath(import.meta.url));
+dotenv.config({ path: path.join(__dirname, '.env') });
@@ -0,0 +1,53 @@
+import mongoose from 'mongoose';
+
+// Per-day order totals, maintained incrementally by services/rollups.js as
+// orders are created and change status. `day` is the UTC date of the order's
+// created_at, like the /api/orders date filters. The nested maps are keyed
+// by status, hour ("00".."23"), product id and pincode, and have no defaults
+// so upserts that $inc into them don't conflict with $setOnInsert.
+const dailyRollupSchema = new mongoose.Schema({
+  day: {
+    type: String,
+    required: true,
+    unique: true
+  },
+  orders: {
+    type: Number,
+    default: 0
+  },
+  revenue: {
+    type: Number,
+    default: 0
+  },
+  // { <status>: { orders, revenue } } by each order's current status
+  statuses: {
+    type: mongoose.Schema.Types.Mixed
+  },
+  // { <hour>: { orders, revenue } }
+  hours: {
+    type: mongoose.Schema.Types.Mixed
+  },
+  // { <product_id>: { name, quantity, revenue } }
+  products: {
+    type: mongoose.Schema.Types.Mixed
+  },
+  // { <pincode>: { orders, revenue } }
+  pincodes: {
+    type: mongoose.Schema.Types.Mixed
+  }
+}, {
+  timestamps: false,
+  versionKey: false,
+  minimize: false,
+  collection: 'daily_rollups'
+});
+
+// Transform output to exclude _id
+dailyRollupSchema.set('toJSON', {
+  transform: (doc, ret) => {
+    delete ret._id;
+    return ret;
+  }
+});
+
+export default mongoose.model('DailyRollup', dailyRollupSchema);
@@ -0,0 +1,89 @@
+import mongoose from 'mongoose';
+import { v4 as uuidv4 } from 'uuid';
+
+// Outbox entry for an order side effect (WhatsApp message, admin email).
+// Entries are written when the order is saved and drained by the background
+// worker in services/outbox.js, so nothing is lost across restarts.
+const notificationSchema = new mongoose.Schema({
+  id: {
+    type: String,
+    default: () => uuidv4(),
+    unique: true,
+    index: true
+  },
+  order_id: {
+    type: String,
+    required: true,
+    index: true
+  },
+  channel: {
+    type: String,
+    required: true,
+    enum: ['whatsapp', 'email']
+  },
+  payload: {
+    type: mongoose.Schema.Types.Mixed,
+    required: true
+  },
+  status: {
+    type: String,
+    default: 'pending',
+    enum: ['pending', 'processing', 'sent', 'skipped', 'dead']
+  },
+  attempts: {
+    type: Number,
+    default: 0
+  },
+  next_attempt_at: {
+    type: Date,
+    default: () => new Date()
+  },
+  locked_until: {
+    type: Date,
+    default: null
+  },
+  // Email entries coalesced into one digest share a key (see planEmailDigest)
+  digest_key: {
+    type: String,
+    default: null
+  },
+  // Id of the entry whose worker claimed this one as part of its digest
+  locked_by: {
+    type: String,
+    default: null
+  },
+  last_error: {
+    type: String,
+    default: null
+  },
+  sent_at: {
+    type: Date,
+    default: null
+  },
+  created_at: {
+    type: String,
+    default: () => new Date().toISOString()
+  }
+}, {
+  timestamps: false,
+  versionKey: false
+});
+
+// One entry per order and channel, so enqueueing can be retried safely
+notificationSchema.index({ order_id: 1, channel: 1 }, { unique: true });
+// Worker claim queries: due pending entries and expired processing locks
+notificationSchema.index({ status: 1, next_attempt_at: 1 });
+notificationSchema.index({ status: 1, locked_until: 1 });
+notificationSchema.index({ digest_key: 1, status: 1 });
+// Delivered entries are only kept for a week
+notificationSchema.index({ sent_at: 1 }, { expireAfterSeconds: 7 * 24 * 60 * 60 });
+
+// Transform output to exclude _id
+notificationSchema.set('toJSON', {
+  transform: (doc, ret) => {
+    delete ret._id;
+    return ret;
+  }
+});
+
+export default mongoose.model('Notification', notificationSchema);
@@ -9,6 +9,12 @@ const orderItemSchema = new mongoose.Schema({
   unit: { type: String, default: '500g' }
 }, { _id: false });
 
+// GeoJSON point ([longitude, latitude]) mirroring latitude/longitude
+const pointSchema = new mongoose.Schema({
+  type: { type: String, enum: ['Point'], required: true },
+  coordinates: { type: [Number], required: true }
+}, { _id: false });
+
 const orderSchema = new mongoose.Schema({
   id: {
     type: String,
@@ -40,6 +46,11 @@ const orderSchema = new mongoose.Schema({
     type: Number,
     default: null
   },
+  // Only set when the customer shared coordinates (see services/delivery.js)
+  location: {
+    type: pointSchema,
+    default: undefined
+  },
   items: [orderItemSchema],
   total: {
     type: Number,
@@ -57,16 +68,38 @@ const orderSchema = new mongoose.Schema({
   created_at: {
     type: String,
     default: () => new Date().toISOString()
+  },
+  // True until the order's outbox entries are written (see services/outbox.js)
+  notifications_pending: {
+    type: Boolean,
+    default: false,
+    select: false
+  },
+  // Bumped on every status change; admin sockets catch up from it after a reconnect
+  updated_at: {
+    type: String,
+    default: () => new Date().toISOString()
   }
 }, {
   timestamps: false,
   versionKey: false
 });
 
+// Newest-first listing, optionally by status; id breaks created_at ties
+// so keyset pagination cursors are unambiguous
+orderSchema.index({ created_at: -1, id: -1 });
+orderSchema.index({ status: 1, created_at: -1, id: -1 });
+orderSchema.index({ updated_at: 1 });
+// Outbox sweep for orders whose notifications were never queued
+orderSchema.index({ created_at: 1 }, { partialFilterExpression: { notifications_pending: true } });
+// Proximity queries for delivery batching; orders without a location aren't indexed
+orderSchema.index({ location: '2dsphere' });
+
 // Transform output to exclude _id
 orderSchema.set('toJSON', {
   transform: (doc, ret) => {
     delete ret._id;
+    delete ret.notifications_pending;
     return ret;
   }
 });
@@ -24,6 +24,11 @@ const productSchema = new mongoose.Schema({
     type: String,
     default: ''
   },
+  // Responsive variant URLs for uploaded images (see services/images.js)
+  image_variants: {
+    type: mongoose.Schema.Types.Mixed,
+    default: null
+  },
   in_stock: {
     type: Boolean,
     default: true
@@ -45,6 +50,15 @@ const productSchema = new mongoose.Schema({
   versionKey: false
 });
 
+// Storefront filters: category and/or in-stock, price range or price sort
+productSchema.index({ category: 1, in_stock: 1, price: 1 });
+productSchema.index({ in_stock: 1, price: 1 });
+// Word search fallback for services/productSearch.js (stemmed, name weighted)
+productSchema.index(
+  { name: 'text', description: 'text' },
+  { name: 'product_text', weights: { name: 10, description: 2 } }
+);
+
 // Transform output to exclude _id
 productSchema.set('toJSON', {
   transform: (doc, ret) => {
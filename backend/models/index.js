@@ -2,5 +2,7 @@ import Category from './Category.js';
 import Product from './Product.js';
 import Order from './Order.js';
 import Pincode from './Pincode.js';
+import Notification from './Notification.js';
+import DailyRollup from './DailyRollup.js';
 
-export { Category, Product, Order, Pincode };
+export { Category, Product, Order, Pincode, Notification, DailyRollup };
@@ -0,0 +1,251 @@
+"""
+Stream the order journal to inspect, audit or rebuild the orders collection.
+
+The backend appends JSON lines to logs/orders*.jsonl (see
+services/orderJournal.js); older deployments wrote free-text banners to
+logs/orders.txt. Every file is read line by line, so memory use does not
+grow with file size: only a small id -> latest-status map is kept while
+replaying.
+
+Usage:
+    python order_journal.py dump [--legacy]          # events as NDJSON on stdout
+    python order_journal.py audit                    # compare with MongoDB
+    python order_journal.py rebuild [--legacy]       # upsert missing orders into MongoDB
+
+audit and rebuild need pymongo and read MONGO_URL / DB_NAME (default:
+mongodb://localhost:27017 / test_database), like server.js.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+BACKEND_DIR = Path(__file__).parent.absolute()
+LOGS_DIR = BACKEND_DIR / "logs"
+LEGACY_FILE = "orders.txt"
+BATCH_SIZE = 1000
+
+LEGACY_BANNER = "=" * 80
+LEGACY_ITEM = re.compile(r"(.+?) x (\d+)(?:, |$)")
+# Rotated files are <basename>-<UTC stamp>[-n].jsonl, e.g. orders-20250101T120000000Z
+ROTATED_STAMP = re.compile(r"-(\d{8}T\d{9}Z)(?:-(\d+))?$")
+
+
+def journal_files(logs_dir: Path) -> List[Path]:
+    """Journal files oldest first, by when each was last written: a rotated
+    file by the stamp in its name, a live one (orders.jsonl,
+    orders-w<slot>-<pid>.jsonl) by its modification time"""
+    def order_key(path: Path) -> Tuple[str, int]:
+        rotated = ROTATED_STAMP.search(path.stem)
+        if rotated:
+            return (rotated.group(1), int(rotated.group(2) or 0))
+        mtime = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc)
+        return (mtime.strftime("%Y%m%dT%H%M%S") + f"{mtime.microsecond // 1000:03d}Z", sys.maxsize)
+
+    return sorted(logs_dir.glob("orders*.jsonl"), key=order_key)
+
+
+def read_journal(path: Path) -> Iterator[Dict]:
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                print(f"warning: {path.name}:{line_no}: unparseable line skipped", file=sys.stderr)
+
+
+def parse_legacy_block(lines: List[str]) -> Dict:
+    fields = {}
+    for line in lines:
+        key, sep, value = line.partition(": ")
+        if sep:
+            fields[key] = value.strip()
+
+    address, _, pincode = fields.get("Address", "").rpartition(", Pincode: ")
+    items = [
+        {"name": name, "quantity": int(quantity)}
+        for name, quantity in LEGACY_ITEM.findall(fields.get("Items", ""))
+    ]
+    total = fields.get("Total", "").lstrip("₹") or "0"
+    return {
+        "id": fields.get("Order ID"),
+        "created_at": fields.get("Date"),
+        "customer_name": fields.get("Customer"),
+        "phone": fields.get("Phone"),
+        "address": address,
+        "pincode": pincode,
+        "items": items,
+        "total": float(total),
+        "payment_mode": fields.get("Payment"),
+        "status": fields.get("Status", "pending"),
+    }
+
+
+def read_legacy(path: Path) -> Iterator[Dict]:
+    """Parse the old banner-delimited orders.txt into order.created events"""
+    block: List[str] = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line == LEGACY_BANNER:
+                if block:
+                    order = parse_legacy_block(block)
+                    if order["id"]:
+                        yield {"v": 0, "type": "order.created", "at": order["created_at"],
+                               "source": "legacy", "order": order}
+                    block = []
+            elif line.strip():
+                block.append(line)
+
+
+def events(logs_dir: Path, legacy: bool) -> Iterator[Dict]:
+    if legacy and (logs_dir / LEGACY_FILE).exists():
+        yield from read_legacy(logs_dir / LEGACY_FILE)
+    for path in journal_files(logs_dir):
+        yield from read_journal(path)
+
+
+def replay(logs_dir: Path, legacy: bool) -> Tuple[Iterator[Dict], Dict[str, Tuple[str, str]]]:
+    """Yield created orders while collecting each order's latest status change.
+    The status map is complete once the iterator is exhausted."""
+    statuses: Dict[str, Tuple[str, str]] = {}
+
+    def created() -> Iterator[Dict]:
+        for event in events(logs_dir, legacy):
+            if event.get("type") == "order.created":
+                yield event["order"]
+            elif event.get("type") == "order.status":
+                at, order_id = event.get("at", ""), event["order_id"]
+                # Workers write separate files, so order by timestamp, not position
+                if order_id not in statuses or statuses[order_id][0] <= at:
+                    statuses[order_id] = (at, event["status"])
+
+    return created(), statuses
+
+
+def connect():
+    try:
+        from pymongo import MongoClient
+    except ImportError:
+        sys.exit("pymongo is required for this command: pip install pymongo")
+    mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+    db_name = os.environ.get("DB_NAME", "test_database")
+    return MongoClient(mongo_url)[db_name]["orders"]
+
+
+def cmd_dump(args):
+    out = sys.stdout
+    for event in events(args.logs_dir, args.legacy):
+        out.write(json.dumps(event, ensure_ascii=False))
+        out.write("\n")
+
+
+def cmd_audit(args):
+    orders = connect()
+    created, statuses = replay(args.logs_dir, args.legacy)
+    journal_ids = set()
+    missing, mismatched = [], []
+    batch: List[Dict] = []
+
+    def check(batch):
+        found = {
+            doc["id"]: doc
+            for doc in orders.find({"id": {"$in": [o["id"] for o in batch]}},
+                                   {"_id": 0, "id": 1, "total": 1})
+        }
+        for order in batch:
+            doc = found.get(order["id"])
+            if doc is None:
+                missing.append(order["id"])
+            elif doc.get("total") != order.get("total"):
+                mismatched.append((order["id"], "total", order.get("total"), doc.get("total")))
+
+    for order in created:
+        journal_ids.add(order["id"])
+        batch.append(order)
+        if len(batch) >= BATCH_SIZE:
+            check(batch)
+            batch = []
+    if batch:
+        check(batch)
+
+    # Final statuses are only known after the full replay
+    ids = list(statuses)
+    for start in range(0, len(ids), BATCH_SIZE):
+        chunk = ids[start:start + BATCH_SIZE]
+        for doc in orders.find({"id": {"$in": chunk}}, {"_id": 0, "id": 1, "status": 1}):
+            expected = statuses[doc["id"]][1]
+            if doc.get("status") != expected:
+                mismatched.append((doc["id"], "status", expected, doc.get("status")))
+
+    untracked = sum(1 for doc in orders.find({}, {"_id": 0, "id": 1}) if doc["id"] not in journal_ids)
+
+    print(f"journal orders: {len(journal_ids)}")
+    print(f"missing from database: {len(missing)}")
+    for order_id in missing[:20]:
+        print(f"  {order_id}")
+    print(f"field mismatches: {len(mismatched)}")
+    for order_id, field, journal_value, db_value in mismatched[:20]:
+        print(f"  {order_id} {field}: journal={journal_value!r} db={db_value!r}")
+    print(f"database orders not in journal: {untracked}")
+    return 1 if missing or mismatched else 0
+
+
+def cmd_rebuild(args):
+    orders = connect()
+    from pymongo import UpdateOne
+
+    created, statuses = replay(args.logs_dir, args.legacy)
+    inserted = 0
+    batch = []
+
+    def flush(batch):
+        if not batch:
+            return 0
+        return orders.bulk_write(batch, ordered=False).upserted_count
+
+    for order in created:
+        # Never overwrite an existing order; only fill in missing ones
+        batch.append(UpdateOne({"id": order["id"]}, {"$setOnInsert": order}, upsert=True))
+        if len(batch) >= BATCH_SIZE:
+            inserted += flush(batch)
+            batch = []
+    inserted += flush(batch)
+
+    updates = [UpdateOne({"id": order_id}, {"$set": {"status": status}})
+               for order_id, (_, status) in statuses.items()]
+    modified = 0
+    for start in range(0, len(updates), BATCH_SIZE):
+        modified += orders.bulk_write(updates[start:start + BATCH_SIZE], ordered=False).modified_count
+
+    print(f"inserted {inserted} missing orders, updated status on {modified}")
+    return 0
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--logs-dir", type=Path, default=LOGS_DIR, help=f"journal directory (default: {LOGS_DIR})")
+    common.add_argument("--legacy", action="store_true",
+                        help=f"also read the legacy {LEGACY_FILE} (items there have no prices or product ids)")
+
+    parser = argparse.ArgumentParser(description="Order journal reader")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("dump", parents=[common], help="stream events as NDJSON")
+    sub.add_parser("audit", parents=[common], help="compare the journal with the orders collection")
+    sub.add_parser("rebuild", parents=[common], help="insert orders missing from the collection and replay statuses")
+    args = parser.parse_args(argv)
+
+    commands = {"dump": cmd_dump, "audit": cmd_audit, "rebuild": cmd_rebuild}
+    return commands[args.command](args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import express from 'express';
+import { issueAdminToken } from '../services/adminAuth.js';
 
 const router = express.Router();
 
@@ -19,23 +20,19 @@ router.post('/verify', async (req, res) => {
     const { pin } = req.body;
     const adminPin = process.env.ADMIN_PIN || '4242';
     
-    // Debug logging - can be removed in production
-    console.log('Admin PIN verification attempt:');
-    console.log('  - Received PIN:', pin, '(type:', typeof pin, ')');
-    console.log('  - Expected PIN from env:', adminPin, '(type:', typeof adminPin, ')');
-    console.log('  - ADMIN_PIN env var exists:', !!process.env.ADMIN_PIN);
-    
     // Convert both to strings and trim whitespace for comparison
     const receivedPin = String(pin).trim();
     const expectedPin = String(adminPin).trim();
     
     if (receivedPin === expectedPin) {
-      console.log('  - PIN verification: SUCCESS');
-      return res.json({ success: true, message: 'PIN verified' });
+      // The token admits the dashboard's socket to the admin room; if tokens
+      // are disabled (see services/adminAuth.js) the PIN still unlocks the
+      // dashboard, minus live updates
+      return res.json({ success: true, message: 'PIN verified', ...(issueAdminToken() || {}) });
     }
     
-    console.log('  - PIN verification: FAILED');
-    console.log('  - Comparison:', `"${receivedPin}" vs "${expectedPin}"`);
+    // Never log the PIN values themselves
+    console.warn(`Admin PIN verification failed from ${req.ip}`);
     res.status(401).json({ detail: 'Invalid PIN' });
   } catch (error) {
     console.error('Error verifying admin:', error);
@@ -1,17 +1,25 @@
 import express from 'express';
 import { Category } from '../models/index.js';
+import { getCatalogEntry, sendCatalogEntry, invalidateCatalog } from '../services/catalogCache.js';
+import { buildProjection, normalizeFields } from '../services/projection.js';
 
 const router = express.Router();
 
-// Get all categories
+const loadCategories = (fields) => {
+  const selected = normalizeFields(Category, fields);
+  return getCatalogEntry(`categories:${selected || 'all'}`, () => (
+    Category.find({}, buildProjection(Category, selected)).lean()
+  ));
+};
+
+// Fill the cache before the server takes traffic
+export const warmCategoryCache = () => loadCategories();
+
+// Get all categories (?fields=id,name selects fields)
 router.get('/', async (req, res) => {
   try {
-    const categories = await Category.find({}).lean();
-    const result = categories.map(cat => {
-      const { _id, ...rest } = cat;
-      return rest;
-    });
-    res.json(result);
+    const entry = await loadCategories(req.query.fields);
+    sendCatalogEntry(req, res, entry);
   } catch (error) {
     console.error('Error fetching categories:', error);
     res.status(500).json({ detail: 'Internal server error' });
@@ -29,6 +37,7 @@ router.post('/', async (req, res) => {
     
     const category = new Category({ name, image });
     await category.save();
+    invalidateCatalog('categories');
     
     res.status(201).json(category.toJSON());
   } catch (error) {
@@ -46,6 +55,7 @@ router.delete('/:categoryId', async (req, res) => {
     if (result.deletedCount === 0) {
       return res.status(404).json({ detail: 'Category not found' });
     }
+    invalidateCatalog('categories');
     
     res.json({ success: true });
   } catch (error) {
@@ -0,0 +1,55 @@
+import express from 'express';
+import { ordersChangedWithin, summarizeRollups, rebuildRollups } from '../services/rollups.js';
+
+const router = express.Router();
+
+const DAY_PATTERN = /^\d{4}-\d{2}-\d{2}$/;
+const REBUILD_QUIET_MS = Number(process.env.ROLLUP_REBUILD_QUIET_MS) || 60 * 1000;
+
+let rebuilding = false;
+
+// Order totals, revenue, status/hour breakdowns and top products/pincodes
+// from the daily rollups
+// GET /api/dashboard/summary?from=YYYY-MM-DD&to=YYYY-MM-DD&limit=10
+router.get('/summary', async (req, res) => {
+  try {
+    const { from, to, limit } = req.query;
+    for (const value of [from, to]) {
+      if (value !== undefined && !DAY_PATTERN.test(value)) {
+        return res.status(400).json({ detail: `Invalid date: ${value} (expected YYYY-MM-DD)` });
+      }
+    }
+
+    res.json(await summarizeRollups({ from, to, limit }));
+  } catch (error) {
+    console.error('Error building dashboard summary:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
+// Recompute all rollups from the orders collection (backfill or repair).
+// Orders placed during a rebuild can be miscounted, so it is refused (409)
+// while one is running or any order changed in the last
+// ROLLUP_REBUILD_QUIET_MS; it is also rate limited in server.js.
+// POST /api/dashboard/rollups/rebuild
+router.post('/rollups/rebuild', async (req, res) => {
+  if (rebuilding) {
+    return res.status(409).json({ detail: 'A rollup rebuild is already running' });
+  }
+  rebuilding = true;
+  try {
+    if (await ordersChangedWithin(REBUILD_QUIET_MS)) {
+      return res.status(409).json({
+        detail: `Orders changed in the last ${Math.round(REBUILD_QUIET_MS / 1000)}s; rebuild when the shop is quiet`
+      });
+    }
+    res.json(await rebuildRollups());
+  } catch (error) {
+    console.error('Error rebuilding rollups:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  } finally {
+    rebuilding = false;
+  }
+});
+
+export default router;
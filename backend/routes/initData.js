@@ -1,15 +1,16 @@
 import express from 'express';
 import { v4 as uuidv4 } from 'uuid';
 import { Category, Product, Pincode } from '../models/index.js';
+import { invalidateCatalog } from '../services/catalogCache.js';
+import { updatePincodeIndex } from '../services/pincodeIndex.js';
 
 const router = express.Router();
 
 // Initialize default data
 router.post('/', async (req, res) => {
   try {
-    // Check if already initialized
-    const existingCats = await Category.countDocuments();
-    if (existingCats > 0) {
+    // Check if already initialized (stops at the first category found)
+    if (await Category.exists({})) {
       return res.json({ message: 'Data already initialized' });
     }
     
@@ -44,9 +45,14 @@ router.post('/', async (req, res) => {
       { id: uuidv4(), name: 'Eggs (12 pcs)', price: 90, category: 'Others', image: 'https://images.unsplash.com/photo-1582722872445-44dc5f7e3c8f?w=400', in_stock: true, description: 'Farm fresh eggs, pack of 12', unit: '12 pcs', created_at: now }
     ];
     
-    await Category.insertMany(defaultCategories);
-    await Pincode.insertMany(defaultPincodes);
-    await Product.insertMany(defaultProducts);
+    // Independent collections, so the three inserts run concurrently
+    await Promise.all([
+      Category.insertMany(defaultCategories),
+      Pincode.insertMany(defaultPincodes),
+      Product.insertMany(defaultProducts)
+    ]);
+    invalidateCatalog();
+    updatePincodeIndex();
     
     res.json({ message: 'Data initialized successfully' });
   } catch (error) {
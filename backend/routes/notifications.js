@@ -0,0 +1,62 @@
+import express from 'express';
+import { Notification } from '../models/index.js';
+import { getOutboxStats, kickOutbox } from '../services/outbox.js';
+
+const router = express.Router();
+
+// Outbox counts per status
+router.get('/stats', async (req, res) => {
+  try {
+    res.json(await getOutboxStats());
+  } catch (error) {
+    console.error('Error fetching outbox stats:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
+// List outbox entries (optionally filter by status, e.g. ?status=dead)
+router.get('/', async (req, res) => {
+  try {
+    const { status, order_id } = req.query;
+    const query = {};
+
+    if (status) {
+      query.status = status;
+    }
+    if (order_id) {
+      query.order_id = order_id;
+    }
+
+    const entries = await Notification.find(query, { _id: 0, payload: 0 })
+      .sort({ next_attempt_at: -1 })
+      .limit(200)
+      .lean();
+    res.json(entries);
+  } catch (error) {
+    console.error('Error fetching notifications:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
+// Re-queue a dead-lettered entry
+router.post('/:notificationId/retry', async (req, res) => {
+  try {
+    const { notificationId } = req.params;
+    const result = await Notification.updateOne(
+      { id: notificationId, status: 'dead' },
+      { $set: { status: 'pending', attempts: 0, next_attempt_at: new Date(), last_error: null } }
+    );
+
+    if (result.matchedCount === 0) {
+      return res.status(404).json({ detail: 'Dead-lettered notification not found' });
+    }
+
+    kickOutbox();
+    res.json({ success: true });
+  } catch (error) {
+    console.error('Error retrying notification:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
+export default router;
@@ -1,13 +1,14 @@
 import express from 'express';
-import axios from 'axios';
-import fs from 'fs';
-import path from 'path';
-import { fileURLToPath } from 'url';
-import nodemailer from 'nodemailer';
+import { Transform } from 'stream';
+import { pipeline } from 'stream/promises';
 import { Order } from '../models/index.js';
-
-const __filename = fileURLToPath(import.meta.url);
-const __dirname = path.dirname(__filename);
+import { enqueueOrderNotifications } from '../services/outbox.js';
+import { getEmailConfig, sendAdminMail, verifyMailer } from '../services/mailer.js';
+import { journalOrderCreated, journalOrderStatus } from '../services/orderJournal.js';
+import { ADMIN_ROOM } from '../services/realtime.js';
+import { recordOrderCreated, recordStatusChange } from '../services/rollups.js';
+import { buildProjection } from '../services/projection.js';
+import { pointFrom, parseBatchOptions, planDeliveryBatches } from '../services/delivery.js';
 
 const router = express.Router();
 
@@ -17,220 +18,47 @@ export const setSocketIO = (socketIO) => {
   io = socketIO;
 };
 
-// Helper: Send WhatsApp notification
-const sendWhatsAppNotification = async (order) => {
-  const phone = process.env.WHATSAPP_PHONE || '+919999999999';
-  const apiKey = process.env.WHATSAPP_API_KEY || 'API_KEY_HERE';
-  
-  const itemsText = order.items
-    .map(item => `• ${item.name} x ${item.quantity} (${item.unit}) - ₹${item.price * item.quantity}`)
-    .join('\n');
-  
-  const message = `🛒 NEW ORDER RECEIVED!
-
-👤 Customer: ${order.customer_name}
-📞 Phone: ${order.phone}
-📍 Address: ${order.address}
-📮 Pincode: ${order.pincode}
-
-📦 Items:
-${itemsText}
-
-💰 Total: ₹${order.total}
-💳 Payment: ${order.payment_mode}
-
-Order ID: ${order.id}`;
-  
-  try {
-    const encodedMessage = encodeURIComponent(message);
-    const url = `https://api.callmebot.com/whatsapp.php?phone=${phone}&text=${encodedMessage}&apikey=${apiKey}`;
-    
-    await axios.get(url, { timeout: 10000 });
-    console.log(`WhatsApp notification sent for order ${order.id}`);
-  } catch (error) {
-    console.error('Failed to send WhatsApp notification:', error.message);
-  }
-};
-
-// Helper: Send Email notification to admin
-const sendEmailNotification = async (order) => {
-  const emailUser = process.env.EMAIL_USER;
-  const emailPassRaw = process.env.EMAIL_PASS;
-  // Gmail app passwords are 16 chars and often copied with spaces for readability.
-  // Normalize by removing whitespace to avoid auth failures.
-  const emailPass = emailPassRaw ? emailPassRaw.replace(/\s+/g, '') : undefined;
-  const adminEmail = process.env.ADMIN_EMAIL || emailUser;
-
-  if (!emailUser || !emailPass) {
-    console.log('Email credentials not configured, skipping email notification');
-    return;
-  }
-
-  if (emailPassRaw && emailPassRaw !== emailPass) {
-    console.warn('EMAIL_PASS contains whitespace; using normalized value without spaces.');
-  }
-
-  // Create transporter
-  const transporter = nodemailer.createTransport({
-    service: 'gmail',
-    auth: {
-      user: emailUser,
-      pass: emailPass
-    },
-    // Prevent long hangs on SMTP connect in production deployments
-    connectionTimeout: 10000,
-    greetingTimeout: 10000,
-    socketTimeout: 20000
-  });
-
-  // Generate Google Maps link
-  let mapsLink;
-  if (order.latitude && order.longitude) {
-    // Use coordinates for precise location
-    mapsLink = `https://www.google.com/maps?q=${order.latitude},${order.longitude}`;
-  } else {
-    // Fallback to address search
-    const encodedAddress = encodeURIComponent(`${order.address}, ${order.pincode}`);
-    mapsLink = `https://www.google.com/maps/search/${encodedAddress}`;
-  }
-
-  // Create items list
-  const itemsHtml = order.items
-    .map(item => `<li>${item.name} × ${item.quantity} (${item.unit}) - ₹${item.price * item.quantity}</li>`)
-    .join('');
-
-  // Create email content
-  const htmlContent = `
-    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-      <h2 style="color: #c41e3a; border-bottom: 2px solid #c41e3a; padding-bottom: 10px;">🛒 New Order Received!</h2>
-      
-      <div style="background: #f5f5f5; padding: 15px; border-radius: 8px; margin: 15px 0;">
-        <h3 style="margin-top: 0; color: #333;">Customer Details</h3>
-        <p><strong>👤 Name:</strong> ${order.customer_name}</p>
-        <p><strong>📞 Phone:</strong> <a href="tel:${order.phone}">${order.phone}</a></p>
-        <p><strong>📍 Address:</strong> ${order.address}</p>
-        <p><strong>📮 Pincode:</strong> ${order.pincode}</p>
-        ${order.latitude && order.longitude ? `<p><strong>📌 Coordinates:</strong> ${order.latitude}, ${order.longitude}</p>` : ''}
-      </div>
-
-      <div style="background: #e8f5e9; padding: 15px; border-radius: 8px; margin: 15px 0;">
-        <h3 style="margin-top: 0; color: #333;">📍 Navigate to Customer Location</h3>
-        <a href="${mapsLink}" style="display: inline-block; background: #4285f4; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; font-weight: bold;">
-          🗺️ Open in Google Maps
-        </a>
-        <p style="font-size: 12px; color: #666; margin-top: 10px;">
-          ${order.latitude && order.longitude ? 'Exact location captured from customer\'s device' : 'Location based on address (customer did not share exact location)'}
-        </p>
-      </div>
-
-      <div style="background: #fff3e0; padding: 15px; border-radius: 8px; margin: 15px 0;">
-        <h3 style="margin-top: 0; color: #333;">📦 Order Items</h3>
-        <ul style="padding-left: 20px;">
-          ${itemsHtml}
-        </ul>
-      </div>
-
-      <div style="background: #c41e3a; color: white; padding: 15px; border-radius: 8px; margin: 15px 0; text-align: center;">
-        <h2 style="margin: 0;">💰 Total: ₹${order.total}</h2>
-        <p style="margin: 5px 0;">💳 Payment: ${order.payment_mode}</p>
-      </div>
-
-      <div style="text-align: center; padding: 10px; color: #666; font-size: 12px;">
-        <p>Order ID: ${order.id}</p>
-        <p>Order Time: ${new Date(order.created_at).toLocaleString('en-IN', { timeZone: 'Asia/Kolkata' })}</p>
-      </div>
-    </div>
-  `;
-
-  const textContent = `
-NEW ORDER RECEIVED!
-
-Customer: ${order.customer_name}
-Phone: ${order.phone}
-Address: ${order.address}
-Pincode: ${order.pincode}
-${order.latitude && order.longitude ? `Coordinates: ${order.latitude}, ${order.longitude}` : ''}
-
-Google Maps: ${mapsLink}
-
-Items:
-${order.items.map(item => `- ${item.name} × ${item.quantity} (${item.unit}) - ₹${item.price * item.quantity}`).join('\n')}
-
-Total: ₹${order.total}
-Payment: ${order.payment_mode}
-
-Order ID: ${order.id}
-  `;
-
-  try {
-    await transporter.sendMail({
-      from: `"Fresh Meat Hub" <${emailUser}>`,
-      to: adminEmail,
-      subject: `🛒 New Order from ${order.customer_name} - ₹${order.total}`,
-      text: textContent,
-      html: htmlContent
-    });
-    console.log(`Email notification sent for order ${order.id}`);
-  } catch (error) {
-    console.error('Failed to send email notification:', error.message);
-  }
-};
-
 // Email health check (no email is sent). Useful to confirm configuration quickly.
+// Verifies through the shared pooled transport, so no extra handshake is paid
+// when a pooled connection is already open.
 // GET /api/orders/email/health
 router.get('/email/health', async (req, res) => {
-  const emailUser = process.env.EMAIL_USER;
-  const emailPassRaw = process.env.EMAIL_PASS;
-  const emailPass = emailPassRaw ? emailPassRaw.replace(/\s+/g, '') : undefined;
-  const adminEmail = process.env.ADMIN_EMAIL || emailUser;
+  const { emailPassRaw, adminEmail, configured } = getEmailConfig();
 
-  if (!emailUser || !emailPass) {
+  if (!configured) {
     return res.status(400).json({
       ok: false,
       error: 'EMAIL_USER/EMAIL_PASS not configured',
       configured: {
-        email_user_set: !!emailUser,
+        email_user_set: !!process.env.EMAIL_USER,
         email_pass_set: !!emailPassRaw,
         admin_email_set: !!process.env.ADMIN_EMAIL
       }
     });
   }
 
-  try {
-    const transporter = nodemailer.createTransport({
-      service: 'gmail',
-      auth: { user: emailUser, pass: emailPass },
-      connectionTimeout: 10000,
-      greetingTimeout: 10000,
-      socketTimeout: 20000
-    });
-
-    const ok = await transporter.verify();
-    return res.json({
-      ok,
-      configured: {
-        email_user_set: true,
-        email_pass_set: true,
-        admin_email: adminEmail
-      }
-    });
-  } catch (error) {
+  const result = await verifyMailer();
+  if (!result.ok) {
     return res.status(500).json({
       ok: false,
-      error: error.message
+      error: result.error
     });
   }
+
+  return res.json({
+    ok: true,
+    configured: {
+      email_user_set: true,
+      email_pass_set: true,
+      admin_email: adminEmail
+    }
+  });
 });
 
 // Send a test email to admin (useful for Render / production debugging)
 // POST /api/orders/email/test
 router.post('/email/test', async (req, res) => {
-  const emailUser = process.env.EMAIL_USER;
-  const emailPassRaw = process.env.EMAIL_PASS;
-  const emailPass = emailPassRaw ? emailPassRaw.replace(/\s+/g, '') : undefined;
-  const adminEmail = process.env.ADMIN_EMAIL || emailUser;
-
-  if (!emailUser || !emailPass) {
+  if (!getEmailConfig().configured) {
     return res.status(400).json({
       ok: false,
       error: 'EMAIL_USER/EMAIL_PASS not configured'
@@ -238,17 +66,7 @@ router.post('/email/test', async (req, res) => {
   }
 
   try {
-    const transporter = nodemailer.createTransport({
-      service: 'gmail',
-      auth: { user: emailUser, pass: emailPass },
-      connectionTimeout: 10000,
-      greetingTimeout: 10000,
-      socketTimeout: 20000
-    });
-
-    const info = await transporter.sendMail({
-      from: `"Fresh Meat Hub" <${emailUser}>`,
-      to: adminEmail,
+    const info = await sendAdminMail({
       subject: 'Test Email: Fresh Meat Hub',
       text: `This is a test email sent at ${new Date().toISOString()}.`
     });
@@ -259,59 +77,226 @@ router.post('/email/test', async (req, res) => {
   }
 });
 
-// Helper: Log order to file
-const logOrderToFile = async (order) => {
-  const logsDir = path.join(__dirname, '..', 'logs');
-  const logFile = path.join(logsDir, 'orders.txt');
-  
-  // Ensure logs directory exists
-  if (!fs.existsSync(logsDir)) {
-    fs.mkdirSync(logsDir, { recursive: true });
+const DEFAULT_PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 200;
+const DATE_ONLY = /^\d{4}-\d{2}-\d{2}$/;
+
+const nextDay = (date) => {
+  const day = new Date(`${date}T00:00:00.000Z`);
+  day.setUTCDate(day.getUTCDate() + 1);
+  return day.toISOString();
+};
+
+// Normalize a from/to bound to an ISO string; date-only values are whole UTC days
+const parseDateBound = (value, isUpper) => {
+  if (DATE_ONLY.test(value)) {
+    return isUpper ? nextDay(value) : `${value}T00:00:00.000Z`;
+  }
+  const parsed = new Date(value);
+  if (Number.isNaN(parsed.getTime())) {
+    throw new RangeError(`Invalid date: ${value}`);
+  }
+  return parsed.toISOString();
+};
+
+// Build the Mongo filter shared by the order list and export endpoints.
+// `from` is inclusive; `to` is inclusive for a date (whole day) and exclusive
+// for a timestamp. The legacy `date` param is a single whole day.
+const buildOrderFilter = ({ date, from, to, status }) => {
+  const query = {};
+
+  if (date) {
+    from = from || date;
+    to = to || date;
+  }
+  if (from || to) {
+    query.created_at = {};
+    if (from) query.created_at.$gte = parseDateBound(from, false);
+    if (to) query.created_at.$lt = parseDateBound(to, true);
   }
-  
-  const itemsText = order.items.map(item => `${item.name} x ${item.quantity}`).join(', ');
-  const logEntry = `
-================================================================================
-Order ID: ${order.id}
-Date: ${order.created_at}
-Customer: ${order.customer_name}
-Phone: ${order.phone}
-Address: ${order.address}, Pincode: ${order.pincode}
-Items: ${itemsText}
-Total: ₹${order.total}
-Payment: ${order.payment_mode}
-Status: ${order.status}
-================================================================================
-`;
-  
-  fs.appendFileSync(logFile, logEntry);
+  if (status) {
+    query.status = status;
+  }
+  return query;
 };
 
-// Get all orders
+// Opaque keyset cursor: position of the last order on the previous page
+const encodeCursor = (order) => Buffer.from(JSON.stringify([order.created_at, order.id])).toString('base64url');
+
+const decodeCursor = (cursor) => {
+  try {
+    const [createdAt, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+    if (typeof createdAt === 'string' && typeof id === 'string') {
+      return { createdAt, id };
+    }
+  } catch (error) {
+    // fall through
+  }
+  throw new RangeError('Invalid cursor');
+};
+
+// Get orders, newest first.
+// Without limit/cursor this returns the full (filtered) list as before. With
+// ?limit=N and/or ?cursor=... it returns { orders, next_cursor } pages served
+// by the (status, created_at, id) / (created_at, id) indexes.
+// Filters: status, from, to, date; ?fields=id,total,... selects fields.
 router.get('/', async (req, res) => {
   try {
-    const { date, status } = req.query;
-    const query = {};
-    
-    if (date) {
-      query.created_at = { $regex: `^${date}` };
+    const { limit, cursor, fields } = req.query;
+    let query;
+    try {
+      query = buildOrderFilter(req.query);
+    } catch (error) {
+      return res.status(400).json({ detail: error.message });
     }
-    if (status) {
-      query.status = status;
+
+    const sort = { created_at: -1, id: -1 };
+
+    if (limit === undefined && cursor === undefined) {
+      const orders = await Order.find(query, buildProjection(Order, fields)).sort(sort).lean();
+      return res.json(orders);
     }
-    
-    const orders = await Order.find(query).sort({ created_at: -1 }).lean();
-    const result = orders.map(order => {
-      const { _id, ...rest } = order;
-      return rest;
+
+    const pageSize = Math.min(Math.max(parseInt(limit, 10) || DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE);
+    if (cursor) {
+      let position;
+      try {
+        position = decodeCursor(cursor);
+      } catch (error) {
+        return res.status(400).json({ detail: error.message });
+      }
+      const after = {
+        $or: [
+          { created_at: { $lt: position.createdAt } },
+          { created_at: position.createdAt, id: { $lt: position.id } }
+        ]
+      };
+      query = Object.keys(query).length ? { $and: [query, after] } : after;
+    }
+
+    // Fetch one extra row to learn whether another page exists
+    const orders = await Order.find(query, buildProjection(Order, fields, ['id', 'created_at']))
+      .sort(sort)
+      .limit(pageSize + 1)
+      .lean();
+
+    const hasMore = orders.length > pageSize;
+    const page = hasMore ? orders.slice(0, pageSize) : orders;
+    res.json({
+      orders: page,
+      next_cursor: hasMore ? encodeCursor(page[page.length - 1]) : null
     });
-    res.json(result);
   } catch (error) {
     console.error('Error fetching orders:', error);
     res.status(500).json({ detail: 'Internal server error' });
   }
 });
 
+// Columns of the CSV export: one row per line item, order fields repeated
+const CSV_COLUMNS = [
+  'order_id', 'created_at', 'status', 'customer_name', 'phone', 'address', 'pincode',
+  'latitude', 'longitude', 'payment_mode', 'order_total',
+  'product_id', 'item_name', 'item_price', 'item_quantity', 'item_unit', 'line_total'
+];
+
+const csvCell = (value) => {
+  if (value === null || value === undefined) return '';
+  let text = String(value);
+  // Keep spreadsheet apps from evaluating customer-supplied text as formulas
+  if (typeof value === 'string' && /^[=+\-@]/.test(text) && !/^[+-]?\d[\d\s]*$/.test(text)) {
+    text = `'${text}`;
+  }
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+};
+
+const orderToCsvRows = (order) => {
+  const orderCells = [
+    order.id, order.created_at, order.status, order.customer_name, order.phone, order.address,
+    order.pincode, order.latitude, order.longitude, order.payment_mode, order.total
+  ];
+  const items = order.items && order.items.length ? order.items : [null];
+  return items.map(item => [
+    ...orderCells,
+    ...(item
+      ? [item.product_id, item.name, item.price, item.quantity, item.unit, item.price * item.quantity]
+      : ['', '', '', '', '', ''])
+  ].map(csvCell).join(',') + '\r\n').join('');
+};
+
+// Stream orders as NDJSON (default) or CSV with flattened line items.
+// Documents are piped from a Mongo cursor, so memory stays flat regardless of
+// the range, and pipeline() pauses the cursor while the client is slow.
+// GET /api/orders/export?format=csv&from=2025-01-01&to=2025-12-31&status=completed
+router.get('/export', async (req, res) => {
+  const format = req.query.format === 'csv' ? 'csv' : 'ndjson';
+  let query;
+  try {
+    query = buildOrderFilter(req.query);
+  } catch (error) {
+    return res.status(400).json({ detail: error.message });
+  }
+
+  const cursor = Order.find(query, { _id: 0 })
+    .sort({ created_at: 1, id: 1 })
+    .lean()
+    .cursor({ batchSize: 500 });
+
+  let headerWritten = false;
+  const serialize = new Transform({
+    writableObjectMode: true,
+    transform(order, encoding, callback) {
+      if (format === 'ndjson') {
+        return callback(null, `${JSON.stringify(order)}\n`);
+      }
+      const header = headerWritten ? '' : `${CSV_COLUMNS.join(',')}\r\n`;
+      headerWritten = true;
+      callback(null, header + orderToCsvRows(order));
+    },
+    flush(callback) {
+      // An empty CSV export still gets its header row
+      callback(null, format === 'csv' && !headerWritten ? `${CSV_COLUMNS.join(',')}\r\n` : '');
+    }
+  });
+
+  const range = [req.query.from || req.query.date, req.query.to].filter(Boolean).join('_to_') || 'all';
+  res.set({
+    'Content-Type': format === 'csv' ? 'text/csv; charset=utf-8' : 'application/x-ndjson; charset=utf-8',
+    'Content-Disposition': `attachment; filename="orders_${range.replace(/[^\w.-]/g, '')}.${format === 'csv' ? 'csv' : 'ndjson'}"`
+  });
+
+  try {
+    await pipeline(cursor, serialize, res);
+  } catch (error) {
+    // Client disconnects also land here; the cursor is closed by pipeline()
+    if (error.code !== 'ERR_STREAM_PREMATURE_CLOSE') {
+      console.error('Error exporting orders:', error);
+    }
+    if (!res.headersSent) {
+      res.status(500).json({ detail: 'Internal server error' });
+    } else {
+      res.destroy();
+    }
+  }
+});
+
+// Pending/confirmed orders grouped into delivery batches with a stop order
+// per batch (see services/delivery.js). Options: radius_km, max_stops, and
+// lat/lng of the shop (default SHOP_LATITUDE/SHOP_LONGITUDE).
+router.get('/delivery-batches', async (req, res) => {
+  try {
+    let options;
+    try {
+      options = parseBatchOptions(req.query);
+    } catch (error) {
+      return res.status(400).json({ detail: error.message });
+    }
+    res.json(await planDeliveryBatches(options));
+  } catch (error) {
+    console.error('Error planning delivery batches:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
 // Create order
 router.post('/', async (req, res) => {
   try {
@@ -321,13 +306,17 @@ router.post('/', async (req, res) => {
       return res.status(400).json({ detail: 'All fields are required' });
     }
     
+    // notifications_pending stays set until the outbox entries are written,
+    // so a failed enqueue below is picked up by the outbox sweep
     const order = new Order({
+      notifications_pending: true,
       customer_name,
       phone,
       address,
       pincode,
       latitude: latitude || null,
       longitude: longitude || null,
+      location: pointFrom(latitude || null, longitude || null),
       items,
       total
     });
@@ -335,18 +324,24 @@ router.post('/', async (req, res) => {
     await order.save();
     const orderData = order.toJSON();
     
-    // Log order to file
-    await logOrderToFile(orderData);
-    
-    // Send WhatsApp notification
-    await sendWhatsAppNotification(orderData);
+    // Record the order in the journal (buffered, written off the request path)
+    journalOrderCreated(orderData);
+    recordOrderCreated(orderData).catch(error => {
+      console.error(`Failed to update rollups for order ${orderData.id}:`, error);
+    });
     
-    // Send Email notification to admin
-    await sendEmailNotification(orderData);
+    // Queue WhatsApp + email notifications; the outbox worker sends them
+    // in the background so checkout doesn't wait on CallMeBot/Gmail. The
+    // order is saved either way: if this fails, the sweep queues it later.
+    try {
+      await enqueueOrderNotifications(orderData);
+    } catch (error) {
+      console.error(`Failed to queue notifications for order ${orderData.id}, left for the outbox sweep:`, error);
+    }
     
-    // Emit socket event for real-time notification
+    // Real-time notification for signed-in admins only
     if (io) {
-      io.emit('orderPlaced', orderData);
+      io.to(ADMIN_ROOM).emit('orderPlaced', orderData);
     }
     
     res.status(201).json(orderData);
@@ -367,15 +362,25 @@ router.put('/:orderId/status', async (req, res) => {
       return res.status(400).json({ detail: `Invalid status. Must be one of: ${validStatuses.join(', ')}` });
     }
     
-    const result = await Order.updateOne({ id: orderId }, { $set: { status } });
+    const updated_at = new Date().toISOString();
+    // The pre-update document tells the rollups which status bucket to leave
+    const before = await Order.findOneAndUpdate(
+      { id: orderId },
+      { $set: { status, updated_at } },
+      { projection: { _id: 0, status: 1, total: 1, created_at: 1 } }
+    ).lean();
     
-    if (result.matchedCount === 0) {
+    if (!before) {
       return res.status(404).json({ detail: 'Order not found' });
     }
+    journalOrderStatus(orderId, status);
+    recordStatusChange(before, status).catch(error => {
+      console.error(`Failed to update rollups for order ${orderId}:`, error);
+    });
     
-    // Emit socket event for status update
+    // Send admins just the change, not the whole order
     if (io) {
-      io.emit('orderStatusUpdated', { order_id: orderId, status });
+      io.to(ADMIN_ROOM).emit('orderStatusUpdated', { order_id: orderId, status, updated_at });
     }
     
     res.json({ success: true, status });
@@ -1,58 +1,120 @@
 import express from 'express';
 import { Pincode } from '../models/index.js';
+import { isServiceable, normalizePincode, updatePincodeIndex } from '../services/pincodeIndex.js';
+import { buildProjection } from '../services/projection.js';
 
 const router = express.Router();
 
-// Get all pincodes
+const MAX_BATCH_CODES = 10000;
+const PINCODE_PATTERN = /^\d{6}$/;
+
+// Get all pincodes (?fields=code,active selects fields)
 router.get('/', async (req, res) => {
   try {
-    const pincodes = await Pincode.find({}).lean();
-    const result = pincodes.map(pin => {
-      const { _id, ...rest } = pin;
-      return rest;
-    });
-    res.json(result);
+    const pincodes = await Pincode.find({}, buildProjection(Pincode, req.query.fields)).lean();
+    res.json(pincodes);
   } catch (error) {
     console.error('Error fetching pincodes:', error);
     res.status(500).json({ detail: 'Internal server error' });
   }
 });
 
-// Create pincode
+// Create pincode (uniqueness is enforced by the unique index on code)
 router.post('/', async (req, res) => {
   try {
-    const { code, active = true } = req.body;
-    
+    const { active = true } = req.body;
+    const code = normalizePincode(req.body.code);
+
     if (!code) {
       return res.status(400).json({ detail: 'Code is required' });
     }
-    
-    // Check if pincode already exists
-    const existing = await Pincode.findOne({ code });
-    if (existing) {
-      return res.status(400).json({ detail: 'Pincode already exists' });
-    }
-    
+
     const pincode = new Pincode({ code, active });
     await pincode.save();
-    
+    if (active) {
+      updatePincodeIndex({ add: [code] });
+    }
+
     res.status(201).json(pincode.toJSON());
   } catch (error) {
+    if (error.code === 11000) {
+      return res.status(400).json({ detail: 'Pincode already exists' });
+    }
     console.error('Error creating pincode:', error);
     res.status(500).json({ detail: 'Internal server error' });
   }
 });
 
+// Bulk import pincodes from CSV (text/csv body, one or more codes per line)
+// or JSON ({ codes: [...] }). Existing codes are reported, not overwritten.
+// POST /api/pincodes/import
+router.post('/import', express.text({ type: ['text/csv', 'text/plain'], limit: '2mb' }), async (req, res) => {
+  try {
+    const tokens = typeof req.body === 'string'
+      ? req.body.split(/[\s,;]+/)
+      : (Array.isArray(req.body.codes) ? req.body.codes : []);
+
+    const codes = new Set();
+    const invalid = [];
+    for (const token of tokens) {
+      const code = normalizePincode(token);
+      if (!code) continue;
+      if (PINCODE_PATTERN.test(code)) {
+        codes.add(code);
+      } else {
+        invalid.push(code);
+      }
+    }
+
+    if (codes.size === 0) {
+      return res.status(400).json({ detail: 'No valid 6-digit pincodes found', invalid: invalid.slice(0, 20) });
+    }
+    if (codes.size > MAX_BATCH_CODES) {
+      return res.status(400).json({ detail: `At most ${MAX_BATCH_CODES} pincodes per import` });
+    }
+
+    let insertedDocs;
+    let duplicates = 0;
+    try {
+      insertedDocs = await Pincode.insertMany(
+        [...codes].map(code => ({ code, active: true })),
+        { ordered: false }
+      );
+    } catch (error) {
+      if (!error.writeErrors) throw error;
+      // ordered: false keeps inserting past duplicates; only 11000s are expected
+      const unexpected = error.writeErrors.find(writeError => (writeError.code ?? writeError.err?.code) !== 11000);
+      if (unexpected) throw error;
+      insertedDocs = error.insertedDocs || [];
+      duplicates = error.writeErrors.length;
+    }
+
+    const inserted = insertedDocs.map(doc => doc.code);
+    updatePincodeIndex({ add: inserted });
+
+    res.status(201).json({
+      inserted: inserted.length,
+      duplicates,
+      invalid: invalid.length,
+      invalid_sample: invalid.slice(0, 20)
+    });
+  } catch (error) {
+    console.error('Error importing pincodes:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
 // Delete pincode
 router.delete('/:pincodeId', async (req, res) => {
   try {
     const { pincodeId } = req.params;
-    const result = await Pincode.deleteOne({ id: pincodeId });
-    
-    if (result.deletedCount === 0) {
+    const deleted = await Pincode.findOneAndDelete({ id: pincodeId }).lean();
+
+    if (!deleted) {
       return res.status(404).json({ detail: 'Pincode not found' });
     }
-    
+    updatePincodeIndex({ remove: [deleted.code] });
+
     res.json({ success: true });
   } catch (error) {
     console.error('Error deleting pincode:', error);
@@ -60,16 +122,28 @@ router.delete('/:pincodeId', async (req, res) => {
   }
 });
 
-// Verify pincode
-router.get('/verify/:code', async (req, res) => {
-  try {
-    const { code } = req.params;
-    const pincode = await Pincode.findOne({ code, active: true });
-    res.json({ valid: pincode !== null });
-  } catch (error) {
-    console.error('Error verifying pincode:', error);
-    res.status(500).json({ detail: 'Internal server error' });
+// Verify many pincodes at once
+// POST /api/pincodes/verify  { codes: [...] } -> { results: { code: bool } }
+router.post('/verify', (req, res) => {
+  const { codes } = req.body;
+
+  if (!Array.isArray(codes)) {
+    return res.status(400).json({ detail: 'codes must be an array' });
+  }
+  if (codes.length > MAX_BATCH_CODES) {
+    return res.status(400).json({ detail: `At most ${MAX_BATCH_CODES} codes per request` });
   }
+
+  const results = {};
+  for (const code of codes) {
+    results[normalizePincode(code)] = isServiceable(code);
+  }
+  res.json({ results });
+});
+
+// Verify pincode (answered from the in-memory index)
+router.get('/verify/:code', (req, res) => {
+  res.json({ valid: isServiceable(req.params.code) });
 });
 
 export default router;
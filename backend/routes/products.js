@@ -1,38 +1,88 @@
 import express from 'express';
 import { Product } from '../models/index.js';
+import { getCatalogEntry, sendCatalogEntry, invalidateCatalog } from '../services/catalogCache.js';
+import { describeImage } from '../services/images.js';
+import { buildProjection, normalizeFields } from '../services/projection.js';
+import { MAX_BULK_ROWS, parseCsv, applyBulkRows } from '../services/productBulk.js';
+import { parseSearchQuery, searchProducts, parseAutocompleteQuery, autocomplete } from '../services/productSearch.js';
 
 const router = express.Router();
 
-// Get all products (optionally filter by category)
+// One cache entry per category filter and (normalized) field selection. The
+// key is JSON after the scope prefix, so no category value can share the
+// unfiltered list's entry.
+const loadProducts = (category, fields) => {
+  const selected = normalizeFields(Product, fields);
+  const key = `products:${JSON.stringify([category || null, selected || null])}`;
+  return getCatalogEntry(key, () => {
+    const query = category ? { category } : {};
+    return Product.find(query, buildProjection(Product, selected)).lean();
+  });
+};
+
+// Fill the cache for the unfiltered list before the server takes traffic
+export const warmProductCache = () => loadProducts();
+
+// Get all products (optionally filter by category; ?fields=id,name,... selects fields)
 router.get('/', async (req, res) => {
   try {
     const { category } = req.query;
-    const query = category ? { category } : {};
-    
-    const products = await Product.find(query).lean();
-    const result = products.map(prod => {
-      const { _id, ...rest } = prod;
-      return rest;
-    });
-    res.json(result);
+    if (category !== undefined && typeof category !== 'string') {
+      return res.status(400).json({ detail: 'category must be a string' });
+    }
+    const entry = await loadProducts(category, req.query.fields);
+    sendCatalogEntry(req, res, entry);
   } catch (error) {
     console.error('Error fetching products:', error);
     res.status(500).json({ detail: 'Internal server error' });
   }
 });
 
+// Search: ?q= (word prefixes in name/description), category, in_stock,
+// min_price, max_price, sort (relevance|name|price|-price), limit, offset, fields.
+// Registered before /:productId so 'search' isn't taken for an id.
+router.get('/search', async (req, res) => {
+  try {
+    let options;
+    try {
+      options = parseSearchQuery(req.query);
+    } catch (error) {
+      return res.status(400).json({ detail: error.message });
+    }
+    res.json(await searchProducts(options));
+  } catch (error) {
+    console.error('Error searching products:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
+// Search-as-you-type suggestions from the in-memory index: ?q=, category, in_stock, limit
+router.get('/autocomplete', async (req, res) => {
+  try {
+    let options;
+    try {
+      options = parseAutocompleteQuery(req.query);
+    } catch (error) {
+      return res.status(400).json({ detail: error.message });
+    }
+    res.json(await autocomplete(options));
+  } catch (error) {
+    console.error('Error fetching product suggestions:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
 // Get single product
 router.get('/:productId', async (req, res) => {
   try {
     const { productId } = req.params;
-    const product = await Product.findOne({ id: productId }).lean();
+    const product = await Product.findOne({ id: productId }, buildProjection(Product, req.query.fields)).lean();
     
     if (!product) {
       return res.status(404).json({ detail: 'Product not found' });
     }
     
-    const { _id, ...rest } = product;
-    res.json(rest);
+    res.json(product);
   } catch (error) {
     console.error('Error fetching product:', error);
     res.status(500).json({ detail: 'Internal server error' });
@@ -48,8 +98,12 @@ router.post('/', async (req, res) => {
       return res.status(400).json({ detail: 'Name, price, and category are required' });
     }
     
-    const product = new Product({ name, price, category, image, in_stock, description, unit });
+    const product = new Product({
+      name, price, category, image, in_stock, description, unit,
+      image_variants: describeImage(image)
+    });
     await product.save();
+    invalidateCatalog('products');
     
     res.status(201).json(product.toJSON());
   } catch (error) {
@@ -58,6 +112,36 @@ router.post('/', async (req, res) => {
   }
 });
 
+// Bulk upserts, price/stock updates and deletes in one bulkWrite, with a
+// result per row and a single catalog invalidation (see services/productBulk.js).
+// Body: JSON array or { operations: [...] } of { op?, id?, name, price, ... },
+// or text/csv with a header row using the same column names.
+// POST /api/products/bulk
+router.post('/bulk', express.text({ type: ['text/csv', 'text/plain'], limit: '2mb' }), async (req, res) => {
+  try {
+    const rows = typeof req.body === 'string'
+      ? parseCsv(req.body)
+      : (Array.isArray(req.body) ? req.body : req.body.operations);
+
+    if (!Array.isArray(rows) || rows.length === 0) {
+      return res.status(400).json({ detail: 'No operations given' });
+    }
+    if (rows.length > MAX_BULK_ROWS) {
+      return res.status(400).json({ detail: `At most ${MAX_BULK_ROWS} rows per request` });
+    }
+
+    const { summary, results, changed } = await applyBulkRows(rows);
+    if (changed) {
+      invalidateCatalog('products');
+    }
+
+    res.json({ summary, results });
+  } catch (error) {
+    console.error('Error applying bulk product changes:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
 // Update product
 router.put('/:productId', async (req, res) => {
   try {
@@ -71,19 +155,22 @@ router.put('/:productId', async (req, res) => {
         updateData[field] = req.body[field];
       }
     }
+    if (updateData.image !== undefined) {
+      updateData.image_variants = describeImage(updateData.image);
+    }
     
     const product = await Product.findOneAndUpdate(
       { id: productId },
       { $set: updateData },
-      { new: true }
+      { new: true, projection: { _id: 0 } }
     ).lean();
     
     if (!product) {
       return res.status(404).json({ detail: 'Product not found' });
     }
+    invalidateCatalog('products');
     
-    const { _id, ...rest } = product;
-    res.json(rest);
+    res.json(product);
   } catch (error) {
     console.error('Error updating product:', error);
     res.status(500).json({ detail: 'Internal server error' });
@@ -99,6 +186,7 @@ router.delete('/:productId', async (req, res) => {
     if (result.deletedCount === 0) {
       return res.status(404).json({ detail: 'Product not found' });
     }
+    invalidateCatalog('products');
     
     res.json({ success: true });
   } catch (error) {
@@ -2,8 +2,8 @@ import express from 'express';
 import multer from 'multer';
 import path from 'path';
 import { fileURLToPath } from 'url';
-import { v4 as uuidv4 } from 'uuid';
 import fs from 'fs';
+import { processUpload, describeImage, DEFAULT_WIDTH } from '../services/images.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
@@ -16,17 +16,7 @@ if (!fs.existsSync(uploadsDir)) {
   fs.mkdirSync(uploadsDir, { recursive: true });
 }
 
-// Configure multer storage
-const storage = multer.diskStorage({
-  destination: (req, file, cb) => {
-    cb(null, uploadsDir);
-  },
-  filename: (req, file, cb) => {
-    const ext = path.extname(file.originalname) || '.jpg';
-    const filename = `${uuidv4()}${ext}`;
-    cb(null, filename);
-  }
-});
+const MAX_UPLOAD_BYTES = Number(process.env.UPLOAD_MAX_BYTES) || 8 * 1024 * 1024;
 
 // File filter - only allow images
 const fileFilter = (req, file, cb) => {
@@ -37,17 +27,43 @@ const fileFilter = (req, file, cb) => {
   }
 };
 
-const upload = multer({ storage, fileFilter });
+// Keep the upload in memory: only the generated variants are written to disk
+const upload = multer({
+  storage: multer.memoryStorage(),
+  fileFilter,
+  limits: { fileSize: MAX_UPLOAD_BYTES, files: 1 }
+});
 
-// Upload image endpoint
-router.post('/', upload.single('file'), (req, res) => {
+const receiveFile = (req, res, next) => {
+  upload.single('file')(req, res, (error) => {
+    if (!error) return next();
+    if (error.code === 'LIMIT_FILE_SIZE') {
+      return res.status(413).json({ detail: `Image must be at most ${Math.round(MAX_UPLOAD_BYTES / 1024 / 1024)} MB` });
+    }
+    res.status(400).json({ detail: error.message });
+  });
+};
+
+// Upload image endpoint: stores resized WebP/JPEG variants and a thumbnail,
+// and returns the default variant as `url` plus the responsive variant set
+router.post('/', receiveFile, async (req, res) => {
   try {
     if (!req.file) {
       return res.status(400).json({ detail: 'No file uploaded or file must be an image' });
     }
-    
-    const filename = req.file.filename;
-    res.json({ filename, url: `/uploads/${filename}` });
+
+    let hash;
+    try {
+      hash = await processUpload(req.file.buffer, uploadsDir);
+    } catch (error) {
+      // Filesystem errors carry a code (EACCES, ENOSPC...); sharp's decode errors do not
+      if (error.code) throw error;
+      return res.status(400).json({ detail: 'Could not decode image' });
+    }
+
+    const filename = `${hash}-${DEFAULT_WIDTH}w.jpg`;
+    const url = `/uploads/${filename}`;
+    res.json({ filename, url, variants: describeImage(url) });
   } catch (error) {
     console.error('Error uploading file:', error);
     res.status(500).json({ detail: 'Internal server error' });
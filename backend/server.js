@@ -1,29 +1,43 @@
+import './env.js';
 import express from 'express';
 import cors from 'cors';
+import compression from 'compression';
 import mongoose from 'mongoose';
-import dotenv from 'dotenv';
 import { createServer } from 'http';
 import { Server } from 'socket.io';
+import { createAdapter } from '@socket.io/mongo-adapter';
 import path from 'path';
 import { fileURLToPath } from 'url';
 import fs from 'fs';
 
 // Import routes
-import categoriesRouter from './routes/categories.js';
-import productsRouter from './routes/products.js';
+import categoriesRouter, { warmCategoryCache } from './routes/categories.js';
+import productsRouter, { warmProductCache } from './routes/products.js';
 import ordersRouter, { setSocketIO } from './routes/orders.js';
 import pincodesRouter from './routes/pincodes.js';
 import adminRouter from './routes/admin.js';
 import uploadRouter from './routes/upload.js';
 import initDataRouter from './routes/initData.js';
+import notificationsRouter from './routes/notifications.js';
+import dashboardRouter from './routes/dashboard.js';
+import { startOutboxWorker, stopOutboxWorker } from './services/outbox.js';
+import { verifyMailer, closeMailer } from './services/mailer.js';
+import { attachInvalidationBus } from './services/invalidation.js';
+import { getCatalogCacheStats } from './services/catalogCache.js';
+import { loadPincodeIndex, startPincodeIndexRefresh, getPincodeIndexSize } from './services/pincodeIndex.js';
+import { closeJournal } from './services/orderJournal.js';
+import { VARIANT_FILE } from './services/images.js';
+import { attachRealtime } from './services/realtime.js';
+import { backfillOrderLocations } from './services/delivery.js';
+import { backfillRollups } from './services/rollups.js';
+import { rebuildSearchIndex, getSearchIndexStats } from './services/productSearch.js';
+import { requestMetrics, renderMetrics, registerCollector, instrumentMongoClient, flushRequestLog } from './services/metrics.js';
+import { markReady, getReadiness, startDraining, isDraining, trackInFlight, waitForIdle } from './services/lifecycle.js';
+import { createRateLimiter, createLoadShedder, instrumentMongoPool, getMongoWaiters } from './services/rateLimit.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
-// Load environment variables
-// dotenv won't override existing env vars (like those set by Render)
-dotenv.config({ path: path.join(__dirname, '.env') });
-
 // Log environment configuration at startup
 console.log('=== Environment Configuration ===');
 console.log('ADMIN_PIN configured:', !!process.env.ADMIN_PIN);
@@ -31,29 +45,48 @@ console.log('MONGO_URL configured:', !!process.env.MONGO_URL);
 console.log('DB_NAME:', process.env.DB_NAME || 'not set');
 console.log('================================');
 
+// Set by backend/server.py when running several workers behind one port
+const CLUSTER_WORKERS = Number(process.env.CLUSTER_WORKERS) || 1;
+const WORKER_ID = process.env.WORKER_ID || '0';
+
 // Create Express app
 const app = express();
+
+// Behind a reverse proxy, TRUST_PROXY makes req.ip the client address
+// (true, a hop count like 1, or a list such as "loopback"). The default
+// trusts X-Forwarded-For from loopback and private-network peers, where the
+// preview ingress and Render's proxies connect from, so per-IP rate limits
+// see customers rather than the proxy; "false" turns it off.
+const DEFAULT_TRUST_PROXY = 'loopback, uniquelocal';
+const parseTrustProxy = (value) => {
+  if (value === undefined || value === '') return DEFAULT_TRUST_PROXY;
+  if (value === 'false') return false;
+  if (value === 'true') return true;
+  return /^\d+$/.test(value) ? Number(value) : value;
+};
+app.set('trust proxy', parseTrustProxy(process.env.TRUST_PROXY));
 const httpServer = createServer(app);
 
+const CORS_ORIGINS = process.env.CORS_ORIGINS ? process.env.CORS_ORIGINS.split(',') : '*';
+
 // Socket.IO setup
 const io = new Server(httpServer, {
   cors: {
-    origin: '*',
-    methods: ['GET', 'POST', 'PUT', 'DELETE']
-  }
+    origin: CORS_ORIGINS,
+    methods: ['GET', 'POST']
+  },
+  // Compress frames above 1 KB (order payloads); small acks go as-is
+  perMessageDeflate: { threshold: 1024 },
+  // Long-polling needs sticky sessions, which a shared listen socket can't
+  // provide; with several workers clients must use WebSocket
+  transports: CLUSTER_WORKERS > 1 ? ['websocket'] : ['polling', 'websocket']
 });
 
 // Pass Socket.IO to orders router
 setSocketIO(io);
 
-// Socket.IO events
-io.on('connection', (socket) => {
-  console.log(`Client connected: ${socket.id}`);
-  
-  socket.on('disconnect', () => {
-    console.log(`Client disconnected: ${socket.id}`);
-  });
-});
+// Admin room membership and reconnect catch-up
+attachRealtime(io);
 
 // Ensure directories exist
 const uploadsDir = path.join(__dirname, 'uploads');
@@ -63,23 +96,35 @@ if (!fs.existsSync(logsDir)) fs.mkdirSync(logsDir, { recursive: true });
 
 // Middleware
 app.use(cors({
-  origin: process.env.CORS_ORIGINS ? process.env.CORS_ORIGINS.split(',') : '*',
+  origin: CORS_ORIGINS,
   credentials: true,
   methods: ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
   allowedHeaders: ['Content-Type', 'Authorization']
 }));
 
+// gzip/brotli for JSON and text responses above the threshold; cached
+// catalog bodies arrive pre-compressed (services/catalogCache.js) and pass through
+app.use(compression({ threshold: Number(process.env.COMPRESSION_THRESHOLD) || 1024 }));
+
+// Bulk catalog changes carry up to PRODUCT_BULK_MAX_ROWS rows; parsed here
+// so the default 100kb limit below still applies everywhere else
+app.use('/api/products/bulk', express.json({ limit: '2mb' }));
 app.use(express.json());
 app.use(express.urlencoded({ extended: true }));
 
-// Logging middleware
-app.use((req, res, next) => {
-  console.log(`${new Date().toISOString()} - ${req.method} - ${req.path}`);
-  next();
-});
+// Latency/count metrics and sampled request logging (see services/metrics.js)
+app.use(requestMetrics);
+// In-flight count for graceful drain
+app.use(trackInFlight);
 
-// Static files for uploads
-app.use('/uploads', express.static(uploadsDir));
+// Static files for uploads; pipeline variants are content-addressed, so they never change
+app.use('/uploads', express.static(uploadsDir, {
+  setHeaders: (res, filePath) => {
+    if (VARIANT_FILE.test(path.basename(filePath))) {
+      res.setHeader('Cache-Control', 'public, max-age=31536000, immutable');
+    }
+  }
+}));
 
 // API Routes
 app.get('/api', (req, res) => {
@@ -100,6 +145,57 @@ app.get('/api/health', (req, res) => {
   });
 });
 
+// Readiness: Mongo connected, indexes ensured, caches warm, not draining
+app.get('/api/ready', (req, res) => {
+  const readiness = getReadiness();
+  res.status(readiness.ready ? 200 : 503).json(readiness);
+});
+
+// Catalog cache hit/miss counters and search index state
+app.get('/api/cache/stats', (req, res) => {
+  res.json({ catalog: getCatalogCacheStats(), search: getSearchIndexStats() });
+});
+
+// Prometheus scrape endpoint
+app.get('/api/metrics', (req, res) => {
+  res.set('Content-Type', 'text/plain; version=0.0.4; charset=utf-8');
+  res.send(renderMetrics());
+});
+
+registerCollector('catalog_cache_entries', 'gauge', 'Cached catalog responses', () => getCatalogCacheStats().entries);
+registerCollector('catalog_cache_lookups_total', 'counter', 'Catalog cache lookups by result', () => {
+  const { hits, misses } = getCatalogCacheStats();
+  return [[{ result: 'hit' }, hits], [{ result: 'miss' }, misses]];
+});
+registerCollector('pincode_index_size', 'gauge', 'Active pincodes held in memory', getPincodeIndexSize);
+registerCollector('socketio_connected_clients', 'gauge', 'Socket.IO clients connected to this process', () => io.engine.clientsCount);
+
+registerCollector('mongodb_pool_wait_queue', 'gauge', 'Operations waiting for a MongoDB connection', getMongoWaiters);
+
+// Shed load before it piles up on Mongo; checkout gets twice the headroom.
+// Health, readiness and metrics above stay reachable.
+app.use('/api', createLoadShedder({
+  maxInFlight: Number(process.env.LOAD_SHED_MAX_IN_FLIGHT) || 256,
+  maxMongoWaiters: Number(process.env.LOAD_SHED_MAX_MONGO_WAITERS) || 50,
+  isPriority: (req) => req.method === 'POST' && req.path === '/orders'
+}));
+
+// Token buckets for abusable endpoints: rates are per minute, bursts in requests
+const rateLimit = (name, defaults) => {
+  const setting = (key, fallback) => Number(process.env[`RATE_LIMIT_${name.toUpperCase()}_${key}`]) || fallback;
+  return createRateLimiter({
+    name,
+    perIpPerMinute: setting('IP_PER_MIN', defaults.perIpPerMinute),
+    perIpBurst: setting('IP_BURST', defaults.perIpBurst),
+    globalPerMinute: setting('GLOBAL_PER_MIN', defaults.globalPerMinute),
+    globalBurst: setting('GLOBAL_BURST', defaults.globalBurst)
+  });
+};
+app.post('/api/orders', rateLimit('orders', { perIpPerMinute: 10, perIpBurst: 5, globalPerMinute: 600, globalBurst: 100 }));
+app.post('/api/admin/verify', rateLimit('admin_verify', { perIpPerMinute: 5, perIpBurst: 5, globalPerMinute: 60, globalBurst: 20 }));
+app.post('/api/orders/email/test', rateLimit('email_test', { perIpPerMinute: 2, perIpBurst: 2, globalPerMinute: 5, globalBurst: 2 }));
+app.post('/api/dashboard/rollups/rebuild', rateLimit('rollups_rebuild', { perIpPerMinute: 1, perIpBurst: 1, globalPerMinute: 2, globalBurst: 1 }));
+
 app.use('/api/admin', adminRouter);
 app.use('/api/categories', categoriesRouter);
 app.use('/api/products', productsRouter);
@@ -107,6 +203,8 @@ app.use('/api/orders', ordersRouter);
 app.use('/api/pincodes', pincodesRouter);
 app.use('/api/upload', uploadRouter);
 app.use('/api/init-data', initDataRouter);
+app.use('/api/notifications', notificationsRouter);
+app.use('/api/dashboard', dashboardRouter);
 
 // Error handling middleware
 app.use((err, req, res, next) => {
@@ -117,35 +215,170 @@ app.use((err, req, res, next) => {
 // Connect to MongoDB and start server
 const MONGO_URL = process.env.MONGO_URL || 'mongodb://localhost:27017';
 const DB_NAME = process.env.DB_NAME || 'test_database';
-const PORT = 8001;
+const PORT = Number(process.env.PORT) || 8001;
+const SOCKET_ADAPTER_COLLECTION = 'socket_io_adapter_events';
+
+// Relay Socket.IO broadcasts between workers through a capped Mongo
+// collection, so orderPlaced/orderStatusUpdated reach admins connected to
+// any worker
+const attachClusterAdapter = async () => {
+  const db = mongoose.connection.db;
+  try {
+    await db.createCollection(SOCKET_ADAPTER_COLLECTION, { capped: true, size: 1e6 });
+  } catch (error) {
+    if (error.codeName !== 'NamespaceExists') throw error;
+  }
+  io.adapter(createAdapter(db.collection(SOCKET_ADAPTER_COLLECTION)));
+};
 
 const startServer = async () => {
   try {
     // Connect to MongoDB
-    await mongoose.connect(`${MONGO_URL}/${DB_NAME}`);
+    await mongoose.connect(`${MONGO_URL}/${DB_NAME}`, { monitorCommands: true });
+    instrumentMongoClient(mongoose.connection.getClient(), { ignoreCollections: [SOCKET_ADAPTER_COLLECTION] });
+    instrumentMongoPool(mongoose.connection.getClient());
     console.log('Connected to MongoDB');
     
-    // Start HTTP server
-    httpServer.listen(PORT, '0.0.0.0', () => {
-      console.log(`Server running on http://0.0.0.0:${PORT}`);
+    // Open the pooled SMTP transport once; failures are logged, not fatal
+    verifyMailer().then(result => {
+      if (result.ok) {
+        console.log('SMTP transport verified');
+      } else {
+        console.warn('SMTP transport not verified:', result.error);
+      }
+    });
+    
+    if (CLUSTER_WORKERS > 1) {
+      await attachClusterAdapter();
+      // Relay cache invalidations (catalog, ...) to the other workers
+      attachInvalidationBus(io);
+    }
+    
+    // Private per-worker listener the supervisor polls at /api/health and
+    // /api/ready; opened early so a slow index build doesn't look like a hang
+    if (process.env.WORKER_HEALTH_PORT) {
+      healthServer = createServer(app);
+      healthServer.listen(Number(process.env.WORKER_HEALTH_PORT), '127.0.0.1');
+    }
+    
+    // Build every model's indexes (the unique pincode index fails loudly if
+    // duplicates already exist); failures are logged, not fatal
+    const indexResults = await Promise.allSettled(mongoose.modelNames().map(name => mongoose.model(name).init()));
+    indexResults.forEach((result, i) => {
+      if (result.status === 'rejected') {
+        console.error(`Failed to ensure ${mongoose.modelNames()[i]} indexes:`, result.reason.message);
+      }
     });
+    markReady('indexes');
+    
+    // Load the serviceable set, the catalog and the search index before taking traffic
+    const [pincodeCount] = await Promise.all([
+      loadPincodeIndex(),
+      warmProductCache(),
+      warmCategoryCache(),
+      rebuildSearchIndex()
+    ]);
+    startPincodeIndexRefresh();
+    console.log(`Loaded ${pincodeCount} active pincodes`);
+    markReady('caches');
+    
+    // Orders placed before the GeoJSON location field get one in the background
+    backfillOrderLocations()
+      .then(count => {
+        if (count > 0) console.log(`Backfilled location for ${count} orders`);
+      })
+      .catch(error => console.error('Failed to backfill order locations:', error));
+    
+    // Dashboard rollups for orders placed before they existed; one worker
+    // builds them so the others don't repeat the scan
+    if (WORKER_ID === '0') {
+      backfillRollups()
+        .then(result => {
+          if (result) console.log(`Built dashboard rollups for ${result.orders} orders over ${result.days} days`);
+        })
+        .catch(error => console.error('Failed to backfill dashboard rollups:', error));
+    }
+    
+    // Drain queued order notifications in the background
+    startOutboxWorker();
+    
+    // Start HTTP server. Under backend/server.py the public socket is
+    // inherited as LISTEN_FD and shared by all workers.
+    if (process.env.LISTEN_FD) {
+      httpServer.listen({ fd: Number(process.env.LISTEN_FD) }, () => {
+        console.log(`Worker ${WORKER_ID} (pid ${process.pid}) accepting on shared port ${PORT}`);
+      });
+    } else {
+      httpServer.listen(PORT, '0.0.0.0', () => {
+        console.log(`Server running on http://0.0.0.0:${PORT}`);
+      });
+    }
   } catch (error) {
     console.error('Failed to start server:', error);
     process.exit(1);
   }
 };
 
-// Handle graceful shutdown
-process.on('SIGTERM', async () => {
-  console.log('SIGTERM received. Shutting down...');
-  await mongoose.connection.close();
-  process.exit(0);
-});
+// Graceful drain: fail readiness, stop accepting, let in-flight requests and
+// notification sends finish (up to DRAIN_TIMEOUT_MS), flush the journal,
+// then close Mongo. A repeat signal within DUPLICATE_SIGNAL_MS is ignored
+// (Ctrl-C reaches the whole process group, then the supervisor sends SIGTERM
+// too); a later one, or the hard deadline, exits immediately.
+const DRAIN_TIMEOUT_MS = Number(process.env.DRAIN_TIMEOUT_MS) || 20000;
+const DUPLICATE_SIGNAL_MS = 2000;
+let healthServer = null;
+let drainStartedAt = 0;
 
-process.on('SIGINT', async () => {
-  console.log('SIGINT received. Shutting down...');
+const shutdown = async (signal) => {
+  if (isDraining()) {
+    if (Date.now() - drainStartedAt < DUPLICATE_SIGNAL_MS) {
+      console.log(`${signal} received while draining, ignored`);
+      return;
+    }
+    console.log(`${signal} received again, exiting immediately`);
+    process.exit(1);
+  }
+  console.log(`${signal} received. Draining...`);
+  drainStartedAt = Date.now();
+  startDraining();
+  const deadline = Date.now() + DRAIN_TIMEOUT_MS;
+  setTimeout(() => {
+    console.error('Drain deadline passed, exiting');
+    process.exit(1);
+  }, DRAIN_TIMEOUT_MS + 5000).unref();
+  
+  // Stop accepting; other workers keep serving the shared socket. Only this
+  // worker's sockets are dropped so admins reconnect elsewhere.
+  httpServer.close();
+  io.local.disconnectSockets(true);
+  
+  const outboxStopped = Promise.race([
+    stopOutboxWorker().then(() => true),
+    new Promise(resolve => setTimeout(resolve, Math.max(0, deadline - Date.now()), false))
+  ]);
+  const [idle, outboxIdle] = await Promise.all([waitForIdle(deadline), outboxStopped]);
+  if (!idle) {
+    console.warn('Drain deadline passed with requests still in flight');
+  }
+  if (!outboxIdle) {
+    // Their locks expire and another worker retries them
+    console.warn('Drain deadline passed with notification sends still in progress');
+  }
+  httpServer.closeAllConnections();
+  if (healthServer) {
+    healthServer.close();
+    healthServer.closeAllConnections();
+  }
+  
+  closeMailer();
+  await closeJournal();
+  flushRequestLog();
   await mongoose.connection.close();
+  console.log('Drained, exiting');
   process.exit(0);
-});
+};
+
+process.on('SIGTERM', () => shutdown('SIGTERM'));
+process.on('SIGINT', () => shutdown('SIGINT'));
 
 startServer();
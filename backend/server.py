@@ -1,15 +1,274 @@
 """
-Simple wrapper to start Node.js server.
-Since supervisor expects uvicorn, we use this to launch node directly.
+Process supervisor for the Node.js server.
+Since supervisor expects uvicorn, we use this to launch node: importing this
+module (uvicorn server:app) runs the supervisor in place of uvicorn, and
+`python server.py` does the same for local runs.
+
+The supervisor binds the public port once and hands the listening socket to
+BACKEND_WORKERS `node server.js` processes (default: one per CPU core), which
+all accept connections from it. Workers only start accepting once ready, and
+the supervisor logs "service ready" when every worker has passed /api/ready
+on its private loopback port; after that the port is polled at /api/health.
+Workers that crash or stop answering are restarted with exponential backoff.
+SIGHUP performs a rolling restart (start replacement, wait until ready, stop
+the old worker, one at a time); SIGTERM/SIGINT make all workers drain
+in-flight work and exit.
+
+Environment:
+    PORT                        public port (default 8001)
+    BACKEND_WORKERS             number of node workers (default: CPU count)
+    WORKER_HEALTH_INTERVAL      seconds between health checks (default 5)
+    WORKER_STARTUP_TIMEOUT      seconds a worker may take to become healthy (default 60)
+    WORKER_SHUTDOWN_GRACE       seconds to wait after SIGTERM before SIGKILL (default 30;
+                                keep above the workers' DRAIN_TIMEOUT_MS)
+    ADMIN_TOKEN_SECRET          admin token signing key; when unset a random key is
+                                generated per boot and shared with the workers
 """
 import os
+import secrets
+import signal
+import socket
 import subprocess
 import sys
+import time
+import urllib.request
 from pathlib import Path
 
-# Get the directory where this script is located  
+# Get the directory where this script is located
 BACKEND_DIR = Path(__file__).parent.absolute()
 
-# Start Node.js server (this replaces the current process)
-os.chdir(str(BACKEND_DIR))
-os.execvp("node", ["node", "server.js"])
+PORT = int(os.environ.get("PORT", "8001"))
+WORKERS = int(os.environ.get("BACKEND_WORKERS") or os.cpu_count() or 1)
+# HMAC key for admin session tokens, shared by every worker of this boot
+# (services/adminAuth.js); ADMIN_TOKEN_SECRET, if configured, takes precedence
+ADMIN_TOKEN_BOOT_SECRET = secrets.token_urlsafe(48)
+HEALTH_INTERVAL = float(os.environ.get("WORKER_HEALTH_INTERVAL", "5"))
+STARTUP_TIMEOUT = float(os.environ.get("WORKER_STARTUP_TIMEOUT", "60"))
+SHUTDOWN_GRACE = float(os.environ.get("WORKER_SHUTDOWN_GRACE", "30"))
+HEALTH_TIMEOUT = 2.0
+MAX_HEALTH_FAILURES = 3
+MAX_RESTART_DELAY = 30.0
+# A worker that stayed up this long resets its slot's crash backoff
+STABLE_AFTER = 60.0
+
+
+def log(message):
+    print(f"[supervisor] {message}", flush=True)
+
+
+def free_port():
+    """Pick an unused loopback port for a worker's private health listener"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class Worker:
+    def __init__(self, slot, listen_fd, generation):
+        self.slot = slot
+        self.generation = generation
+        self.health_port = free_port()
+        self.started_at = time.monotonic()
+        self.healthy = False
+        self.failures = 0
+        self.last_check = 0.0
+        env = dict(
+            os.environ,
+            LISTEN_FD=str(listen_fd),
+            WORKER_ID=str(slot),
+            WORKER_HEALTH_PORT=str(self.health_port),
+            CLUSTER_WORKERS=str(WORKERS),
+            ADMIN_TOKEN_BOOT_SECRET=ADMIN_TOKEN_BOOT_SECRET,
+        )
+        # Own session: a terminal Ctrl-C reaches only the supervisor, which
+        # then stops each worker with exactly one SIGTERM
+        self.process = subprocess.Popen(
+            ["node", "server.js"], cwd=str(BACKEND_DIR), env=env, pass_fds=(listen_fd,),
+            start_new_session=True,
+        )
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def check_health(self):
+        """Poll the worker's private port; returns True if it answered ok.
+        Until the worker has been ready once this asks /api/ready (Mongo
+        connected, indexes built, caches warm); afterwards /api/health, so a
+        worker is not killed just because Mongo is briefly unreachable."""
+        self.last_check = time.monotonic()
+        endpoint = "/api/health" if self.healthy else "/api/ready"
+        url = f"http://127.0.0.1:{self.health_port}{endpoint}"
+        try:
+            with urllib.request.urlopen(url, timeout=HEALTH_TIMEOUT) as response:
+                ok = response.status == 200
+        except OSError:
+            ok = False
+        if ok:
+            self.healthy = True
+            self.failures = 0
+        else:
+            self.failures += 1
+        return ok
+
+    def stop(self):
+        if self.alive():
+            self.process.send_signal(signal.SIGTERM)
+
+    def wait_stopped(self, grace=SHUTDOWN_GRACE):
+        try:
+            self.process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            log(f"worker {self.slot} (pid {self.pid}) ignored SIGTERM, killing")
+            self.process.kill()
+            self.process.wait()
+
+
+class Supervisor:
+    def __init__(self, workers):
+        self.count = workers
+        self.listener = socket.create_server(("0.0.0.0", PORT), backlog=511)
+        self.listener.set_inheritable(True)
+        self.workers = {}
+        self.crashes = {}
+        self.restart_at = {}
+        self.generation = 0
+        self.reload_requested = False
+        self.stopping = False
+        self.announced = False
+
+    def spawn(self, slot):
+        self.generation += 1
+        worker = Worker(slot, self.listener.fileno(), self.generation)
+        log(f"started worker {slot} (pid {worker.pid}, health port {worker.health_port})")
+        return worker
+
+    def reap(self):
+        """Notice exited workers and schedule their restart with backoff"""
+        now = time.monotonic()
+        for slot, worker in list(self.workers.items()):
+            if worker.alive():
+                continue
+            del self.workers[slot]
+            if self.stopping:
+                continue
+            if now - worker.started_at >= STABLE_AFTER:
+                self.crashes[slot] = 0
+            self.crashes[slot] = self.crashes.get(slot, 0) + 1
+            delay = min(2 ** (self.crashes[slot] - 1), MAX_RESTART_DELAY)
+            self.restart_at[slot] = now + delay
+            log(f"worker {slot} (pid {worker.pid}) exited with code {worker.process.returncode}; restarting in {delay:.0f}s")
+
+    def restart_due(self):
+        now = time.monotonic()
+        for slot in range(self.count):
+            if slot not in self.workers and self.restart_at.get(slot, 0) <= now:
+                self.restart_at.pop(slot, None)
+                self.workers[slot] = self.spawn(slot)
+
+    def check_health(self):
+        now = time.monotonic()
+        for slot, worker in list(self.workers.items()):
+            # Starting workers are polled quickly so readiness is noticed promptly
+            interval = HEALTH_INTERVAL if worker.healthy else min(HEALTH_INTERVAL, 0.5)
+            if now - worker.last_check < interval:
+                continue
+            if worker.check_health():
+                continue
+            if not worker.healthy:
+                # Still starting up: only give up after the startup timeout
+                if now - worker.started_at > STARTUP_TIMEOUT:
+                    log(f"worker {slot} (pid {worker.pid}) not ready after {STARTUP_TIMEOUT:.0f}s, killing")
+                    worker.process.kill()
+            elif worker.failures >= MAX_HEALTH_FAILURES:
+                log(f"worker {slot} (pid {worker.pid}) failed {worker.failures} health checks, killing")
+                worker.process.kill()
+
+    def tick(self):
+        self.reap()
+        if not self.stopping:
+            self.restart_due()
+            self.check_health()
+            self.announce_ready()
+
+    def announce_ready(self):
+        if self.announced or len(self.workers) < self.count:
+            return
+        if all(worker.healthy for worker in self.workers.values()):
+            self.announced = True
+            log(f"service ready on port {PORT}: {self.count} worker(s) accepting")
+
+    def wait_healthy(self, worker, timeout=STARTUP_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and worker.alive() and not self.stopping:
+            if worker.check_health():
+                return True
+            time.sleep(0.5)
+        return False
+
+    def rolling_restart(self):
+        """Replace workers one at a time, only stopping the old one once its
+        replacement answers health checks"""
+        log("SIGHUP received, rolling restart")
+        for slot in range(self.count):
+            if self.stopping:
+                return
+            old = self.workers.get(slot)
+            new = self.spawn(slot)
+            if not self.wait_healthy(new):
+                log(f"replacement for worker {slot} did not become ready, keeping the old worker")
+                new.stop()
+                new.wait_stopped()
+                continue
+            self.workers[slot] = new
+            if old:
+                old.stop()
+                old.wait_stopped()
+            self.tick()
+        log("rolling restart complete")
+
+    def shutdown(self, signum, frame):
+        if not self.stopping:
+            log(f"{signal.Signals(signum).name} received, stopping workers")
+        self.stopping = True
+
+    def request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.shutdown)
+        signal.signal(signal.SIGINT, self.shutdown)
+        signal.signal(signal.SIGHUP, self.request_reload)
+        log(f"listening on 0.0.0.0:{PORT} with {self.count} worker(s)")
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_restart()
+            self.tick()
+            time.sleep(0.5)
+
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.wait_stopped()
+        self.listener.close()
+        log("all workers stopped")
+
+
+def main():
+    os.chdir(str(BACKEND_DIR))
+    return Supervisor(WORKERS).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+else:
+    # Deployed as `uvicorn server:app`: like the original exec wrapper, take
+    # over the process while uvicorn imports this module and never hand
+    # control back to it (SystemExit ends the process with our status)
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import crypto from 'crypto';
+
+// Signed admin session tokens.
+//
+// POST /api/admin/verify hands one out after a correct PIN; it is
+// "<expires_ms>.<hmac>" and needs no server-side storage, so any worker can
+// check it. The HMAC key is ADMIN_TOKEN_SECRET, else the random
+// ADMIN_TOKEN_BOOT_SECRET that backend/server.py generates per boot and
+// passes to its workers (tokens then end with the supervisor). A single
+// process started on its own (npm start) generates a random key at startup,
+// as it is the only one checking tokens. It is never derived from the PIN: a
+// 4-digit PIN would let anyone forge tokens offline. Only several workers
+// without a shared secret of at least MIN_SECRET_LENGTH characters leave
+// tokens disabled.
+
+const TOKEN_TTL_MS = Number(process.env.ADMIN_TOKEN_TTL_MS) || 12 * 60 * 60 * 1000;
+const MIN_SECRET_LENGTH = 32;
+const CLUSTER_WORKERS = Number(process.env.CLUSTER_WORKERS) || 1;
+
+// Per-process key, only used when this process is the only worker
+const processKey = crypto.randomBytes(48).toString('base64url');
+
+const signingKey = () => {
+  const secret = process.env.ADMIN_TOKEN_SECRET || process.env.ADMIN_TOKEN_BOOT_SECRET || '';
+  if (secret.length >= MIN_SECRET_LENGTH) return secret;
+  return CLUSTER_WORKERS <= 1 ? processKey : null;
+};
+
+const sign = (key, expires) => crypto.createHmac('sha256', key).update(String(expires)).digest('base64url');
+
+// null when tokens are disabled (several workers, no shared secret)
+export const issueAdminToken = () => {
+  const key = signingKey();
+  if (!key) {
+    console.error(`Admin tokens disabled, so the dashboard gets no live order updates: ${CLUSTER_WORKERS} workers need a shared ADMIN_TOKEN_SECRET (at least ${MIN_SECRET_LENGTH} random characters)`);
+    return null;
+  }
+  const expires = Date.now() + TOKEN_TTL_MS;
+  return { token: `${expires}.${sign(key, expires)}`, expires_at: new Date(expires).toISOString() };
+};
+
+export const verifyAdminToken = (token) => {
+  const key = signingKey();
+  if (!key || typeof token !== 'string') return false;
+  const [expires, signature = ''] = token.split('.');
+  if (!(Number(expires) > Date.now())) return false;
+
+  const expected = Buffer.from(sign(key, expires));
+  const received = Buffer.from(signature);
+  return received.length === expected.length && crypto.timingSafeEqual(received, expected);
+};
@@ -0,0 +1,153 @@
+import crypto from 'crypto';
+import zlib from 'zlib';
+import { promisify } from 'util';
+import { onInvalidate, publishInvalidate } from './invalidation.js';
+
+// Process-level cache of serialized catalog responses.
+//
+// GET /api/products (per category filter) and GET /api/categories are served
+// from a pre-serialized JSON body with a strong ETag, so repeat clients get a
+// 304 and a cache hit costs neither a Mongo query nor JSON.stringify. The
+// create/update/delete handlers call invalidateCatalog(); CATALOG_CACHE_TTL_MS
+// bounds staleness should an invalidation ever be missed. Keys include the
+// client's category and fields parameters, so at most
+// CATALOG_CACHE_MAX_ENTRIES responses are kept, least recently used evicted.
+//
+// Bodies of at least COMPRESSION_THRESHOLD bytes are also stored gzip- and
+// brotli-compressed, so compressing happens once per cache fill rather than
+// once per response; each encoding gets its own ETag.
+
+const TTL_MS = Number(process.env.CATALOG_CACHE_TTL_MS) || 5 * 60 * 1000;
+const MAX_ENTRIES = Number(process.env.CATALOG_CACHE_MAX_ENTRIES) || 500;
+const COMPRESSION_THRESHOLD = Number(process.env.COMPRESSION_THRESHOLD) || 1024;
+
+const gzip = promisify(zlib.gzip);
+const brotli = promisify(zlib.brotliCompress);
+
+// Map iteration order doubles as recency order: oldest first
+const entries = new Map();
+const inflight = new Map();
+const stats = { hits: 0, misses: 0, not_modified: 0, invalidations: 0, evictions: 0 };
+// Bumped on every invalidation so loads that raced with a write aren't stored
+let generation = 0;
+
+const buildEntry = async (data) => {
+  const body = JSON.stringify(data);
+  const hash = crypto.createHash('sha1').update(body).digest('base64url');
+  const entry = { body, etag: `"${hash}"`, encoded: {}, expires: Date.now() + TTL_MS };
+
+  if (Buffer.byteLength(body) >= COMPRESSION_THRESHOLD) {
+    const [gz, br] = await Promise.all([
+      gzip(body),
+      brotli(body, { params: { [zlib.constants.BROTLI_PARAM_QUALITY]: 9 } })
+    ]);
+    entry.encoded.gzip = { body: gz, etag: `"${hash}-gz"` };
+    entry.encoded.br = { body: br, etag: `"${hash}-br"` };
+  }
+  return entry;
+};
+
+const store = (key, entry) => {
+  entries.set(key, entry);
+  for (const oldest of entries.keys()) {
+    if (entries.size <= MAX_ENTRIES) break;
+    entries.delete(oldest);
+    stats.evictions++;
+  }
+};
+
+// Return the cached entry for key, loading it with load() on a miss.
+// Concurrent misses for the same key share one load.
+export const getCatalogEntry = async (key, load) => {
+  const cached = entries.get(key);
+  if (cached && cached.expires > Date.now()) {
+    stats.hits++;
+    entries.delete(key);
+    entries.set(key, cached);
+    return cached;
+  }
+  if (cached) {
+    entries.delete(key);
+  }
+
+  stats.misses++;
+  if (inflight.has(key)) {
+    return inflight.get(key);
+  }
+
+  const startGeneration = generation;
+  const pending = load()
+    .then(buildEntry)
+    .then(entry => {
+      if (generation === startGeneration) {
+        store(key, entry);
+      }
+      return entry;
+    })
+    .finally(() => {
+      // An invalidation may already have replaced this load
+      if (inflight.get(key) === pending) inflight.delete(key);
+    });
+
+  inflight.set(key, pending);
+  return pending;
+};
+
+// Send a cached entry in the best encoding the client accepts, answering
+// 304 when the client already has it (in any encoding)
+export const sendCatalogEntry = (req, res, entry) => {
+  const encoding = Object.keys(entry.encoded).length > 0
+    ? req.acceptsEncodings('br', 'gzip', 'identity')
+    : 'identity';
+  const variant = entry.encoded[encoding];
+
+  res.set('ETag', variant ? variant.etag : entry.etag);
+  res.set('Cache-Control', 'no-cache');
+  res.vary('Accept-Encoding');
+
+  const ifNoneMatch = req.get('If-None-Match');
+  if (ifNoneMatch) {
+    const known = [entry.etag, ...Object.values(entry.encoded).map(encoded => encoded.etag)];
+    if (ifNoneMatch.split(',').some(tag => tag.trim() === '*' || known.includes(tag.trim()))) {
+      stats.not_modified++;
+      return res.status(304).end();
+    }
+  }
+
+  res.type('application/json');
+  if (variant) {
+    // Already encoded, so the compression middleware leaves it alone
+    res.set('Content-Encoding', encoding);
+    return res.send(variant.body);
+  }
+  res.send(entry.body);
+};
+
+const dropScope = (scope) => {
+  generation++;
+  stats.invalidations++;
+  for (const cache of [entries, inflight]) {
+    for (const key of cache.keys()) {
+      if (!scope || key.startsWith(`${scope}:`)) {
+        cache.delete(key);
+      }
+    }
+  }
+};
+
+onInvalidate('catalog', dropScope);
+
+// Drop cached responses for 'products', 'categories', or everything (no scope)
+export const invalidateCatalog = (scope = null) => {
+  publishInvalidate('catalog', scope);
+};
+
+export const getCatalogCacheStats = () => {
+  const lookups = stats.hits + stats.misses;
+  return {
+    ...stats,
+    entries: entries.size,
+    max_entries: MAX_ENTRIES,
+    hit_rate: lookups ? stats.hits / lookups : 0
+  };
+};
@@ -0,0 +1,252 @@
+import { Order } from '../models/index.js';
+
+// Delivery batches for open orders.
+//
+// Orders that shared coordinates carry a GeoJSON `location` (2dsphere
+// indexed). planDeliveryBatches() groups pending/confirmed orders into
+// batches a rider can take in one trip: located orders are clustered
+// greedily around a seed order (everything within radius_km of the seed,
+// nearest first, up to max_stops), and orders without coordinates join a
+// batch that already covers their pincode, else a batch of their own pincode.
+// Each batch's stops are put in nearest-neighbour order, starting from the
+// shop when its location is known (SHOP_LATITUDE/SHOP_LONGITUDE or
+// ?lat=&lng=), in which case orders are read nearest-to-shop first through
+// $geoNear. Seeds are taken in that order (else oldest order first).
+// Clustering is O(n²) distance checks in memory: milliseconds for hundreds
+// of open orders.
+
+const EARTH_RADIUS_KM = 6371;
+const OPEN_STATUSES = ['pending', 'confirmed'];
+const DEFAULT_RADIUS_KM = Number(process.env.BATCH_RADIUS_KM) || 2;
+const DEFAULT_MAX_STOPS = Number(process.env.BATCH_MAX_STOPS) || 10;
+const MAX_RADIUS_KM = 50;
+const MAX_STOPS_LIMIT = 50;
+
+const STOP_FIELDS = {
+  _id: 0,
+  id: 1,
+  customer_name: 1,
+  phone: 1,
+  address: 1,
+  pincode: 1,
+  latitude: 1,
+  longitude: 1,
+  location: 1,
+  total: 1,
+  status: 1,
+  created_at: 1
+};
+
+const validCoordinates = (latitude, longitude) => (
+  Number.isFinite(latitude) && Number.isFinite(longitude) &&
+  Math.abs(latitude) <= 90 && Math.abs(longitude) <= 180
+);
+
+// GeoJSON point for an order, or undefined when it has no usable coordinates
+export const pointFrom = (latitude, longitude) => {
+  if (latitude === null || latitude === undefined || longitude === null || longitude === undefined) {
+    return undefined;
+  }
+  const lat = Number(latitude);
+  const lng = Number(longitude);
+  return validCoordinates(lat, lng) ? { type: 'Point', coordinates: [lng, lat] } : undefined;
+};
+
+// Give orders placed before `location` existed their point; cheap no-op once done
+export const backfillOrderLocations = async () => {
+  const result = await Order.updateMany(
+    {
+      location: { $exists: false },
+      latitude: { $type: 'number', $gte: -90, $lte: 90 },
+      longitude: { $type: 'number', $gte: -180, $lte: 180 }
+    },
+    [{ $set: { location: { type: 'Point', coordinates: ['$longitude', '$latitude'] } } }]
+  );
+  return result.modifiedCount;
+};
+
+const toRadians = (degrees) => degrees * Math.PI / 180;
+
+// Great-circle distance between two [longitude, latitude] pairs
+const distanceKm = ([lng1, lat1], [lng2, lat2]) => {
+  const dLat = toRadians(lat2 - lat1);
+  const dLng = toRadians(lng2 - lng1);
+  const a = Math.sin(dLat / 2) ** 2 +
+    Math.cos(toRadians(lat1)) * Math.cos(toRadians(lat2)) * Math.sin(dLng / 2) ** 2;
+  return 2 * EARTH_RADIUS_KM * Math.asin(Math.min(1, Math.sqrt(a)));
+};
+
+const round = (value) => Math.round(value * 100) / 100;
+
+const coordsOf = (order) => order.location?.coordinates;
+
+const parseNumber = (value, name) => {
+  const number = Number(value);
+  if (value === '' || !Number.isFinite(number)) {
+    throw new Error(`${name} must be a number`);
+  }
+  return number;
+};
+
+// Options from the query string (throws with a client-facing message)
+export const parseBatchOptions = (query = {}) => {
+  const radiusKm = query.radius_km === undefined ? DEFAULT_RADIUS_KM : parseNumber(query.radius_km, 'radius_km');
+  if (radiusKm <= 0 || radiusKm > MAX_RADIUS_KM) {
+    throw new Error(`radius_km must be between 0 and ${MAX_RADIUS_KM}`);
+  }
+
+  const maxStops = query.max_stops === undefined ? DEFAULT_MAX_STOPS : parseNumber(query.max_stops, 'max_stops');
+  if (!Number.isInteger(maxStops) || maxStops < 1 || maxStops > MAX_STOPS_LIMIT) {
+    throw new Error(`max_stops must be an integer between 1 and ${MAX_STOPS_LIMIT}`);
+  }
+
+  let origin = null;
+  if (query.lat !== undefined || query.lng !== undefined) {
+    if (query.lat === undefined || query.lng === undefined) {
+      throw new Error('lat and lng must be given together');
+    }
+    origin = pointFrom(parseNumber(query.lat, 'lat'), parseNumber(query.lng, 'lng'));
+    if (!origin) {
+      throw new Error('lat/lng out of range');
+    }
+  } else {
+    origin = pointFrom(process.env.SHOP_LATITUDE, process.env.SHOP_LONGITUDE) || null;
+  }
+
+  return { radiusKm, maxStops, origin };
+};
+
+const loadOpenOrders = async (origin) => {
+  const status = { $in: OPEN_STATUSES };
+
+  if (!origin) {
+    const orders = await Order.find({ status }, STOP_FIELDS).sort({ created_at: 1 }).lean();
+    return {
+      located: orders.filter(order => coordsOf(order)),
+      unlocated: orders.filter(order => !coordsOf(order))
+    };
+  }
+
+  const [located, unlocated] = await Promise.all([
+    Order.aggregate([
+      { $geoNear: { near: origin, key: 'location', distanceField: 'shop_distance', spherical: true, query: { status } } },
+      { $project: STOP_FIELDS }
+    ]),
+    Order.find({ status, location: { $exists: false } }, STOP_FIELDS).sort({ created_at: 1 }).lean()
+  ]);
+  return { located, unlocated };
+};
+
+// Greedy leader clustering: each unassigned order in turn seeds a batch of
+// the unassigned orders within radiusKm of it, nearest first
+const clusterLocated = (orders, radiusKm, maxStops) => {
+  const assigned = new Array(orders.length).fill(false);
+  const batches = [];
+
+  for (let i = 0; i < orders.length; i++) {
+    if (assigned[i]) continue;
+    const seed = coordsOf(orders[i]);
+    const nearby = [];
+    for (let j = i; j < orders.length; j++) {
+      if (assigned[j]) continue;
+      const distance = distanceKm(seed, coordsOf(orders[j]));
+      if (distance <= radiusKm) nearby.push({ index: j, distance });
+    }
+    nearby.sort((a, b) => a.distance - b.distance);
+
+    const members = nearby.slice(0, maxStops);
+    members.forEach(({ index }) => { assigned[index] = true; });
+    batches.push({ kind: 'proximity', orders: members.map(({ index }) => orders[index]) });
+  }
+  return batches;
+};
+
+// Orders without coordinates ride along with a batch already going to their
+// pincode, else share a batch with the rest of their pincode
+const placeUnlocated = (batches, orders, maxStops) => {
+  for (const order of orders) {
+    const batch = batches.find(candidate => (
+      candidate.orders.length < maxStops &&
+      candidate.orders.some(member => member.pincode === order.pincode)
+    ));
+    if (batch) {
+      batch.orders.push(order);
+    } else {
+      batches.push({ kind: 'pincode', orders: [order] });
+    }
+  }
+  return batches;
+};
+
+const mapsStop = (stop) => (
+  coordsOf(stop)
+    ? `${stop.latitude},${stop.longitude}`
+    : encodeURIComponent(`${stop.address}, ${stop.pincode}`)
+);
+
+// Nearest-neighbour tour over the located stops (from origin, else from the
+// seed); stops without coordinates go last, oldest first
+const routeBatch = (batch, origin, number) => {
+  const remaining = batch.orders.filter(order => coordsOf(order));
+  const unlocated = batch.orders.filter(order => !coordsOf(order));
+  const route = [];
+  let here = origin ? origin.coordinates : remaining.length > 0 ? coordsOf(remaining[0]) : null;
+  let distance = 0;
+
+  while (remaining.length > 0) {
+    let best = 0;
+    let bestDistance = Infinity;
+    remaining.forEach((order, index) => {
+      const candidate = distanceKm(here, coordsOf(order));
+      if (candidate < bestDistance) {
+        best = index;
+        bestDistance = candidate;
+      }
+    });
+    const [next] = remaining.splice(best, 1);
+    distance += bestDistance;
+    here = coordsOf(next);
+    route.push({ order: next, leg_km: round(bestDistance) });
+  }
+  unlocated.forEach(order => route.push({ order, leg_km: null }));
+
+  const stops = route.map(({ order, leg_km }, index) => {
+    const { location, ...stop } = order;
+    return { sequence: index + 1, leg_km, ...stop };
+  });
+  const waypoints = [
+    ...(origin ? [`${origin.coordinates[1]},${origin.coordinates[0]}`] : []),
+    ...route.map(({ order }) => mapsStop(order))
+  ];
+
+  return {
+    batch: number,
+    kind: batch.kind,
+    pincodes: [...new Set(stops.map(stop => stop.pincode))].sort(),
+    stop_count: stops.length,
+    total: round(stops.reduce((sum, stop) => sum + (Number(stop.total) || 0), 0)),
+    distance_km: round(distance),
+    maps_url: `https://www.google.com/maps/dir/${waypoints.join('/')}`,
+    stops
+  };
+};
+
+const buildDeliveryBatches = ({ located, unlocated }, { radiusKm, maxStops, origin }) => {
+  const batches = placeUnlocated(clusterLocated(located, radiusKm, maxStops), unlocated, maxStops);
+  return batches.map((batch, index) => routeBatch(batch, origin, index + 1));
+};
+
+export const planDeliveryBatches = async (options) => {
+  const orders = await loadOpenOrders(options.origin);
+  const batches = buildDeliveryBatches(orders, options);
+  return {
+    generated_at: new Date().toISOString(),
+    origin: options.origin
+      ? { latitude: options.origin.coordinates[1], longitude: options.origin.coordinates[0] }
+      : null,
+    radius_km: options.radiusKm,
+    max_stops: options.maxStops,
+    orders: orders.located.length + orders.unlocated.length,
+    batches
+  };
+};
@@ -0,0 +1,83 @@
+import crypto from 'crypto';
+import fs from 'fs/promises';
+import path from 'path';
+import sharp from 'sharp';
+
+// Product image pipeline.
+//
+// Uploads are decoded once and re-encoded into fixed-width WebP and JPEG
+// variants plus a square thumbnail, named after a hash of the original bytes
+// (<hash>-<width>w.webp, <hash>-thumb.jpg, ...). Because a name always maps to
+// the same content, server.js serves these files as immutable, and the
+// variant set can be derived from any one variant URL (see describeImage).
+
+export const VARIANT_WIDTHS = [320, 640, 1024];
+export const DEFAULT_WIDTH = 640;
+const THUMB_SIZE = 160;
+const FORMATS = {
+  webp: (img) => img.webp({ quality: 80 }),
+  jpg: (img) => img.jpeg({ quality: 82, mozjpeg: true })
+};
+
+// Matches a pipeline-generated file name
+export const VARIANT_FILE = /^[0-9a-f]{16}-(?:\d+w|thumb)\.(?:webp|jpg)$/;
+const VARIANT_URL = /([0-9a-f]{16})-(?:\d+w|thumb)\.(?:webp|jpg)$/;
+
+const variantName = (hash, size, ext) => `${hash}-${size}.${ext}`;
+
+const writeIfMissing = async (file, render) => {
+  try {
+    await fs.access(file);
+  } catch (error) {
+    // Write to a temp name first so a half-written file is never served
+    const tmp = `${file}.${process.pid}.tmp`;
+    await fs.writeFile(tmp, await render());
+    await fs.rename(tmp, file);
+  }
+};
+
+// Generate all variants for an uploaded image buffer; returns the hash.
+// Re-uploading the same bytes reuses the existing files.
+export const processUpload = async (buffer, uploadsDir) => {
+  const hash = crypto.createHash('sha256').update(buffer).digest('hex').slice(0, 16);
+  // Decode once, honoring EXIF orientation; every variant is cloned from it
+  const source = sharp(buffer, { failOn: 'error' }).rotate();
+
+  const jobs = [];
+  for (const [ext, encode] of Object.entries(FORMATS)) {
+    for (const width of VARIANT_WIDTHS) {
+      jobs.push(writeIfMissing(
+        path.join(uploadsDir, variantName(hash, `${width}w`, ext)),
+        () => encode(source.clone().resize({ width, withoutEnlargement: true })).toBuffer()
+      ));
+    }
+    jobs.push(writeIfMissing(
+      path.join(uploadsDir, variantName(hash, 'thumb', ext)),
+      () => encode(source.clone().resize(THUMB_SIZE, THUMB_SIZE, { fit: 'cover' })).toBuffer()
+    ));
+  }
+  await Promise.all(jobs);
+
+  return hash;
+};
+
+// Responsive URLs for an image produced by the pipeline, or null for any
+// other URL (seed data, external links). Works with absolute URLs too: the
+// variants keep whatever prefix the given URL has.
+export const describeImage = (imageUrl) => {
+  const match = typeof imageUrl === 'string' && imageUrl.match(VARIANT_URL);
+  if (!match) return null;
+
+  const hash = match[1];
+  const prefix = imageUrl.slice(0, match.index);
+  const url = (size, ext) => `${prefix}${variantName(hash, size, ext)}`;
+  const srcset = (ext) => VARIANT_WIDTHS.map(width => `${url(`${width}w`, ext)} ${width}w`).join(', ');
+
+  return {
+    src: url(`${DEFAULT_WIDTH}w`, 'jpg'),
+    thumb: url('thumb', 'jpg'),
+    thumb_webp: url('thumb', 'webp'),
+    srcset_webp: srcset('webp'),
+    srcset_jpeg: srcset('jpg')
+  };
+};
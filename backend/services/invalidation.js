@@ -0,0 +1,40 @@
+// Cross-worker invalidation bus.
+//
+// In-process caches (catalog, pincodes, ...) register a handler per topic.
+// publishInvalidate runs the local handlers and, when several workers share
+// the port (see backend/server.py), relays the topic to the other workers
+// through the Socket.IO adapter's serverSideEmit.
+
+const handlers = new Map();
+let io = null;
+
+const runHandlers = (topic, payload) => {
+  for (const handler of handlers.get(topic) || []) {
+    try {
+      handler(payload);
+    } catch (error) {
+      console.error(`Invalidation handler for ${topic} failed:`, error);
+    }
+  }
+};
+
+// Only call this when a cluster adapter is installed; the default in-memory
+// adapter does not support serverSideEmit
+export const attachInvalidationBus = (socketIO) => {
+  io = socketIO;
+  io.on('invalidate', (topic, payload) => runHandlers(topic, payload));
+};
+
+export const onInvalidate = (topic, handler) => {
+  if (!handlers.has(topic)) {
+    handlers.set(topic, []);
+  }
+  handlers.get(topic).push(handler);
+};
+
+export const publishInvalidate = (topic, payload = null) => {
+  runHandlers(topic, payload);
+  if (io) {
+    io.serverSideEmit('invalidate', topic, payload);
+  }
+};
@@ -0,0 +1,70 @@
+import mongoose from 'mongoose';
+
+// Readiness and drain state for this process.
+//
+// /api/health only says the process is alive. /api/ready passes once startup
+// has marked every check (indexes ensured, caches warm) and Mongo is still
+// connected, and fails again while draining, so load balancers and
+// backend/server.py route traffic only to workers that can serve it.
+// trackInFlight counts requests so shutdown can wait for them to finish.
+
+const DRAIN_POLL_MS = 50;
+
+const checks = {
+  indexes: false,
+  caches: false
+};
+let draining = false;
+let inFlight = 0;
+
+export const markReady = (check) => {
+  checks[check] = true;
+};
+
+export const startDraining = () => {
+  draining = true;
+};
+
+export const isDraining = () => draining;
+
+export const getInFlight = () => inFlight;
+
+export const getReadiness = () => {
+  const state = {
+    mongo: mongoose.connection.readyState === 1,
+    ...checks
+  };
+  return {
+    ready: !draining && Object.values(state).every(Boolean),
+    draining,
+    checks: state,
+    in_flight: inFlight
+  };
+};
+
+export const trackInFlight = (req, res, next) => {
+  inFlight++;
+  let done = false;
+  const finish = () => {
+    if (done) return;
+    done = true;
+    inFlight--;
+  };
+  res.on('finish', finish);
+  res.on('close', finish);
+
+  // Ask keep-alive clients to reconnect elsewhere once we are shutting down
+  if (draining) {
+    res.set('Connection', 'close');
+  }
+  next();
+};
+
+// Resolves true when no request is in flight, false if the deadline passed first
+export const waitForIdle = async (deadline) => {
+  while (inFlight > 0) {
+    if (Date.now() >= deadline) return false;
+    await new Promise(resolve => setTimeout(resolve, DRAIN_POLL_MS));
+  }
+  return true;
+};
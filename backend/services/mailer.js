@@ -0,0 +1,117 @@
+import nodemailer from 'nodemailer';
+
+// Shared, pooled SMTP transport.
+//
+// Creating a transport per email pays a full TCP + TLS + AUTH handshake with
+// Gmail every time. The pool keeps up to EMAIL_POOL_CONNECTIONS connections
+// open, reuses each for up to EMAIL_POOL_MAX_MESSAGES messages and throttles
+// sends to EMAIL_RATE_LIMIT messages per minute; anything above that waits in
+// the pool's queue instead of tripping Gmail's throttling.
+
+const POOL_CONNECTIONS = Number(process.env.EMAIL_POOL_CONNECTIONS) || 2;
+const POOL_MAX_MESSAGES = Number(process.env.EMAIL_POOL_MAX_MESSAGES) || 100;
+const RATE_LIMIT_PER_MINUTE = Number(process.env.EMAIL_RATE_LIMIT) || 30;
+
+let transporter = null;
+
+// Gmail unless SMTP_HOST names another server (SMTP_PORT, SMTP_SECURE=true
+// for implicit TLS); tests point this at a local sink
+const smtpServer = () => {
+  if (!process.env.SMTP_HOST) {
+    return { service: 'gmail' };
+  }
+  return {
+    host: process.env.SMTP_HOST,
+    port: Number(process.env.SMTP_PORT) || 587,
+    secure: process.env.SMTP_SECURE === 'true'
+  };
+};
+
+// Read and normalize email settings from the environment
+export const getEmailConfig = () => {
+  const emailUser = process.env.EMAIL_USER;
+  const emailPassRaw = process.env.EMAIL_PASS;
+  // Gmail app passwords are 16 chars and often copied with spaces for readability.
+  // Normalize by removing whitespace to avoid auth failures.
+  const emailPass = emailPassRaw ? emailPassRaw.replace(/\s+/g, '') : undefined;
+  const adminEmail = process.env.ADMIN_EMAIL || emailUser;
+
+  return {
+    emailUser,
+    emailPass,
+    emailPassRaw,
+    adminEmail,
+    configured: !!(emailUser && emailPass)
+  };
+};
+
+// Lazily create the pooled transport; null when credentials are missing
+export const getTransporter = () => {
+  if (transporter) return transporter;
+
+  const { emailUser, emailPass, emailPassRaw, configured } = getEmailConfig();
+  if (!configured) return null;
+
+  if (emailPassRaw !== emailPass) {
+    console.warn('EMAIL_PASS contains whitespace; using normalized value without spaces.');
+  }
+
+  transporter = nodemailer.createTransport({
+    ...smtpServer(),
+    auth: {
+      user: emailUser,
+      pass: emailPass
+    },
+    pool: true,
+    maxConnections: POOL_CONNECTIONS,
+    maxMessages: POOL_MAX_MESSAGES,
+    rateDelta: 60 * 1000,
+    rateLimit: RATE_LIMIT_PER_MINUTE,
+    // Prevent long hangs on SMTP connect in production deployments
+    connectionTimeout: 10000,
+    greetingTimeout: 10000,
+    socketTimeout: 20000
+  });
+
+  return transporter;
+};
+
+// Send a message to the admin address through the pool
+export const sendAdminMail = async ({ subject, text, html }) => {
+  const transport = getTransporter();
+  if (!transport) {
+    throw new Error('EMAIL_USER/EMAIL_PASS not configured');
+  }
+
+  const { emailUser, adminEmail } = getEmailConfig();
+  return transport.sendMail({
+    from: `"Fresh Meat Hub" <${emailUser}>`,
+    to: adminEmail,
+    subject,
+    text,
+    html
+  });
+};
+
+// Check SMTP connectivity and credentials (called once at startup and by
+// GET /api/orders/email/health)
+export const verifyMailer = async () => {
+  const transport = getTransporter();
+  if (!transport) {
+    return { ok: false, error: 'EMAIL_USER/EMAIL_PASS not configured' };
+  }
+
+  try {
+    await transport.verify();
+    return { ok: true };
+  } catch (error) {
+    return { ok: false, error: error.message };
+  }
+};
+
+export const closeMailer = () => {
+  if (transporter) {
+    transporter.close();
+    transporter = null;
+  }
+};
@@ -0,0 +1,236 @@
+import { monitorEventLoopDelay } from 'perf_hooks';
+
+// In-process metrics exposed in Prometheus text format at /api/metrics.
+//
+// Counters and histograms are plain objects updated on the hot path with a
+// few additions; nothing is formatted until a scrape. Series are labelled by
+// route pattern (/api/orders/:orderId/status), never by raw URL, to keep
+// cardinality bounded. Under backend/server.py every worker keeps its own
+// numbers: scrape each worker's WORKER_HEALTH_PORT, where series carry a
+// worker label.
+
+const LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10];
+const EVENT_LOOP_WINDOW_MS = Number(process.env.EVENT_LOOP_WINDOW_MS) || 60000;
+const LOG_SAMPLE_RATE = Number(process.env.REQUEST_LOG_SAMPLE) || 0;
+const LOG_SLOW_MS = Number(process.env.REQUEST_LOG_SLOW_MS) || 1000;
+const LOG_FLUSH_MS = 1000;
+const LOG_MAX_BUFFER = 200;
+
+const WORKER_LABEL = Number(process.env.CLUSTER_WORKERS) > 1
+  ? { worker: String(process.env.WORKER_ID || 0) }
+  : {};
+
+const metrics = new Map();
+
+const escapeLabel = (value) => String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+
+const formatLabels = (labels) => {
+  const parts = Object.entries({ ...WORKER_LABEL, ...labels })
+    .map(([key, value]) => `${key}="${escapeLabel(value)}"`);
+  return parts.length ? `{${parts.join(',')}}` : '';
+};
+
+const register = (name, type, help, extra = {}) => {
+  const metric = { name, type, help, series: new Map(), ...extra };
+  metrics.set(name, metric);
+  return metric;
+};
+
+const seriesFor = (metric, labels, create) => {
+  const key = formatLabels(labels);
+  let series = metric.series.get(key);
+  if (!series) {
+    series = create(labels);
+    metric.series.set(key, series);
+  }
+  return series;
+};
+
+export const createCounter = (name, help) => {
+  const metric = register(name, 'counter', help);
+  return {
+    inc: (labels = {}, value = 1) => {
+      seriesFor(metric, labels, () => ({ labels, value: 0 })).value += value;
+    }
+  };
+};
+
+// Values owned elsewhere (cache counters, queue sizes) are read at scrape
+// time; collect() returns a number or [[labels, value], ...]
+export const registerCollector = (name, type, help, collect) => {
+  register(name, type, help, { collect });
+};
+
+export const createHistogram = (name, help, buckets = LATENCY_BUCKETS) => {
+  const metric = register(name, 'histogram', help, { buckets });
+  return {
+    observe: (labels, value) => {
+      const series = seriesFor(metric, labels, () => ({
+        labels,
+        counts: new Array(buckets.length).fill(0),
+        sum: 0,
+        count: 0
+      }));
+      // Counts are per bucket here and made cumulative when rendering
+      let i = 0;
+      while (i < buckets.length && value > buckets[i]) i++;
+      if (i < buckets.length) series.counts[i]++;
+      series.sum += value;
+      series.count++;
+    }
+  };
+};
+
+const renderMetric = (metric, lines) => {
+  lines.push(`# HELP ${metric.name} ${metric.help}`, `# TYPE ${metric.name} ${metric.type}`);
+
+  if (metric.collect) {
+    const value = metric.collect();
+    const samples = Array.isArray(value) ? value : [[{}, value]];
+    for (const [labels, sample] of samples) {
+      if (Number.isFinite(sample)) lines.push(`${metric.name}${formatLabels(labels)} ${sample}`);
+    }
+    return;
+  }
+
+  for (const [key, series] of metric.series) {
+    if (metric.type === 'counter') {
+      lines.push(`${metric.name}${key} ${series.value}`);
+      continue;
+    }
+    let cumulative = 0;
+    metric.buckets.forEach((bound, i) => {
+      cumulative += series.counts[i];
+      lines.push(`${metric.name}_bucket${formatLabels({ ...series.labels, le: bound })} ${cumulative}`);
+    });
+    lines.push(`${metric.name}_bucket${formatLabels({ ...series.labels, le: '+Inf' })} ${series.count}`);
+    lines.push(`${metric.name}_sum${key} ${series.sum}`);
+    lines.push(`${metric.name}_count${key} ${series.count}`);
+  }
+};
+
+export const renderMetrics = () => {
+  const lines = [];
+  for (const metric of metrics.values()) {
+    renderMetric(metric, lines);
+  }
+  return `${lines.join('\n')}\n`;
+};
+
+// --- HTTP requests ---
+
+const httpDuration = createHistogram('http_request_duration_seconds', 'HTTP request latency by route');
+const httpRequests = createCounter('http_requests_total', 'HTTP requests by route and status');
+
+// Buffered request log: lines are written in batches off the request path.
+// Every 5xx and every request slower than REQUEST_LOG_SLOW_MS is logged;
+// other requests only at REQUEST_LOG_SAMPLE (0..1, default 0).
+let logBuffer = [];
+let logTimer = null;
+
+export const flushRequestLog = () => {
+  if (logTimer) {
+    clearTimeout(logTimer);
+    logTimer = null;
+  }
+  if (logBuffer.length === 0) return;
+  process.stdout.write(logBuffer.join(''));
+  logBuffer = [];
+};
+
+const logRequest = (line) => {
+  logBuffer.push(line);
+  if (logBuffer.length >= LOG_MAX_BUFFER) {
+    flushRequestLog();
+  } else if (!logTimer) {
+    logTimer = setTimeout(flushRequestLog, LOG_FLUSH_MS);
+    logTimer.unref();
+  }
+};
+
+// Only matched routes get their own series; 404s and static files are grouped
+const routeLabel = (req) => {
+  if (req.route) return `${req.baseUrl}${req.route.path}`;
+  return req.baseUrl || 'unmatched';
+};
+
+export const requestMetrics = (req, res, next) => {
+  const start = process.hrtime.bigint();
+  res.on('finish', () => {
+    const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+    const route = routeLabel(req);
+    const status = res.statusCode;
+    httpDuration.observe({ method: req.method, route }, seconds);
+    httpRequests.inc({ method: req.method, route, status });
+
+    if (status >= 500 || seconds * 1000 >= LOG_SLOW_MS || (LOG_SAMPLE_RATE > 0 && Math.random() < LOG_SAMPLE_RATE)) {
+      logRequest(`${new Date().toISOString()} - ${req.method} - ${req.originalUrl} - ${status} - ${(seconds * 1000).toFixed(1)}ms\n`);
+    }
+  });
+  next();
+};
+
+// --- MongoDB commands ---
+
+const mongoDuration = createHistogram('mongodb_command_duration_seconds', 'MongoDB command latency by command and collection');
+const mongoFailures = createCounter('mongodb_command_failures_total', 'Failed MongoDB commands');
+// Handshakes, heartbeats and session bookkeeping are not queries
+const IGNORED_COMMANDS = new Set(['hello', 'isMaster', 'ismaster', 'ping', 'endSessions', 'killCursors', 'saslStart', 'saslContinue']);
+
+// Needs a client connected with monitorCommands: true
+export const instrumentMongoClient = (client, { ignoreCollections = [] } = {}) => {
+  const ignored = new Set(ignoreCollections);
+  const pending = new Map();
+
+  client.on('commandStarted', (event) => {
+    if (IGNORED_COMMANDS.has(event.commandName)) return;
+    const collection = event.commandName === 'getMore'
+      ? event.command.collection
+      : event.command[event.commandName];
+    // Tailing cursors (the Socket.IO adapter) block by design
+    if (typeof collection === 'string' && ignored.has(collection)) return;
+    pending.set(event.requestId, typeof collection === 'string' ? collection : '');
+  });
+
+  const finish = (event, failed) => {
+    const collection = pending.get(event.requestId);
+    if (collection === undefined) return;
+    pending.delete(event.requestId);
+    const labels = { command: event.commandName, collection };
+    mongoDuration.observe(labels, event.duration / 1000);
+    if (failed) mongoFailures.inc(labels);
+  };
+  client.on('commandSucceeded', (event) => finish(event, false));
+  client.on('commandFailed', (event) => finish(event, true));
+};
+
+// --- Notifications ---
+
+const notificationDuration = createHistogram('notification_send_duration_seconds', 'Notification send latency by channel and outcome');
+
+export const observeNotificationSend = (channel, outcome, seconds) => {
+  notificationDuration.observe({ channel, outcome }, seconds);
+};
+
+// --- Event loop and process ---
+
+const loopDelay = monitorEventLoopDelay({ resolution: 20 });
+loopDelay.enable();
+// Quantiles describe the last full window rather than the whole uptime
+let loopWindow = { p50: 0, p99: 0, max: 0 };
+setInterval(() => {
+  loopWindow = {
+    p50: loopDelay.percentile(50) / 1e9,
+    p99: loopDelay.percentile(99) / 1e9,
+    max: loopDelay.max / 1e9
+  };
+  loopDelay.reset();
+}, EVENT_LOOP_WINDOW_MS).unref();
+
+registerCollector('nodejs_eventloop_lag_seconds', 'gauge', `Event loop delay over the last ${EVENT_LOOP_WINDOW_MS / 1000}s window`, () => [
+  [{ quantile: '0.5' }, loopWindow.p50],
+  [{ quantile: '0.99' }, loopWindow.p99],
+  [{ quantile: '1' }, loopWindow.max]
+]);
+registerCollector('process_resident_memory_bytes', 'gauge', 'Resident set size', () => process.memoryUsage.rss());
+registerCollector('process_uptime_seconds', 'gauge', 'Process uptime', () => process.uptime());
@@ -0,0 +1,219 @@
+import axios from 'axios';
+import { getEmailConfig, sendAdminMail } from './mailer.js';
+
+// Order notification senders. These are invoked by the outbox worker
+// (services/outbox.js), never on the request path: they throw on failure so
+// the worker can retry, and resolve to false when the channel is not configured.
+
+// Send WhatsApp notification via CallMeBot
+export const sendWhatsAppNotification = async (order) => {
+  const phone = process.env.WHATSAPP_PHONE || '+919999999999';
+  const apiKey = process.env.WHATSAPP_API_KEY;
+
+  if (!apiKey || apiKey === 'API_KEY_HERE') {
+    console.log('WhatsApp API key not configured, skipping WhatsApp notification');
+    return false;
+  }
+  
+  const itemsText = order.items
+    .map(item => `• ${item.name} x ${item.quantity} (${item.unit}) - ₹${item.price * item.quantity}`)
+    .join('\n');
+  
+  const message = `🛒 NEW ORDER RECEIVED!
+
+👤 Customer: ${order.customer_name}
+📞 Phone: ${order.phone}
+📍 Address: ${order.address}
+📮 Pincode: ${order.pincode}
+
+📦 Items:
+${itemsText}
+
+💰 Total: ₹${order.total}
+💳 Payment: ${order.payment_mode}
+
+Order ID: ${order.id}`;
+  
+  const encodedMessage = encodeURIComponent(message);
+  // WHATSAPP_API_URL points the sender elsewhere (e.g. a local sink in tests)
+  const baseUrl = process.env.WHATSAPP_API_URL || 'https://api.callmebot.com/whatsapp.php';
+  const url = `${baseUrl}?phone=${phone}&text=${encodedMessage}&apikey=${apiKey}`;
+
+  await axios.get(url, { timeout: 10000 });
+  console.log(`WhatsApp notification sent for order ${order.id}`);
+  return true;
+};
+
+// Google Maps link for an order: exact coordinates when shared, else address search
+const getMapsLink = (order) => {
+  if (order.latitude && order.longitude) {
+    return `https://www.google.com/maps?q=${order.latitude},${order.longitude}`;
+  }
+  const encodedAddress = encodeURIComponent(`${order.address}, ${order.pincode}`);
+  return `https://www.google.com/maps/search/${encodedAddress}`;
+};
+
+// Send Email notification to admin
+export const sendEmailNotification = async (order) => {
+  if (!getEmailConfig().configured) {
+    console.log('Email credentials not configured, skipping email notification');
+    return false;
+  }
+
+  const mapsLink = getMapsLink(order);
+
+  // Create items list
+  const itemsHtml = order.items
+    .map(item => `<li>${item.name} × ${item.quantity} (${item.unit}) - ₹${item.price * item.quantity}</li>`)
+    .join('');
+
+  // Create email content
+  const htmlContent = `
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+      <h2 style="color: #c41e3a; border-bottom: 2px solid #c41e3a; padding-bottom: 10px;">🛒 New Order Received!</h2>
+      
+      <div style="background: #f5f5f5; padding: 15px; border-radius: 8px; margin: 15px 0;">
+        <h3 style="margin-top: 0; color: #333;">Customer Details</h3>
+        <p><strong>👤 Name:</strong> ${order.customer_name}</p>
+        <p><strong>📞 Phone:</strong> <a href="tel:${order.phone}">${order.phone}</a></p>
+        <p><strong>📍 Address:</strong> ${order.address}</p>
+        <p><strong>📮 Pincode:</strong> ${order.pincode}</p>
+        ${order.latitude && order.longitude ? `<p><strong>📌 Coordinates:</strong> ${order.latitude}, ${order.longitude}</p>` : ''}
+      </div>
+
+      <div style="background: #e8f5e9; padding: 15px; border-radius: 8px; margin: 15px 0;">
+        <h3 style="margin-top: 0; color: #333;">📍 Navigate to Customer Location</h3>
+        <a href="${mapsLink}" style="display: inline-block; background: #4285f4; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; font-weight: bold;">
+          🗺️ Open in Google Maps
+        </a>
+        <p style="font-size: 12px; color: #666; margin-top: 10px;">
+          ${order.latitude && order.longitude ? 'Exact location captured from customer\'s device' : 'Location based on address (customer did not share exact location)'}
+        </p>
+      </div>
+
+      <div style="background: #fff3e0; padding: 15px; border-radius: 8px; margin: 15px 0;">
+        <h3 style="margin-top: 0; color: #333;">📦 Order Items</h3>
+        <ul style="padding-left: 20px;">
+          ${itemsHtml}
+        </ul>
+      </div>
+
+      <div style="background: #c41e3a; color: white; padding: 15px; border-radius: 8px; margin: 15px 0; text-align: center;">
+        <h2 style="margin: 0;">💰 Total: ₹${order.total}</h2>
+        <p style="margin: 5px 0;">💳 Payment: ${order.payment_mode}</p>
+      </div>
+
+      <div style="text-align: center; padding: 10px; color: #666; font-size: 12px;">
+        <p>Order ID: ${order.id}</p>
+        <p>Order Time: ${new Date(order.created_at).toLocaleString('en-IN', { timeZone: 'Asia/Kolkata' })}</p>
+      </div>
+    </div>
+  `;
+
+  const textContent = `
+NEW ORDER RECEIVED!
+
+Customer: ${order.customer_name}
+Phone: ${order.phone}
+Address: ${order.address}
+Pincode: ${order.pincode}
+${order.latitude && order.longitude ? `Coordinates: ${order.latitude}, ${order.longitude}` : ''}
+
+Google Maps: ${mapsLink}
+
+Items:
+${order.items.map(item => `- ${item.name} × ${item.quantity} (${item.unit}) - ₹${item.price * item.quantity}`).join('\n')}
+
+Total: ₹${order.total}
+Payment: ${order.payment_mode}
+
+Order ID: ${order.id}
+  `;
+
+  await sendAdminMail({
+    subject: `🛒 New Order from ${order.customer_name} - ₹${order.total}`,
+    text: textContent,
+    html: htmlContent
+  });
+  console.log(`Email notification sent for order ${order.id}`);
+  return true;
+};
+
+// Digest mode: when EMAIL_DIGEST_THRESHOLD is set and at least that many
+// orders arrive within EMAIL_DIGEST_WINDOW_MS, further order emails in the
+// same window are coalesced into a single digest sent when the window closes.
+const DIGEST_THRESHOLD = Number(process.env.EMAIL_DIGEST_THRESHOLD) || 0;
+const DIGEST_WINDOW_MS = Number(process.env.EMAIL_DIGEST_WINDOW_MS) || 2 * 60 * 1000;
+
+const recentOrderTimes = [];
+
+// Returns { key, sendAt } when this order's email should go into a digest,
+// or null to send it on its own. Keys are aligned to wall-clock windows so
+// entries queued by different processes end up in the same digest.
+export const planEmailDigest = (now = Date.now()) => {
+  if (DIGEST_THRESHOLD <= 0) return null;
+
+  recentOrderTimes.push(now);
+  while (recentOrderTimes.length && recentOrderTimes[0] <= now - DIGEST_WINDOW_MS) {
+    recentOrderTimes.shift();
+  }
+  if (recentOrderTimes.length < DIGEST_THRESHOLD) return null;
+
+  const windowStart = Math.floor(now / DIGEST_WINDOW_MS) * DIGEST_WINDOW_MS;
+  return {
+    key: `digest-${windowStart}`,
+    sendAt: new Date(windowStart + DIGEST_WINDOW_MS)
+  };
+};
+
+// Send one email summarizing several orders
+export const sendEmailDigest = async (orders) => {
+  if (!getEmailConfig().configured) {
+    console.log('Email credentials not configured, skipping email digest');
+    return false;
+  }
+
+  const grandTotal = orders.reduce((sum, order) => sum + order.total, 0);
+
+  const rowsHtml = orders.map(order => `
+        <tr>
+          <td style="padding: 8px; border-bottom: 1px solid #eee;">
+            <strong>${order.customer_name}</strong><br>
+            <a href="tel:${order.phone}">${order.phone}</a><br>
+            ${order.address}, ${order.pincode}<br>
+            <a href="${getMapsLink(order)}">🗺️ Map</a>
+          </td>
+          <td style="padding: 8px; border-bottom: 1px solid #eee;">
+            ${order.items.map(item => `${item.name} × ${item.quantity} (${item.unit})`).join('<br>')}
+          </td>
+          <td style="padding: 8px; border-bottom: 1px solid #eee; text-align: right;">₹${order.total}</td>
+        </tr>`).join('');
+
+  const htmlContent = `
+    <div style="font-family: Arial, sans-serif; max-width: 700px; margin: 0 auto;">
+      <h2 style="color: #c41e3a; border-bottom: 2px solid #c41e3a; padding-bottom: 10px;">🛒 ${orders.length} New Orders</h2>
+      <table style="width: 100%; border-collapse: collapse; font-size: 14px;">
+        ${rowsHtml}
+      </table>
+      <div style="background: #c41e3a; color: white; padding: 15px; border-radius: 8px; margin: 15px 0; text-align: center;">
+        <h2 style="margin: 0;">💰 Total: ₹${grandTotal}</h2>
+      </div>
+    </div>
+  `;
+
+  const textContent = orders.map(order => `
+Customer: ${order.customer_name} (${order.phone})
+Address: ${order.address}, ${order.pincode}
+Google Maps: ${getMapsLink(order)}
+Items: ${order.items.map(item => `${item.name} × ${item.quantity} (${item.unit})`).join(', ')}
+Total: ₹${order.total}
+Order ID: ${order.id}`).join('\n');
+
+  await sendAdminMail({
+    subject: `🛒 ${orders.length} New Orders - ₹${grandTotal}`,
+    text: `${orders.length} NEW ORDERS\n${textContent}\n\nGrand total: ₹${grandTotal}`,
+    html: htmlContent
+  });
+  console.log(`Email digest sent for ${orders.length} orders`);
+  return true;
+};
@@ -0,0 +1,133 @@
+import fs from 'fs/promises';
+import path from 'path';
+import { fileURLToPath } from 'url';
+
+// Append-only order journal (JSON lines).
+//
+// Each event is one line: {"v":1,"type":"order.created","at":...,"order":{...}}
+// or {"v":1,"type":"order.status","at":...,"order_id":...,"status":...}.
+// Events are buffered and written in batches through one open file handle, so
+// the request path never touches the disk. The file rotates when it exceeds
+// ORDER_JOURNAL_MAX_BYTES or the UTC day changes. ORDER_JOURNAL_FSYNC picks
+// the durability policy: "batch" (fsync every write), "interval" (fsync at
+// most every ORDER_JOURNAL_FSYNC_MS, the default) or "never".
+// Files go to backend/logs unless ORDER_JOURNAL_DIR says otherwise.
+// backend/order_journal.py streams these files to audit or rebuild orders.
+
+const __dirname = path.dirname(fileURLToPath(import.meta.url));
+const LOGS_DIR = process.env.ORDER_JOURNAL_DIR || path.join(__dirname, '..', 'logs');
+
+const FLUSH_MS = Number(process.env.ORDER_JOURNAL_FLUSH_MS) || 200;
+const MAX_BATCH = 100;
+const MAX_BYTES = Number(process.env.ORDER_JOURNAL_MAX_BYTES) || 10 * 1024 * 1024;
+const FSYNC_POLICY = process.env.ORDER_JOURNAL_FSYNC || 'interval';
+const FSYNC_MS = Number(process.env.ORDER_JOURNAL_FSYNC_MS) || 1000;
+
+// Each worker process writes its own file so appends and rotation never
+// interleave. Under backend/server.py the pid is part of the name: during a
+// rolling restart the old and new worker of a slot share WORKER_ID.
+const BASENAME = process.env.WORKER_ID !== undefined
+  ? `orders-w${process.env.WORKER_ID}-${process.pid}`
+  : 'orders';
+const CURRENT_FILE = path.join(LOGS_DIR, `${BASENAME}.jsonl`);
+
+let buffer = [];
+let flushTimer = null;
+let writing = Promise.resolve();
+let handle = null;
+let size = 0;
+let openedDay = null;
+let lastSync = 0;
+
+const utcDay = (date = new Date()) => date.toISOString().slice(0, 10);
+
+const openCurrent = async () => {
+  await fs.mkdir(LOGS_DIR, { recursive: true });
+  handle = await fs.open(CURRENT_FILE, 'a');
+  const stat = await handle.stat();
+  size = stat.size;
+  openedDay = size > 0 ? utcDay(stat.mtime) : utcDay();
+};
+
+const uniquePath = async (base) => {
+  for (let n = 0; ; n++) {
+    const candidate = `${base}${n ? `-${n}` : ''}.jsonl`;
+    try {
+      await fs.access(candidate);
+    } catch (error) {
+      return candidate;
+    }
+  }
+};
+
+// Move the current file aside as <basename>-<timestamp>.jsonl
+const rotate = async () => {
+  await handle.sync();
+  await handle.close();
+  handle = null;
+  const stamp = new Date().toISOString().replace(/[-:.]/g, '');
+  await fs.rename(CURRENT_FILE, await uniquePath(path.join(LOGS_DIR, `${BASENAME}-${stamp}`)));
+  await openCurrent();
+};
+
+const writeBatch = async (lines) => {
+  if (!handle) {
+    await openCurrent();
+  }
+  if (size > 0 && (size >= MAX_BYTES || openedDay !== utcDay())) {
+    await rotate();
+  }
+
+  const chunk = lines.join('');
+  await handle.write(chunk);
+  size += Buffer.byteLength(chunk);
+
+  if (FSYNC_POLICY === 'batch' || (FSYNC_POLICY === 'interval' && Date.now() - lastSync >= FSYNC_MS)) {
+    await handle.sync();
+    lastSync = Date.now();
+  }
+};
+
+// Write everything buffered so far; resolves once it is on disk (per policy)
+export const flushJournal = () => {
+  if (flushTimer) {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+  }
+  if (buffer.length === 0) {
+    return writing;
+  }
+
+  const lines = buffer;
+  buffer = [];
+  writing = writing
+    .then(() => writeBatch(lines))
+    .catch(error => console.error(`Failed to write ${lines.length} order journal entries:`, error.message));
+  return writing;
+};
+
+const append = (event) => {
+  buffer.push(`${JSON.stringify({ v: 1, at: new Date().toISOString(), ...event })}\n`);
+  if (buffer.length >= MAX_BATCH) {
+    flushJournal();
+  } else if (!flushTimer) {
+    flushTimer = setTimeout(flushJournal, FLUSH_MS);
+  }
+};
+
+export const journalOrderCreated = (order) => {
+  append({ type: 'order.created', order });
+};
+
+export const journalOrderStatus = (orderId, status) => {
+  append({ type: 'order.status', order_id: orderId, status });
+};
+
+export const closeJournal = async () => {
+  await flushJournal();
+  if (handle) {
+    await handle.sync();
+    await handle.close();
+    handle = null;
+  }
+};
@@ -0,0 +1,248 @@
+import { Notification, Order } from '../models/index.js';
+import {
+  sendWhatsAppNotification,
+  sendEmailNotification,
+  sendEmailDigest,
+  planEmailDigest
+} from './notifications.js';
+import { observeNotificationSend } from './metrics.js';
+
+// Durable notification outbox.
+//
+// POST /api/orders only inserts outbox entries next to the saved order; this
+// worker claims due entries with an atomic findOneAndUpdate (so several
+// processes can drain the same collection), runs up to OUTBOX_CONCURRENCY
+// sends at once, retries failures with exponential backoff and moves entries
+// to status "dead" after OUTBOX_MAX_ATTEMPTS. Entries left in "processing" by
+// a crashed process are reclaimed once their lock expires.
+//
+// Email entries planned into a digest share a digest_key and are due when the
+// digest window closes; whichever worker claims the first one also claims the
+// rest of the group and sends them as a single email.
+//
+// Orders are saved with notifications_pending: true and cleared once their
+// entries are written. If that write fails (or the process dies in between),
+// the poll loop finds the order after SWEEP_GRACE_MS and enqueues it again;
+// enqueueing is idempotent (one entry per order and channel).
+
+const CONCURRENCY = Number(process.env.OUTBOX_CONCURRENCY) || 4;
+const POLL_INTERVAL_MS = Number(process.env.OUTBOX_POLL_MS) || 5000;
+const MAX_ATTEMPTS = Number(process.env.OUTBOX_MAX_ATTEMPTS) || 6;
+const BASE_BACKOFF_MS = Number(process.env.OUTBOX_BACKOFF_MS) || 5000;
+const MAX_BACKOFF_MS = 30 * 60 * 1000;
+// Must comfortably exceed the slowest send (SMTP connect + socket timeouts)
+const LOCK_MS = 2 * 60 * 1000;
+const SWEEP_GRACE_MS = Number(process.env.OUTBOX_SWEEP_GRACE_MS) || 30 * 1000;
+const SWEEP_BATCH = 100;
+
+const ORDER_CHANNELS = ['whatsapp', 'email'];
+
+// Handlers receive the claimed entry plus every entry batched with it
+const handlers = {
+  whatsapp: (entry) => sendWhatsAppNotification(entry.payload),
+  email: (entry, batch) => (entry.digest_key
+    ? sendEmailDigest(batch.map(e => e.payload))
+    : sendEmailNotification(entry.payload))
+};
+
+let running = false;
+let pumping = false;
+let pollTimer = null;
+let active = 0;
+let idleWaiters = [];
+
+// Queue all notifications for a saved order and clear its pending flag.
+// Safe to repeat: existing entries for the order are left untouched.
+export const enqueueOrderNotifications = async (order) => {
+  const now = new Date();
+  const digest = planEmailDigest(now.getTime());
+
+  const writes = ORDER_CHANNELS.map(channel => {
+    const entry = { order_id: order.id, channel, payload: order, next_attempt_at: now };
+    if (channel === 'email' && digest) {
+      entry.digest_key = digest.key;
+      entry.next_attempt_at = digest.sendAt;
+    }
+    return { updateOne: { filter: { order_id: order.id, channel }, update: { $setOnInsert: entry }, upsert: true } };
+  });
+  try {
+    await Notification.bulkWrite(writes, { ordered: false });
+  } catch (error) {
+    // A concurrent sweep inserted the same entry first
+    const writeErrors = [].concat(error.writeErrors || []);
+    if (writeErrors.length === 0 || writeErrors.some(writeError => (writeError.code ?? writeError.err?.code) !== 11000)) {
+      throw error;
+    }
+  }
+  await Order.updateOne({ id: order.id }, { $set: { notifications_pending: false } });
+  kickOutbox();
+};
+
+// Enqueue orders whose notifications were never written
+const sweepUnqueuedOrders = async () => {
+  const cutoff = new Date(Date.now() - SWEEP_GRACE_MS).toISOString();
+  const orders = await Order.find(
+    { notifications_pending: true, created_at: { $lte: cutoff } },
+    { _id: 0, notifications_pending: 0 }
+  ).limit(SWEEP_BATCH).lean();
+
+  for (const order of orders) {
+    await enqueueOrderNotifications(order);
+    console.warn(`Queued notifications for order ${order.id} after a missed enqueue`);
+  }
+};
+
+const poll = () => {
+  sweepUnqueuedOrders().catch(error => console.error('Outbox sweep error:', error.message));
+  pump();
+};
+
+const claimNext = () => {
+  const now = new Date();
+  return Notification.findOneAndUpdate(
+    {
+      $or: [
+        { status: 'pending', next_attempt_at: { $lte: now } },
+        { status: 'processing', locked_until: { $lte: now } }
+      ]
+    },
+    {
+      $set: { status: 'processing', locked_until: new Date(now.getTime() + LOCK_MS) },
+      $inc: { attempts: 1 }
+    },
+    { sort: { next_attempt_at: 1 }, new: true }
+  ).lean();
+};
+
+// Claim the other pending entries of a digest group for the given leader
+const claimDigestGroup = async (leader) => {
+  await Notification.updateMany(
+    { digest_key: leader.digest_key, status: 'pending', id: { $ne: leader.id } },
+    {
+      $set: { status: 'processing', locked_until: leader.locked_until, locked_by: leader.id },
+      $inc: { attempts: 1 }
+    }
+  );
+  const members = await Notification.find({ status: 'processing', locked_by: leader.id }).lean();
+  return [leader, ...members];
+};
+
+const backoffFor = (attempts) => Math.min(BASE_BACKOFF_MS * 2 ** (attempts - 1), MAX_BACKOFF_MS);
+
+const processEntry = async (entry) => {
+  const batch = entry.digest_key ? await claimDigestGroup(entry) : [entry];
+  const ids = batch.map(e => e.id);
+
+  try {
+    const handler = handlers[entry.channel];
+    if (!handler) {
+      throw new Error(`No handler for channel ${entry.channel}`);
+    }
+
+    const started = process.hrtime.bigint();
+    let delivered;
+    let outcome = 'failed';
+    try {
+      delivered = await handler(entry, batch);
+      outcome = delivered === false ? 'skipped' : 'sent';
+    } finally {
+      observeNotificationSend(entry.channel, outcome, Number(process.hrtime.bigint() - started) / 1e9);
+    }
+    await Notification.updateMany(
+      { id: { $in: ids } },
+      {
+        $set: {
+          status: delivered === false ? 'skipped' : 'sent',
+          sent_at: new Date(),
+          locked_until: null,
+          locked_by: null,
+          last_error: null
+        }
+      }
+    );
+  } catch (error) {
+    const retry = {
+      next_attempt_at: new Date(Date.now() + backoffFor(entry.attempts)),
+      locked_until: null,
+      locked_by: null,
+      last_error: error.message
+    };
+    const deadIds = batch.filter(e => e.attempts >= MAX_ATTEMPTS).map(e => e.id);
+    const retryIds = ids.filter(id => !deadIds.includes(id));
+
+    await Promise.all([
+      Notification.updateMany({ id: { $in: retryIds } }, { $set: { ...retry, status: 'pending' } }),
+      Notification.updateMany({ id: { $in: deadIds } }, { $set: { ...retry, status: 'dead' } })
+    ]);
+    if (deadIds.length) {
+      console.error(`Notification ${entry.id} (${entry.channel}, order ${entry.order_id}) dead-lettered ${deadIds.length} entries after ${entry.attempts} attempts:`, error.message);
+    } else {
+      console.error(`Notification ${entry.id} (${entry.channel}) failed, attempt ${entry.attempts}/${MAX_ATTEMPTS}:`, error.message);
+    }
+  }
+};
+
+// Claim and start entries until the concurrency limit is reached or nothing is due
+const pump = async () => {
+  if (!running || pumping) return;
+  pumping = true;
+
+  try {
+    while (running && active < CONCURRENCY) {
+      const entry = await claimNext();
+      if (!entry) break;
+
+      active++;
+      processEntry(entry)
+        .catch(error => console.error('Outbox entry processing error:', error))
+        .finally(() => {
+          active--;
+          if (active === 0) {
+            idleWaiters.splice(0).forEach(resolve => resolve());
+          }
+          pump();
+        });
+    }
+  } catch (error) {
+    console.error('Outbox poll error:', error.message);
+  } finally {
+    pumping = false;
+  }
+};
+
+// Wake the worker immediately instead of waiting for the next poll
+export const kickOutbox = () => {
+  setImmediate(pump);
+};
+
+export const startOutboxWorker = () => {
+  if (running) return;
+  running = true;
+  pollTimer = setInterval(poll, POLL_INTERVAL_MS);
+  pollTimer.unref();
+  kickOutbox();
+  console.log(`Notification outbox worker started (concurrency ${CONCURRENCY})`);
+};
+
+// Stop claiming entries; resolves once the sends already in progress finish
+export const stopOutboxWorker = () => {
+  running = false;
+  if (pollTimer) {
+    clearInterval(pollTimer);
+    pollTimer = null;
+  }
+  if (active === 0) return Promise.resolve();
+  return new Promise(resolve => idleWaiters.push(resolve));
+};
+
+// Counts per status, for the admin dead-letter view
+export const getOutboxStats = async () => {
+  const counts = await Notification.aggregate([
+    { $group: { _id: '$status', count: { $sum: 1 } } }
+  ]);
+  const stats = { active };
+  for (const { _id, count } of counts) {
+    stats[_id] = count;
+  }
+  return stats;
+};
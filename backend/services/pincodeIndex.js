@@ -0,0 +1,59 @@
+import { Pincode } from '../models/index.js';
+import { onInvalidate, publishInvalidate } from './invalidation.js';
+
+// In-memory set of active (serviceable) pincodes.
+//
+// GET /api/pincodes/verify/:code is hit on every checkout keystroke; answering
+// from a Set avoids a Mongo round trip per call. Writes in routes/pincodes.js
+// apply their delta here and publish it to the other workers; a periodic full
+// reload (PINCODE_INDEX_REFRESH_MS) covers changes made outside the API.
+
+const REFRESH_MS = Number(process.env.PINCODE_INDEX_REFRESH_MS) || 5 * 60 * 1000;
+
+let activeCodes = new Set();
+let loading = null;
+let refreshTimer = null;
+
+export const normalizePincode = (code) => String(code ?? '').trim();
+
+export const loadPincodeIndex = () => {
+  if (!loading) {
+    loading = Pincode.find({ active: true }, { code: 1, _id: 0 }).lean()
+      .then(docs => {
+        activeCodes = new Set(docs.map(doc => doc.code));
+        return activeCodes.size;
+      })
+      .finally(() => {
+        loading = null;
+      });
+  }
+  return loading;
+};
+
+export const startPincodeIndexRefresh = () => {
+  if (refreshTimer) return;
+  refreshTimer = setInterval(() => {
+    loadPincodeIndex().catch(error => console.error('Pincode index refresh failed:', error.message));
+  }, REFRESH_MS);
+  refreshTimer.unref();
+};
+
+export const isServiceable = (code) => activeCodes.has(normalizePincode(code));
+
+export const getPincodeIndexSize = () => activeCodes.size;
+
+// payload: { add: [...codes], remove: [...codes] }, or null for a full reload
+const applyDelta = (payload) => {
+  if (!payload) {
+    loadPincodeIndex().catch(error => console.error('Pincode index reload failed:', error.message));
+    return;
+  }
+  for (const code of payload.add || []) activeCodes.add(code);
+  for (const code of payload.remove || []) activeCodes.delete(code);
+};
+
+onInvalidate('pincodes', applyDelta);
+
+export const updatePincodeIndex = (delta = null) => {
+  publishInvalidate('pincodes', delta);
+};
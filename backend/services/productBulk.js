@@ -0,0 +1,211 @@
+import { v4 as uuidv4 } from 'uuid';
+import { Product } from '../models/index.js';
+import { describeImage } from './images.js';
+
+// Bulk catalog changes for POST /api/products/bulk.
+//
+// Rows come as JSON objects or CSV lines (header row required). Each row is
+// an `upsert` (full product: name, price and category; creates it, or
+// replaces the given fields when `id` exists), an `update` (partial change
+// to an existing id, e.g. just price or in_stock) or a `delete`. Without an
+// `op`, a row with an id and no full product is an update, anything else an
+// upsert.
+//
+// Rows are validated up front and invalid rows are reported without being
+// sent. One query looks up which ids exist, then every valid row goes to
+// Mongo in a single unordered bulkWrite, and each row gets its own result.
+
+export const MAX_BULK_ROWS = Number(process.env.PRODUCT_BULK_MAX_ROWS) || 1000;
+
+const OPS = ['upsert', 'update', 'delete'];
+const STRING_FIELDS = ['name', 'category', 'image', 'description', 'unit'];
+const TRUE_VALUES = ['true', '1', 'yes', 'y'];
+const FALSE_VALUES = ['false', '0', 'no', 'n'];
+
+// RFC 4180 CSV: quoted fields may hold commas, quotes ("") and newlines
+export const parseCsv = (text) => {
+  const rows = [];
+  let row = [];
+  let field = '';
+  let quoted = false;
+
+  for (let i = 0; i < text.length; i++) {
+    const char = text[i];
+    if (quoted) {
+      if (char === '"' && text[i + 1] === '"') {
+        field += '"';
+        i++;
+      } else if (char === '"') {
+        quoted = false;
+      } else {
+        field += char;
+      }
+    } else if (char === '"') {
+      quoted = true;
+    } else if (char === ',') {
+      row.push(field);
+      field = '';
+    } else if (char === '\n' || char === '\r') {
+      if (char === '\r' && text[i + 1] === '\n') i++;
+      row.push(field);
+      rows.push(row);
+      row = [];
+      field = '';
+    } else {
+      field += char;
+    }
+  }
+  if (field !== '' || row.length > 0) {
+    row.push(field);
+    rows.push(row);
+  }
+
+  // Header row names the columns; blank lines are skipped
+  const [header = [], ...data] = rows.filter(cells => cells.some(cell => cell.trim() !== ''));
+  const columns = header.map(name => name.trim().toLowerCase());
+  return data.map(cells => {
+    const record = {};
+    columns.forEach((column, i) => {
+      const value = (cells[i] ?? '').trim();
+      // Empty cells mean "leave unchanged"
+      if (column && value !== '') record[column] = value;
+    });
+    return record;
+  });
+};
+
+const parsePrice = (value) => {
+  const price = typeof value === 'number' ? value : Number(String(value).trim());
+  if (value === '' || !Number.isFinite(price) || price < 0) {
+    throw new Error('price must be a non-negative number');
+  }
+  return price;
+};
+
+const parseInStock = (value) => {
+  if (typeof value === 'boolean') return value;
+  const text = String(value).trim().toLowerCase();
+  if (TRUE_VALUES.includes(text)) return true;
+  if (FALSE_VALUES.includes(text)) return false;
+  throw new Error('in_stock must be true or false');
+};
+
+// Validated { op, id, fields } for one row (throws with a client-facing message)
+const normalizeRow = (row) => {
+  if (!row || typeof row !== 'object' || Array.isArray(row)) {
+    throw new Error('row must be an object');
+  }
+
+  const id = row.id === undefined || row.id === null || row.id === '' ? null : String(row.id).trim();
+  const fields = {};
+  for (const field of STRING_FIELDS) {
+    if (row[field] !== undefined && row[field] !== null) {
+      fields[field] = String(row[field]).trim();
+    }
+  }
+  if (row.price !== undefined && row.price !== null) fields.price = parsePrice(row.price);
+  if (row.in_stock !== undefined && row.in_stock !== null) fields.in_stock = parseInStock(row.in_stock);
+
+  const complete = Boolean(fields.name && fields.price !== undefined && fields.category);
+  const op = row.op ? String(row.op).trim().toLowerCase() : (id && !complete ? 'update' : 'upsert');
+  if (!OPS.includes(op)) {
+    throw new Error(`op must be one of ${OPS.join(', ')}`);
+  }
+
+  if (op === 'upsert' && !complete) {
+    throw new Error('Name, price, and category are required');
+  }
+  if (op !== 'upsert' && !id) {
+    throw new Error(`id is required for ${op}`);
+  }
+  if (op === 'update' && Object.keys(fields).length === 0) {
+    throw new Error('No fields to update');
+  }
+  if (op === 'update' && (fields.name === '' || fields.category === '')) {
+    throw new Error('name and category cannot be empty');
+  }
+
+  if (fields.image !== undefined) {
+    fields.image_variants = describeImage(fields.image);
+  }
+  return { op, id, fields };
+};
+
+const toWrite = ({ op, id, fields }) => {
+  if (op === 'delete') {
+    return { deleteOne: { filter: { id } } };
+  }
+  if (op === 'update') {
+    return { updateOne: { filter: { id }, update: { $set: fields } } };
+  }
+  // Upsert: the model's defaults (in_stock, unit, created_at, ...) apply on insert
+  return { updateOne: { filter: { id }, update: { $set: fields }, upsert: true } };
+};
+
+// Apply rows; returns { summary, results } with one result per row, in order.
+// `changed` tells the caller whether anything was written.
+export const applyBulkRows = async (rows) => {
+  const results = rows.map((row, index) => ({ row: index + 1, op: null, id: null, status: null }));
+  const planned = [];
+  const seen = new Set();
+
+  rows.forEach((row, index) => {
+    const result = results[index];
+    try {
+      const change = normalizeRow(row);
+      result.op = change.op;
+      if (!change.id) {
+        change.id = uuidv4();
+      }
+      result.id = change.id;
+      if (seen.has(change.id)) {
+        throw new Error('id appears in more than one row');
+      }
+      seen.add(change.id);
+      planned.push({ index, change });
+    } catch (error) {
+      result.status = 'invalid';
+      result.error = error.message;
+    }
+  });
+
+  // One lookup decides created vs updated and finds missing ids up front
+  const existing = new Set(planned.length === 0 ? [] : (
+    await Product.find({ id: { $in: planned.map(({ change }) => change.id) } }, { _id: 0, id: 1 }).lean()
+  ).map(product => product.id));
+
+  const writes = [];
+  for (const { index, change } of planned) {
+    const result = results[index];
+    if (change.op !== 'upsert' && !existing.has(change.id)) {
+      result.status = 'not_found';
+      continue;
+    }
+    result.status = change.op === 'delete' ? 'deleted' : existing.has(change.id) ? 'updated' : 'created';
+    writes.push({ index, write: toWrite(change) });
+  }
+
+  if (writes.length > 0) {
+    try {
+      await Product.bulkWrite(writes.map(({ write }) => write), { ordered: false });
+    } catch (error) {
+      if (!error.writeErrors) throw error;
+      // Unordered: everything else was still applied; writeError.index is
+      // the position in `writes`
+      for (const writeError of [].concat(error.writeErrors)) {
+        const result = results[writes[writeError.index].index];
+        result.status = 'failed';
+        result.error = writeError.errmsg || writeError.message || 'Write failed';
+      }
+    }
+  }
+
+  const summary = { created: 0, updated: 0, deleted: 0, not_found: 0, invalid: 0, failed: 0 };
+  results.forEach(result => { summary[result.status]++; });
+
+  return {
+    summary,
+    results,
+    changed: summary.created + summary.updated + summary.deleted > 0
+  };
+};
@@ -0,0 +1,284 @@
+import { Product } from '../models/index.js';
+import { onInvalidate } from './invalidation.js';
+import { buildProjection } from './projection.js';
+
+// Product search and autocomplete.
+//
+// Every worker keeps a prefix trie over the words of each product's name and
+// description, rebuilt from Mongo whenever the catalog changes (the
+// 'catalog' invalidation topic, so all workers rebuild). autocomplete()
+// answers search-as-you-type entirely from memory. searchProducts() uses the
+// trie to find matching ids, then lets Mongo apply the category / in-stock /
+// price filters through the compound indexes on Product; queries the trie
+// can't match (e.g. plural or stemmed forms) fall back to the $text index.
+
+const MAX_PREFIX_LENGTH = 24;
+const MAX_QUERY_LENGTH = 100;
+const DEFAULT_LIMIT = 50;
+const MAX_LIMIT = 100;
+const MAX_OFFSET = 10000;
+const DEFAULT_SUGGESTIONS = 8;
+const MAX_SUGGESTIONS = 20;
+
+const INDEX_FIELDS = { _id: 0, id: 1, name: 1, description: 1, category: 1, price: 1, unit: 1, in_stock: 1, image: 1 };
+
+const SORTS = {
+  name: { name: 1, id: 1 },
+  price: { price: 1, id: 1 },
+  '-price': { price: -1, id: 1 }
+};
+
+// Lowercased words with accents stripped: "Crème Brûlée" -> ['creme', 'brulee']
+const tokenize = (text) => String(text || '')
+  .normalize('NFKD')
+  .replace(/[\u0300-\u036f]/g, '')
+  .toLowerCase()
+  .split(/[^a-z0-9]+/)
+  .filter(Boolean);
+
+const createNode = () => ({ children: new Map(), name: new Set(), description: new Set() });
+
+// Record id under every prefix of word, so a lookup is one walk down the trie
+const insert = (root, word, id, field) => {
+  let node = root;
+  for (const char of word.slice(0, MAX_PREFIX_LENGTH)) {
+    if (!node.children.has(char)) {
+      node.children.set(char, createNode());
+    }
+    node = node.children.get(char);
+    node[field].add(id);
+  }
+};
+
+const lookup = (root, prefix) => {
+  let node = root;
+  for (const char of prefix.slice(0, MAX_PREFIX_LENGTH)) {
+    node = node.children.get(char);
+    if (!node) return null;
+  }
+  return node;
+};
+
+const buildIndex = (products) => {
+  const root = createNode();
+  const byId = new Map();
+  for (const product of products) {
+    const { description, ...summary } = product;
+    const nameWords = tokenize(product.name);
+    byId.set(product.id, { ...summary, key: nameWords.join(' ') });
+    new Set(nameWords).forEach(word => insert(root, word, product.id, 'name'));
+    new Set(tokenize(description)).forEach(word => insert(root, word, product.id, 'description'));
+  }
+  return { root, products: byId, builtAt: new Date().toISOString() };
+};
+
+let index = null;
+let dirty = true;
+let building = null;
+let rebuilds = 0;
+
+const load = async () => {
+  while (dirty) {
+    dirty = false;
+    try {
+      index = buildIndex(await Product.find({}, INDEX_FIELDS).lean());
+      rebuilds++;
+    } catch (error) {
+      dirty = true;
+      throw error;
+    }
+  }
+};
+
+// The trie, rebuilt first if a catalog change arrived since the last build.
+// Concurrent callers share one rebuild.
+const currentIndex = async () => {
+  while (dirty || !index) {
+    if (!building) {
+      building = load().finally(() => { building = null; });
+    }
+    await building;
+  }
+  return index;
+};
+
+export const rebuildSearchIndex = () => {
+  dirty = true;
+  return currentIndex();
+};
+
+onInvalidate('catalog', (scope) => {
+  if (!scope || scope === 'products') {
+    rebuildSearchIndex().catch(error => console.error('Failed to rebuild product search index:', error));
+  }
+});
+
+// Products matching every query word as a prefix (in name or description),
+// best first: more words matched in the name, then names starting with the
+// whole query, then by name
+const rankMatches = (trie, terms) => {
+  if (terms.length === 0) return [];
+  const nodes = [];
+  for (const term of terms) {
+    const node = lookup(trie.root, term);
+    if (!node) return [];
+    nodes.push(node);
+  }
+
+  const [first, ...rest] = nodes;
+  const phrase = terms.join(' ');
+  return [...new Set([...first.name, ...first.description])]
+    .filter(id => rest.every(node => node.name.has(id) || node.description.has(id)))
+    .map(id => {
+      const product = trie.products.get(id);
+      return {
+        product,
+        nameHits: nodes.filter(node => node.name.has(id)).length,
+        startsWith: product.key.startsWith(phrase)
+      };
+    })
+    .sort((a, b) => (
+      b.nameHits - a.nameHits ||
+      Number(b.startsWith) - Number(a.startsWith) ||
+      a.product.key.localeCompare(b.product.key)
+    ))
+    .map(({ product }) => product);
+};
+
+const parseNumber = (value, name) => {
+  const number = Number(value);
+  if (value === '' || !Number.isFinite(number) || number < 0) {
+    throw new Error(`${name} must be a non-negative number`);
+  }
+  return number;
+};
+
+const parseLimit = (value, fallback, max) => {
+  if (value === undefined) return fallback;
+  const limit = Number(value);
+  if (!Number.isInteger(limit) || limit < 1 || limit > max) {
+    throw new Error(`limit must be an integer between 1 and ${max}`);
+  }
+  return limit;
+};
+
+const parseInStock = (value) => {
+  if (value === undefined) return undefined;
+  if (value !== 'true' && value !== 'false') {
+    throw new Error('in_stock must be true or false');
+  }
+  return value === 'true';
+};
+
+const parseOffset = (value) => {
+  if (value === undefined) return 0;
+  const offset = Number(value);
+  if (!Number.isInteger(offset) || offset < 0 || offset > MAX_OFFSET) {
+    throw new Error(`offset must be an integer between 0 and ${MAX_OFFSET}`);
+  }
+  return offset;
+};
+
+const parseText = (value) => (typeof value === 'string' ? value.trim().slice(0, MAX_QUERY_LENGTH) : '');
+
+// Search options from the query string (throws with a client-facing message)
+export const parseSearchQuery = (query = {}) => {
+  const q = parseText(query.q);
+  const filter = {};
+
+  if (query.category) {
+    filter.category = String(query.category);
+  }
+  const inStock = parseInStock(query.in_stock);
+  if (inStock !== undefined) {
+    filter.in_stock = inStock;
+  }
+  if (query.min_price !== undefined || query.max_price !== undefined) {
+    filter.price = {};
+    if (query.min_price !== undefined) filter.price.$gte = parseNumber(query.min_price, 'min_price');
+    if (query.max_price !== undefined) filter.price.$lte = parseNumber(query.max_price, 'max_price');
+  }
+
+  const sort = query.sort || (q ? 'relevance' : 'name');
+  if (sort !== 'relevance' && !SORTS[sort]) {
+    throw new Error(`sort must be one of relevance, ${Object.keys(SORTS).join(', ')}`);
+  }
+
+  return {
+    q,
+    filter,
+    sort,
+    limit: parseLimit(query.limit, DEFAULT_LIMIT, MAX_LIMIT),
+    offset: parseOffset(query.offset),
+    fields: query.fields
+  };
+};
+
+const textSearch = async ({ q, filter, sort, limit, offset, fields }) => {
+  const projection = { ...buildProjection(Product, fields), score: { $meta: 'textScore' } };
+  const results = await Product.find({ ...filter, $text: { $search: q } }, projection)
+    .sort(sort === 'relevance' ? { score: { $meta: 'textScore' } } : SORTS[sort])
+    .skip(offset)
+    .limit(limit)
+    .lean();
+  return results.map(({ score, ...product }) => product);
+};
+
+export const searchProducts = async (options) => {
+  const { q, filter, sort, limit, offset, fields } = options;
+  const terms = tokenize(q);
+
+  if (terms.length === 0) {
+    return Product.find(filter, buildProjection(Product, fields))
+      .sort(SORTS[sort] || SORTS.name)
+      .skip(offset)
+      .limit(limit)
+      .lean();
+  }
+
+  const ranked = rankMatches(await currentIndex(), terms).map(product => product.id);
+  if (ranked.length === 0) {
+    return textSearch(options);
+  }
+
+  const query = { ...filter, id: { $in: ranked } };
+  if (sort !== 'relevance') {
+    return Product.find(query, buildProjection(Product, fields)).sort(SORTS[sort]).skip(offset).limit(limit).lean();
+  }
+
+  // Relevance order comes from the trie; id is needed to restore it
+  const results = await Product.find(query, buildProjection(Product, fields, ['id'])).lean();
+  const position = new Map(ranked.map((id, i) => [id, i]));
+  return results
+    .sort((a, b) => position.get(a.id) - position.get(b.id))
+    .slice(offset, offset + limit);
+};
+
+// Autocomplete options from the query string (throws with a client-facing message)
+export const parseAutocompleteQuery = (query = {}) => ({
+  q: parseText(query.q),
+  category: query.category ? String(query.category) : undefined,
+  inStock: parseInStock(query.in_stock),
+  limit: parseLimit(query.limit, DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS)
+});
+
+// Suggestions for search-as-you-type, served from memory
+export const autocomplete = async ({ q, category, inStock, limit }) => {
+  const terms = tokenize(q);
+  if (terms.length === 0) return [];
+
+  return rankMatches(await currentIndex(), terms)
+    .filter(product => (
+      (!category || product.category === category) &&
+      (inStock === undefined || product.in_stock === inStock)
+    ))
+    .slice(0, limit)
+    .map(({ key, ...product }) => product);
+};
+
+export const getSearchIndexStats = () => ({
+  products: index ? index.products.size : 0,
+  built_at: index ? index.builtAt : null,
+  rebuilds,
+  stale: dirty
+});
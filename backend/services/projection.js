@@ -0,0 +1,42 @@
+// Mongo projections for the list endpoints' ?fields=a,b,c selector.
+//
+// _id is always excluded by the query itself, so handlers can return lean
+// documents as-is instead of copying each one to drop it. Unknown field
+// names and internal (select: false) fields are ignored; `required` fields
+// (e.g. pagination keys) are always included when a selection is given.
+
+const selectable = new Map();
+
+const fieldsOf = (model) => {
+  if (!selectable.has(model.modelName)) {
+    selectable.set(
+      model.modelName,
+      new Set(Object.keys(model.schema.paths).filter(field => (
+        field !== '_id' && !field.includes('.') && model.schema.paths[field].options.select !== false
+      )))
+    );
+  }
+  return selectable.get(model.modelName);
+};
+
+// Valid requested fields, sorted and de-duplicated ('' for "all fields"), so
+// equivalent selections share a cache key
+export const normalizeFields = (model, fields, required = []) => {
+  if (!fields || typeof fields !== 'string') return '';
+  const known = fieldsOf(model);
+  const names = new Set(fields.split(',').map(field => field.trim()).filter(field => known.has(field)));
+  if (names.size === 0) return '';
+  required.forEach(field => names.add(field));
+  return [...names].sort().join(',');
+};
+
+export const buildProjection = (model, fields, required = []) => {
+  const projection = { _id: 0 };
+  const selected = normalizeFields(model, fields, required);
+  if (selected) {
+    for (const name of selected.split(',')) {
+      projection[name] = 1;
+    }
+  }
+  return projection;
+};
@@ -0,0 +1,113 @@
+import { getInFlight } from './lifecycle.js';
+import { createCounter } from './metrics.js';
+
+// In-memory token buckets and load shedding.
+//
+// createRateLimiter() gives each client IP a bucket of `burst` tokens that
+// refills at `perMinute`, plus one global bucket shared by all clients; a
+// request spends one token from each and is answered 429 with Retry-After
+// when either is empty. createLoadShedder() answers 503 while too many
+// requests are in flight or too many queries wait for a Mongo connection,
+// giving priority routes (checkout) twice the headroom.
+//
+// State is per process: under backend/server.py the global budget is split
+// across workers, per-IP budgets apply per worker. Client IPs come from
+// req.ip, i.e. X-Forwarded-For from trusted proxies (TRUST_PROXY, by default
+// loopback and private-network peers).
+
+const SWEEP_INTERVAL_MS = 60 * 1000;
+const MAX_TRACKED_IPS = 10000;
+const CLUSTER_WORKERS = Number(process.env.CLUSTER_WORKERS) || 1;
+
+const rejected = createCounter('http_requests_rejected_total', 'Requests answered 429/503 by rate limiting or load shedding');
+
+const createBucket = (perMinute, burst) => ({
+  rate: perMinute / 60000,
+  burst,
+  tokens: burst,
+  updated: Date.now()
+});
+
+const refill = (bucket, now) => {
+  bucket.tokens = Math.min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate);
+  bucket.updated = now;
+};
+
+// Milliseconds until the bucket holds a whole token again
+const waitFor = (bucket) => Math.ceil((1 - bucket.tokens) / bucket.rate);
+
+const reject = (res, status, retryAfterMs, detail) => {
+  res.set('Retry-After', String(Math.max(1, Math.ceil(retryAfterMs / 1000))));
+  res.status(status).json({ detail });
+};
+
+export const createRateLimiter = ({ name, perIpPerMinute, perIpBurst, globalPerMinute, globalBurst }) => {
+  const clients = new Map();
+  const global = globalPerMinute
+    ? createBucket(globalPerMinute / CLUSTER_WORKERS, Math.max(1, Math.ceil(globalBurst / CLUSTER_WORKERS)))
+    : null;
+
+  // Forget clients whose bucket has refilled completely
+  setInterval(() => {
+    const now = Date.now();
+    for (const [ip, bucket] of clients) {
+      refill(bucket, now);
+      if (bucket.tokens >= bucket.burst) clients.delete(ip);
+    }
+  }, SWEEP_INTERVAL_MS).unref();
+
+  return (req, res, next) => {
+    const now = Date.now();
+
+    let client = null;
+    if (perIpPerMinute) {
+      client = clients.get(req.ip);
+      if (!client) {
+        if (clients.size >= MAX_TRACKED_IPS) {
+          // Map iteration is insertion order: drop the oldest client
+          clients.delete(clients.keys().next().value);
+        }
+        client = createBucket(perIpPerMinute, perIpBurst);
+        clients.set(req.ip, client);
+      }
+      refill(client, now);
+      if (client.tokens < 1) {
+        rejected.inc({ limiter: name, scope: 'ip' });
+        return reject(res, 429, waitFor(client), 'Too many requests, please try again later');
+      }
+    }
+
+    if (global) {
+      refill(global, now);
+      if (global.tokens < 1) {
+        rejected.inc({ limiter: name, scope: 'global' });
+        return reject(res, 429, waitFor(global), 'Service is busy, please try again shortly');
+      }
+      global.tokens -= 1;
+    }
+    if (client) client.tokens -= 1;
+    next();
+  };
+};
+
+// Mongo connection-pool wait queue, fed by the driver's CMAP events
+let mongoWaiters = 0;
+
+export const instrumentMongoPool = (client) => {
+  client.on('connectionCheckOutStarted', () => { mongoWaiters++; });
+  // Clamped: a checkout already in progress when this attaches ends uncounted
+  const done = () => { mongoWaiters = Math.max(0, mongoWaiters - 1); };
+  client.on('connectionCheckedOut', done);
+  client.on('connectionCheckOutFailed', done);
+};
+
+export const getMongoWaiters = () => mongoWaiters;
+
+export const createLoadShedder = ({ maxInFlight, maxMongoWaiters, isPriority = () => false }) => (req, res, next) => {
+  const factor = isPriority(req) ? 2 : 1;
+  if (getInFlight() > maxInFlight * factor || mongoWaiters > maxMongoWaiters * factor) {
+    rejected.inc({ limiter: 'load_shed', scope: 'global' });
+    return reject(res, 503, 1000, 'Server is overloaded, please retry shortly');
+  }
+  next();
+};
@@ -0,0 +1,65 @@
+import { Order } from '../models/index.js';
+import { verifyAdminToken } from './adminAuth.js';
+
+// Socket.IO wiring for the admin dashboard.
+//
+// Order events carry customer details, so they go only to ADMIN_ROOM, which a
+// socket joins by presenting the token from POST /api/admin/verify in its
+// handshake (`auth: { token }`). After a reconnect the dashboard asks for
+// "orders:since" with the newest updated_at it has seen and merges the
+// changed orders instead of reloading the list.
+
+export const ADMIN_ROOM = 'admins';
+
+const CATCHUP_LIMIT = 500;
+// Orders are stamped by whichever worker handled them; look back a little so
+// small clock differences between workers can't hide an update
+const CATCHUP_SKEW_MS = 5000;
+
+const ordersSince = async (since) => {
+  const from = new Date(new Date(since).getTime() - CATCHUP_SKEW_MS).toISOString();
+  const orders = await Order.find({ updated_at: { $gte: from } }, { _id: 0 })
+    .sort({ updated_at: 1 })
+    .limit(CATCHUP_LIMIT + 1)
+    .lean();
+
+  // Too far behind: the client is better off reloading its first page
+  if (orders.length > CATCHUP_LIMIT) {
+    return { reset: true };
+  }
+  return { orders, reset: false };
+};
+
+export const attachRealtime = (io) => {
+  // A wrong or expired token is rejected so the dashboard can ask for the PIN
+  // again; sockets without one connect but never receive order events
+  io.use((socket, next) => {
+    const { token } = socket.handshake.auth || {};
+    if (token === undefined) {
+      return next();
+    }
+    if (!verifyAdminToken(token)) {
+      return next(new Error('Unauthorized'));
+    }
+    socket.data.admin = true;
+    next();
+  });
+
+  io.on('connection', (socket) => {
+    if (!socket.data.admin) return;
+    socket.join(ADMIN_ROOM);
+
+    socket.on('orders:since', async (since, ack) => {
+      if (typeof ack !== 'function') return;
+      if (Number.isNaN(new Date(since).getTime())) {
+        return ack({ error: 'Invalid cursor' });
+      }
+      try {
+        ack(await ordersSince(since));
+      } catch (error) {
+        console.error('Error loading order catch-up:', error);
+        ack({ error: 'Internal server error' });
+      }
+    });
+  });
+};
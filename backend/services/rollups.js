@@ -0,0 +1,230 @@
+import { Order, DailyRollup } from '../models/index.js';
+
+// Daily order rollups for the admin dashboard.
+//
+// Every order adds to the DailyRollup of its UTC day (order count, revenue,
+// and per status/hour/product/pincode buckets) with one $inc upsert, and a
+// status change moves it between status buckets. Dashboard summaries then
+// read one small document per day instead of scanning orders.
+// rebuildRollups() recomputes everything from the orders collection, for
+// repairing drift; backfillRollups() runs it at startup while there are no
+// rollups yet, so orders placed before they existed are counted.
+
+const TOP_LIMIT = 10;
+const MAX_TOP_LIMIT = 100;
+
+// Product ids and pincodes come from the request body; '.' and '$' would
+// turn into nested paths or operators
+const safeKey = (value) => String(value ?? '').replace(/[.$]/g, '_') || '_';
+
+const dayOf = (createdAt) => createdAt.slice(0, 10);
+const hourOf = (createdAt) => createdAt.slice(11, 13);
+
+const add = (target, path, value) => {
+  target[path] = (target[path] || 0) + value;
+};
+
+// $inc/$set for adding (sign 1) or removing (sign -1) an order
+const orderUpdate = (order, sign) => {
+  const total = Number(order.total) || 0;
+  const inc = {};
+  const set = {};
+
+  add(inc, 'orders', sign);
+  add(inc, 'revenue', sign * total);
+  for (const prefix of [
+    `statuses.${safeKey(order.status)}`,
+    `hours.${hourOf(order.created_at)}`,
+    `pincodes.${safeKey(order.pincode)}`
+  ]) {
+    add(inc, `${prefix}.orders`, sign);
+    add(inc, `${prefix}.revenue`, sign * total);
+  }
+  for (const item of order.items || []) {
+    const key = safeKey(item.product_id);
+    const quantity = Number(item.quantity) || 0;
+    add(inc, `products.${key}.quantity`, sign * quantity);
+    add(inc, `products.${key}.revenue`, sign * quantity * (Number(item.price) || 0));
+    set[`products.${key}.name`] = item.name;
+  }
+  return { inc, set };
+};
+
+const upsertDay = async (day, update) => {
+  try {
+    await DailyRollup.updateOne({ day }, update, { upsert: true });
+  } catch (error) {
+    // Two first orders of a day can race on the upsert; the loser retries
+    // against the document the winner created
+    if (error.code !== 11000) throw error;
+    await DailyRollup.updateOne({ day }, update);
+  }
+};
+
+export const recordOrderCreated = async (order) => {
+  const { inc, set } = orderUpdate(order, 1);
+  await upsertDay(dayOf(order.created_at), { $inc: inc, $set: set });
+};
+
+// `before` is the order as it was before the change (status, total, created_at)
+export const recordStatusChange = async (before, status) => {
+  if (!before || before.status === status) return;
+  const total = Number(before.total) || 0;
+  const from = `statuses.${safeKey(before.status)}`;
+  const to = `statuses.${safeKey(status)}`;
+  const result = await DailyRollup.updateOne(
+    { day: dayOf(before.created_at), [`${from}.orders`]: { $gte: 1 } },
+    {
+      $inc: {
+        [`${from}.orders`]: -1,
+        [`${from}.revenue`]: -total,
+        [`${to}.orders`]: 1,
+        [`${to}.revenue`]: total
+      }
+    }
+  );
+  if (result.matchedCount === 0) {
+    // Never drive a count negative; a rebuild repairs whatever drifted
+    console.warn(`Rollup for ${dayOf(before.created_at)} has no ${before.status} order to move; rebuild the rollups`);
+  }
+};
+
+// True when an order was placed or changed status within the last `ms`
+export const ordersChangedWithin = async (ms) => {
+  const since = new Date(Date.now() - ms).toISOString();
+  return Boolean(await Order.exists({
+    $or: [{ created_at: { $gte: since } }, { updated_at: { $gte: since } }]
+  }));
+};
+
+const applyInc = (doc, inc) => {
+  for (const [path, value] of Object.entries(inc)) {
+    const keys = path.split('.');
+    const last = keys.pop();
+    let node = doc;
+    for (const key of keys) {
+      node = node[key] ??= {};
+    }
+    node[last] = (node[last] || 0) + value;
+  }
+};
+
+// Recompute every day from the orders collection. Orders placed while this
+// runs may be counted twice or not at all, so run it when the shop is quiet.
+export const rebuildRollups = async () => {
+  const days = new Map();
+  const cursor = Order.find({}, { _id: 0, status: 1, total: 1, created_at: 1, pincode: 1, items: 1 })
+    .lean()
+    .cursor();
+
+  let orders = 0;
+  for await (const order of cursor) {
+    const day = dayOf(order.created_at);
+    if (!days.has(day)) {
+      days.set(day, { day, orders: 0, revenue: 0, statuses: {}, hours: {}, products: {}, pincodes: {} });
+    }
+    const doc = days.get(day);
+    const { inc, set } = orderUpdate(order, 1);
+    applyInc(doc, inc);
+    for (const [path, name] of Object.entries(set)) {
+      const key = path.split('.')[1];
+      doc.products[key].name = name;
+    }
+    orders++;
+  }
+
+  if (days.size > 0) {
+    await DailyRollup.bulkWrite(
+      [...days.values()].map(doc => ({
+        replaceOne: { filter: { day: doc.day }, replacement: doc, upsert: true }
+      })),
+      { ordered: false }
+    );
+  }
+  await DailyRollup.deleteMany({ day: { $nin: [...days.keys()] } });
+
+  return { days: days.size, orders };
+};
+
+// Build the rollups from existing orders on first start; null once they exist.
+// Orders placed while it runs can be missed, which a later rebuild repairs.
+export const backfillRollups = async () => {
+  if (await DailyRollup.exists({})) return null;
+  return rebuildRollups();
+};
+
+const round = (value) => Math.round(value * 100) / 100;
+
+const mergeBuckets = (target, source = {}) => {
+  for (const [key, bucket] of Object.entries(source)) {
+    const merged = target[key] ??= {};
+    for (const [field, value] of Object.entries(bucket)) {
+      if (typeof value === 'number') {
+        merged[field] = (merged[field] || 0) + value;
+      } else {
+        merged[field] = value;
+      }
+    }
+  }
+  return target;
+};
+
+const roundBuckets = (buckets) => {
+  for (const bucket of Object.values(buckets)) {
+    if (bucket.revenue !== undefined) bucket.revenue = round(bucket.revenue);
+  }
+  return buckets;
+};
+
+const top = (buckets, keyName, sortField, limit) => Object.entries(buckets)
+  .map(([key, bucket]) => ({ [keyName]: key, ...bucket }))
+  .filter(entry => entry[sortField] > 0)
+  .sort((a, b) => b[sortField] - a[sortField])
+  .slice(0, limit)
+  .map(entry => ({ ...entry, revenue: round(entry.revenue || 0) }));
+
+// Dashboard summary over [from, to] (inclusive YYYY-MM-DD days; both optional)
+export const summarizeRollups = async ({ from, to, limit } = {}) => {
+  const query = {};
+  if (from || to) {
+    query.day = {};
+    if (from) query.day.$gte = from;
+    if (to) query.day.$lte = to;
+  }
+  const topLimit = Math.min(Math.max(Math.trunc(Number(limit)) || TOP_LIMIT, 1), MAX_TOP_LIMIT);
+  const rollups = await DailyRollup.find(query, { _id: 0 }).sort({ day: 1 }).lean();
+
+  const totals = { orders: 0, revenue: 0, statuses: {} };
+  const hours = {};
+  const products = {};
+  const pincodes = {};
+  const days = [];
+
+  for (const rollup of rollups) {
+    totals.orders += rollup.orders;
+    totals.revenue += rollup.revenue;
+    mergeBuckets(totals.statuses, rollup.statuses);
+    mergeBuckets(hours, rollup.hours);
+    mergeBuckets(products, rollup.products);
+    mergeBuckets(pincodes, rollup.pincodes);
+    days.push({
+      day: rollup.day,
+      orders: rollup.orders,
+      revenue: round(rollup.revenue),
+      statuses: roundBuckets(rollup.statuses || {})
+    });
+  }
+
+  totals.revenue = round(totals.revenue);
+  roundBuckets(totals.statuses);
+
+  return {
+    from: from || null,
+    to: to || null,
+    totals,
+    days,
+    hours: roundBuckets(hours),
+    top_products: top(products, 'product_id', 'quantity', topLimit),
+    top_pincodes: top(pincodes, 'pincode', 'orders', topLimit)
+  };
+};
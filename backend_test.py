@@ -2,19 +2,43 @@
 """
 Backend API Test Suite for Fresh Meat Hub
 Tests the Node.js + Express backend endpoints
+
+Usage:
+    python backend_test.py                      # functional checks
+    python backend_test.py --base-url http://localhost:8001/api
+    python backend_test.py --load --base-url http://localhost:8001/api --concurrency 20 --json run.json
+    python backend_test.py --load --start-server --rps 50
+
+--start-server runs a throwaway backend against a local mongod (--mongo-url,
+default mongodb://127.0.0.1:27017) in a fresh database seeded through
+/api/init-data and dropped on exit, with WhatsApp and email disabled, so
+nothing from backend/.env (the real database, CallMeBot, Gmail) is touched. Load mode needs --base-url or --start-server; it never
+defaults to the remote preview URL.
 """
 
+import argparse
+import math
+import os
+import random
+import subprocess
+import threading
+import time
+import uuid
 import requests
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Dict, Any, List
 
-# Use the production URL from frontend/.env
-BASE_URL = "https://chicken-order-debug.preview.emergentagent.com/api"
+# Use the production URL from frontend/.env unless overridden
+BASE_URL = os.environ.get("BACKEND_TEST_BASE_URL", "https://chicken-order-debug.preview.emergentagent.com/api")
+
+BACKEND_DIR = Path(__file__).parent / "backend"
 
 class APITester:
-    def __init__(self):
-        self.base_url = BASE_URL
+    def __init__(self, base_url: str = BASE_URL):
+        self.base_url = base_url
         self.session = requests.Session()
         self.test_results = []
         self.created_ids = {
@@ -379,13 +403,13 @@ class APITester:
             order_id = data['id']
             self.created_ids['orders'].append(order_id)
             
-            # Check if response was quick (under 20 seconds as requested)
-            if response_time <= 20:
+            # Notifications are queued in the outbox, so creation should not wait on SMTP/WhatsApp
+            if response_time <= 5:
                 self.log_test("Order creation with email", True, 
                             f"Status: {status}, ID: {order_id}, Response time: {response_time:.2f}s")
             else:
                 self.log_test("Order creation with email", False, 
-                            f"Status: {status}, ID: {order_id}, Response time: {response_time:.2f}s (>20s - too slow)")
+                            f"Status: {status}, ID: {order_id}, Response time: {response_time:.2f}s (>5s - too slow)")
         else:
             self.log_test("Order creation with email", False, 
                         f"Status: {status}, Response time: {response_time:.2f}s, Response: {data}")
@@ -477,21 +501,322 @@ class APITester:
         
         return passed == total
 
+
+# Default traffic mix for load mode: mostly catalog browsing, some checkout
+# pincode checks, a few orders
+DEFAULT_MIX = "browse=70,pincode=25,order=5"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse 'browse=70,pincode=25,order=5' into scenario weights"""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in LoadTester.SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', expected one of: {', '.join(LoadTester.SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadTester:
+    """Drives a weighted mix of scenarios from a thread pool and records
+    per-endpoint latency. Each worker thread has its own requests.Session so
+    connections are kept alive per worker, like independent browsers."""
+
+    SCENARIOS = ('browse', 'pincode', 'order')
+
+    def __init__(self, base_url: str, mix: Dict[str, float], concurrency: int = 10,
+                 duration: float = 30.0, rps: float = None, timeout: float = 30.0):
+        self.base_url = base_url
+        self.mix = mix
+        self.concurrency = concurrency
+        self.duration = duration
+        self.rps = rps
+        self.timeout = timeout
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.next_slot = 0.0
+        self.categories = ['Chicken']
+        self.pincodes = ['500001']
+
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def record(self, endpoint: str, latency: float, ok: bool, status: int):
+        with self.lock:
+            stats = self.samples.setdefault(endpoint, {'latencies': [], 'errors': 0, 'statuses': {}})
+            stats['latencies'].append(latency)
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+            if not ok:
+                stats['errors'] += 1
+
+    def call(self, endpoint: str, method: str, path: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session().request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+            ok, status = response.status_code < 400, response.status_code
+        except requests.exceptions.RequestException:
+            ok, status = False, 0
+        self.record(endpoint, time.perf_counter() - start, ok, status)
+
+    def prepare(self):
+        """Fetch real category names and pincodes so requests hit live data"""
+        try:
+            categories = requests.get(f"{self.base_url}/categories", timeout=self.timeout).json()
+            pincodes = requests.get(f"{self.base_url}/pincodes", timeout=self.timeout).json()
+            self.categories = [c['name'] for c in categories] or self.categories
+            self.pincodes = [p['code'] for p in pincodes if p.get('active', True)] or self.pincodes
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError):
+            pass
+
+    def scenario_browse(self):
+        self.call('GET /categories', 'GET', '/categories')
+        self.call('GET /products', 'GET', '/products')
+        self.call('GET /products?category', 'GET', '/products', params={'category': random.choice(self.categories)})
+
+    def scenario_pincode(self):
+        # Mix of serviceable and unknown codes, as typed at checkout
+        code = random.choice(self.pincodes) if random.random() < 0.8 else f"{random.randint(100000, 999999)}"
+        self.call('GET /pincodes/verify/:code', 'GET', f'/pincodes/verify/{code}')
+
+    def scenario_order(self):
+        quantity = random.randint(1, 3)
+        order = {
+            'customer_name': 'Load Test',
+            'phone': '9000000000',
+            'address': 'Load test address',
+            'pincode': random.choice(self.pincodes),
+            'items': [{'product_id': 'load-test', 'name': 'Load Test Item', 'price': 100, 'quantity': quantity, 'unit': '500g'}],
+            'total': 100 * quantity
+        }
+        self.call('POST /orders', 'POST', '/orders', json=order)
+
+    def wait_for_slot(self):
+        """Pace scenario starts to the target rate across all workers"""
+        if not self.rps:
+            return
+        with self.lock:
+            now = time.perf_counter()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + 1.0 / self.rps
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def worker(self, deadline: float):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            self.wait_for_slot()
+            if time.perf_counter() >= deadline:
+                break
+            scenario = random.choices(names, weights)[0]
+            getattr(self, f'scenario_{scenario}')()
+
+    def run(self) -> Dict[str, Any]:
+        self.prepare()
+        target = f"{self.rps} scenarios/s" if self.rps else "unthrottled"
+        print(f"🚀 Load test against {self.base_url}")
+        print(f"   mix={self.mix} concurrency={self.concurrency} duration={self.duration}s rate={target}")
+
+        started = time.perf_counter()
+        deadline = started + self.duration
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for _ in range(self.concurrency):
+                pool.submit(self.worker, deadline)
+        elapsed = time.perf_counter() - started
+
+        return self.summarize(elapsed)
+
+    def summarize(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        total_requests = total_errors = 0
+        for endpoint, stats in sorted(self.samples.items()):
+            latencies = sorted(stats['latencies'])
+            count = len(latencies)
+            total_requests += count
+            total_errors += stats['errors']
+            endpoints[endpoint] = {
+                'requests': count,
+                'errors': stats['errors'],
+                'error_rate': stats['errors'] / count if count else 0.0,
+                'throughput_rps': count / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+                'statuses': {str(k): v for k, v in sorted(stats['statuses'].items())}
+            }
+        return {
+            'base_url': self.base_url,
+            'mix': self.mix,
+            'concurrency': self.concurrency,
+            'target_rps': self.rps,
+            'duration_s': elapsed,
+            'requests': total_requests,
+            'errors': total_errors,
+            'throughput_rps': total_requests / elapsed if elapsed else 0.0,
+            'endpoints': endpoints
+        }
+
+
+def print_load_report(report: Dict[str, Any]):
+    print("=" * 100)
+    print("📊 LOAD TEST SUMMARY")
+    print("=" * 100)
+    print(f"{'endpoint':<30}{'reqs':>8}{'rps':>9}{'err%':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<30}{stats['requests']:>8}{stats['throughput_rps']:>9.1f}{stats['error_rate'] * 100:>7.1f}%"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print("-" * 100)
+    print(f"Total: {report['requests']} requests in {report['duration_s']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s), {report['errors']} errors")
+
+
+# Run with the backend's own mongoose, so no Python MongoDB driver is needed
+DROP_DATABASE_SCRIPT = """
+import mongoose from 'mongoose';
+const [url, db] = process.argv.slice(1);
+await mongoose.connect(url, { dbName: db });
+await mongoose.connection.dropDatabase();
+await mongoose.disconnect();
+"""
+
+
+def drop_database(mongo_url: str, db_name: str):
+    """Remove a --start-server database (best effort)"""
+    try:
+        subprocess.run(["node", "--input-type=module", "-e", DROP_DATABASE_SCRIPT, mongo_url, db_name],
+                       cwd=str(BACKEND_DIR), check=True, timeout=30)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"⚠️  Could not drop test database {db_name}: {e}")
+
+
+def start_local_server(port: int, mongo_url: str, db_name: str, timeout: float = 30.0) -> subprocess.Popen:
+    """Start the backend through backend/server.py, wait for /api/ready and
+    seed the default catalog and pincodes, so load runs measure real data.
+    Everything that would reach real services is overridden here; dotenv does
+    not replace variables that are already set, so backend/.env can't win."""
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        MONGO_URL=mongo_url,
+        DB_NAME=db_name,
+        # Empty credentials: notifications are skipped, never sent
+        WHATSAPP_API_KEY="",
+        WHATSAPP_API_URL="http://127.0.0.1:9/whatsapp.php",
+        WHATSAPP_PHONE="",
+        EMAIL_USER="",
+        EMAIL_PASS="",
+        ADMIN_EMAIL="",
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT="9",
+        # One client IP generates all the load; don't measure the order limiter
+        RATE_LIMIT_ORDERS_IP_PER_MIN="1000000",
+        RATE_LIMIT_ORDERS_IP_BURST="100000",
+        RATE_LIMIT_ORDERS_GLOBAL_PER_MIN="1000000",
+        RATE_LIMIT_ORDERS_GLOBAL_BURST="100000",
+    )
+    process = subprocess.Popen([sys.executable, str(BACKEND_DIR / "server.py")], env=env)
+    api_url = f"http://127.0.0.1:{port}/api"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"backend exited with code {process.returncode}")
+        try:
+            if requests.get(f"{api_url}/ready", timeout=1).status_code == 200:
+                break
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.25)
+    else:
+        process.terminate()
+        raise RuntimeError(f"backend did not become ready on port {port} within {timeout}s")
+
+    try:
+        requests.post(f"{api_url}/init-data", timeout=30).raise_for_status()
+    except requests.exceptions.RequestException as e:
+        process.terminate()
+        raise RuntimeError(f"could not seed the test database: {e}")
+    return process
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fresh Meat Hub API tests and load generator")
+    parser.add_argument('--base-url', default=None, help=f"API base URL (default: {BASE_URL})")
+    parser.add_argument('--start-server', action='store_true',
+                        help="start a local backend via backend/server.py and test against it")
+    parser.add_argument('--port', type=int, default=8001, help="port for --start-server (default: 8001)")
+    parser.add_argument('--mongo-url', default=os.environ.get("TEST_MONGO_URL", "mongodb://127.0.0.1:27017"),
+                        help="MongoDB for --start-server (default: $TEST_MONGO_URL or mongodb://127.0.0.1:27017)")
+    parser.add_argument('--load', action='store_true', help="run the load generator instead of functional checks")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--concurrency', type=int, default=10, help="worker threads (default: 10)")
+    parser.add_argument('--rps', type=float, default=None, help="target scenario starts per second (default: unthrottled)")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to run (default: 30)")
+    parser.add_argument('--json', dest='json_path', default=None, help="write the load report as JSON to this file")
+    return parser.parse_args(argv)
+
 def main():
     """Main test runner"""
-    tester = APITester()
-    
+    args = parse_args()
+    if args.load and not (args.base_url or args.start_server):
+        sys.exit("--load needs --base-url or --start-server (it never targets the preview URL by default)")
+    base_url = args.base_url or BASE_URL
+    server = None
+    db_name = f"backend_test_{uuid.uuid4().hex[:8]}"
+
+    if args.start_server:
+        try:
+            server = start_local_server(args.port, args.mongo_url, db_name)
+        except RuntimeError:
+            drop_database(args.mongo_url, db_name)
+            raise
+        base_url = args.base_url or f"http://127.0.0.1:{args.port}/api"
+
     try:
-        success = tester.run_all_tests()
-        sys.exit(0 if success else 1)
-    except KeyboardInterrupt:
-        print("\n⚠️  Tests interrupted by user")
-        tester.cleanup()
-        sys.exit(1)
-    except Exception as e:
-        print(f"\n💥 Unexpected error: {e}")
-        tester.cleanup()
-        sys.exit(1)
+        if args.load:
+            tester = LoadTester(base_url, parse_mix(args.mix), concurrency=args.concurrency,
+                                duration=args.duration, rps=args.rps)
+            report = tester.run()
+            print_load_report(report)
+            if args.json_path:
+                with open(args.json_path, 'w') as f:
+                    json.dump(report, f, indent=2)
+                print(f"📝 Report written to {args.json_path}")
+            sys.exit(0)
+
+        tester = APITester(base_url)
+        try:
+            success = tester.run_all_tests()
+            sys.exit(0 if success else 1)
+        except KeyboardInterrupt:
+            print("\n⚠️  Tests interrupted by user")
+            tester.cleanup()
+            sys.exit(1)
+        except Exception as e:
+            print(f"\n💥 Unexpected error: {e}")
+            tester.cleanup()
+            sys.exit(1)
+    finally:
+        if server:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            finally:
+                drop_database(args.mongo_url, db_name)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -5,9 +5,13 @@ import { Button } from './ui/button';
 import { Badge } from './ui/badge';
 import { Card, CardContent } from './ui/card';
 
+// Matches the product grid: 1 column on mobile up to 4 on wide screens
+const IMAGE_SIZES = '(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw';
+
 export const ProductCard = ({ product }) => {
   const { addToCart, items } = useCart();
   const inCart = items.some(item => item.product_id === product.id);
+  const variants = product.image_variants;
 
   const handleAddToCart = () => {
     if (product.in_stock) {
@@ -21,11 +25,27 @@ export const ProductCard = ({ product }) => {
       data-testid={`product-card-${product.id}`}
     >
       <div className="relative img-zoom aspect-square">
-        <img
-          src={product.image || 'https://images.pexels.com/photos/618773/pexels-photo-618773.jpeg'}
-          alt={product.name}
-          className="w-full h-full object-cover"
-        />
+        {variants ? (
+          <picture>
+            <source type="image/webp" srcSet={variants.srcset_webp} sizes={IMAGE_SIZES} />
+            <img
+              src={variants.src}
+              srcSet={variants.srcset_jpeg}
+              sizes={IMAGE_SIZES}
+              alt={product.name}
+              loading="lazy"
+              decoding="async"
+              className="w-full h-full object-cover"
+            />
+          </picture>
+        ) : (
+          <img
+            src={product.image || 'https://images.pexels.com/photos/618773/pexels-photo-618773.jpeg'}
+            alt={product.name}
+            loading="lazy"
+            className="w-full h-full object-cover"
+          />
+        )}
         {!product.in_stock && (
           <div className="absolute inset-0 bg-stone-900/60 flex items-center justify-center">
             <Badge
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback, useMemo } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { io } from 'socket.io-client';
@@ -58,10 +58,36 @@ import { format } from 'date-fns';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const ORDERS_PAGE_SIZE = 50;
+
+// Apply orders changed while the socket was down: known ones are replaced,
+// new ones go on top, newest first
+const mergeOrders = (current, changed) => {
+  const byId = new Map(changed.map(order => [order.id, order]));
+  const merged = current.map(order => byId.get(order.id) || order);
+  const known = new Set(current.map(order => order.id));
+  const added = changed
+    .filter(order => !known.has(order.id))
+    .sort((a, b) => b.created_at.localeCompare(a.created_at));
+  return [...added, ...merged];
+};
+
+// Same test the server applies for the list's status/date filters (date is
+// a yyyy-MM-dd UTC day), so pushed orders only show up where they belong
+const matchesOrderFilters = (order, status, date) => (
+  (status === 'all' || order.status === status) &&
+  (!date || order.created_at.startsWith(date))
+);
+
+const latestUpdate = (orders, since) => orders.reduce(
+  (latest, order) => (order.updated_at && order.updated_at > latest ? order.updated_at : latest),
+  since
+);
 
 const Admin = () => {
   const navigate = useNavigate();
   const [authenticated, setAuthenticated] = useState(false);
+  const [adminToken, setAdminToken] = useState(null);
   const [pin, setPin] = useState('');
   const [pinError, setPinError] = useState('');
   const [loading, setLoading] = useState(false);
@@ -69,8 +95,11 @@ const Admin = () => {
   // Data states
   const [products, setProducts] = useState([]);
   const [orders, setOrders] = useState([]);
+  const [ordersCursor, setOrdersCursor] = useState(null);
+  const [loadingMoreOrders, setLoadingMoreOrders] = useState(false);
   const [categories, setCategories] = useState([]);
   const [pincodes, setPincodes] = useState([]);
+  const [summary, setSummary] = useState(null);
   
   // Filter states
   const [orderDateFilter, setOrderDateFilter] = useState(null);
@@ -87,16 +116,68 @@ const Admin = () => {
   // Notifications
   const [notifications, setNotifications] = useState([]);
 
-  // Socket connection
+  // Newest updated_at seen, used to catch up after a reconnect
+  const ordersSinceRef = useRef('');
+  const fetchOrdersRef = useRef(null);
+  const orderFilterRef = useRef(() => true);
+  const summaryTimerRef = useRef(null);
+
+  // Dashboard totals come from the server-side daily rollups
+  const fetchSummary = useCallback(async () => {
+    try {
+      const res = await axios.get(`${API}/dashboard/summary`);
+      setSummary(res.data);
+    } catch (error) {
+      console.error('Error fetching dashboard summary:', error);
+    }
+  }, []);
+
+  // Order events arrive in bursts; refresh the totals once per burst
+  const scheduleSummaryRefresh = useCallback(() => {
+    clearTimeout(summaryTimerRef.current);
+    summaryTimerRef.current = setTimeout(fetchSummary, 2000);
+  }, [fetchSummary]);
+
+  useEffect(() => () => clearTimeout(summaryTimerRef.current), []);
+
+  // Socket connection (the token admits it to the admin room)
   useEffect(() => {
-    if (!authenticated) return;
+    if (!authenticated || !adminToken) return;
 
     const socket = io(BACKEND_URL, {
-      transports: ['websocket', 'polling']
+      transports: ['websocket', 'polling'],
+      auth: { token: adminToken }
+    });
+
+    // Fires on every (re)connect; fetch only what changed while disconnected
+    socket.on('connect', () => {
+      if (!ordersSinceRef.current) return;
+      socket.emit('orders:since', ordersSinceRef.current, (result) => {
+        if (result.error) return;
+        if (result.reset) {
+          fetchOrdersRef.current().catch(() => toast.error('Failed to fetch orders'));
+          return;
+        }
+        ordersSinceRef.current = latestUpdate(result.orders, ordersSinceRef.current);
+        setOrders(prev => mergeOrders(prev, result.orders).filter(orderFilterRef.current));
+        if (result.orders.length) scheduleSummaryRefresh();
+      });
+    });
+
+    socket.on('connect_error', (error) => {
+      if (error.message === 'Unauthorized') {
+        toast.error('Session expired. Please enter the PIN again.');
+        setAuthenticated(false);
+        setAdminToken(null);
+      }
     });
 
     socket.on('orderPlaced', (order) => {
-      setOrders(prev => [order, ...prev]);
+      ordersSinceRef.current = latestUpdate([order], ordersSinceRef.current);
+      if (orderFilterRef.current(order)) {
+        setOrders(prev => [order, ...prev]);
+      }
+      scheduleSummaryRefresh();
       setNotifications(prev => [{
         id: Date.now(),
         message: `New order from ${order.customer_name}`,
@@ -105,26 +186,60 @@ const Admin = () => {
       toast.success(`New order received from ${order.customer_name}!`);
     });
 
-    socket.on('orderStatusUpdated', ({ order_id, status }) => {
+    socket.on('orderStatusUpdated', ({ order_id, status, updated_at }) => {
+      ordersSinceRef.current = latestUpdate([{ updated_at }], ordersSinceRef.current);
       setOrders(prev => prev.map(o =>
-        o.id === order_id ? { ...o, status } : o
-      ));
+        o.id === order_id ? { ...o, status, updated_at } : o
+      ).filter(orderFilterRef.current));
+      scheduleSummaryRefresh();
     });
 
     return () => socket.disconnect();
-  }, [authenticated]);
+  }, [authenticated, adminToken, scheduleSummaryRefresh]);
+
+  // Fetch one page of orders (filtered server-side); no cursor = first page
+  const fetchOrders = useCallback(async (cursor = null) => {
+    const params = { limit: ORDERS_PAGE_SIZE };
+    if (cursor) params.cursor = cursor;
+    if (orderStatusFilter !== 'all') params.status = orderStatusFilter;
+    if (orderDateFilter) {
+      const dateStr = format(orderDateFilter, 'yyyy-MM-dd');
+      params.from = dateStr;
+      params.to = dateStr;
+    }
+
+    const res = await axios.get(`${API}/orders`, { params });
+    ordersSinceRef.current = latestUpdate(res.data.orders, ordersSinceRef.current);
+    setOrders(prev => (cursor ? [...prev, ...res.data.orders] : res.data.orders));
+    setOrdersCursor(res.data.next_cursor);
+  }, [orderDateFilter, orderStatusFilter]);
+  fetchOrdersRef.current = fetchOrders;
+  orderFilterRef.current = (order) => matchesOrderFilters(
+    order,
+    orderStatusFilter,
+    orderDateFilter ? format(orderDateFilter, 'yyyy-MM-dd') : null
+  );
+
+  const handleLoadMoreOrders = async () => {
+    setLoadingMoreOrders(true);
+    try {
+      await fetchOrders(ordersCursor);
+    } catch (error) {
+      toast.error('Failed to load more orders');
+    } finally {
+      setLoadingMoreOrders(false);
+    }
+  };
 
   // Fetch data
   const fetchData = useCallback(async () => {
     try {
-      const [productsRes, ordersRes, categoriesRes, pincodesRes] = await Promise.all([
+      const [productsRes, categoriesRes, pincodesRes] = await Promise.all([
         axios.get(`${API}/products`),
-        axios.get(`${API}/orders`),
         axios.get(`${API}/categories`),
         axios.get(`${API}/pincodes`)
       ]);
       setProducts(productsRes.data);
-      setOrders(ordersRes.data);
       setCategories(categoriesRes.data);
       setPincodes(pincodesRes.data);
     } catch (error) {
@@ -136,8 +251,19 @@ const Admin = () => {
   useEffect(() => {
     if (authenticated) {
       fetchData();
+      fetchSummary();
+    }
+  }, [authenticated, fetchData, fetchSummary]);
+
+  // Orders reload from the first page whenever the filters change
+  useEffect(() => {
+    if (authenticated) {
+      fetchOrders().catch((error) => {
+        console.error('Error fetching orders:', error);
+        toast.error('Failed to fetch orders');
+      });
     }
-  }, [authenticated, fetchData]);
+  }, [authenticated, fetchOrders]);
 
   // PIN verification
   const handlePinSubmit = async (e) => {
@@ -146,9 +272,13 @@ const Admin = () => {
     setLoading(true);
 
     try {
-      await axios.post(`${API}/admin/verify`, { pin });
+      const res = await axios.post(`${API}/admin/verify`, { pin });
+      setAdminToken(res.data.token);
       setAuthenticated(true);
       toast.success('Welcome to Admin Dashboard');
+      if (!res.data.token) {
+        toast.warning('Live order updates are unavailable; refresh to see new orders');
+      }
     } catch (error) {
       setPinError('Invalid PIN. Please try again.');
     } finally {
@@ -158,25 +288,11 @@ const Admin = () => {
 
   const handleLogout = () => {
     setAuthenticated(false);
+    setAdminToken(null);
     setPin('');
   };
 
-  // Filtered data
-  const filteredOrders = useMemo(() => {
-    let result = [...orders];
-    
-    if (orderDateFilter) {
-      const dateStr = format(orderDateFilter, 'yyyy-MM-dd');
-      result = result.filter(o => o.created_at.startsWith(dateStr));
-    }
-    
-    if (orderStatusFilter !== 'all') {
-      result = result.filter(o => o.status === orderStatusFilter);
-    }
-    
-    return result;
-  }, [orders, orderDateFilter, orderStatusFilter]);
-
+  // Filtered data (orders are filtered by the server)
   const filteredProducts = useMemo(() => {
     let result = [...products];
     
@@ -230,7 +346,9 @@ const Admin = () => {
     try {
       await axios.put(`${API}/orders/${orderId}/status`, { status });
       toast.success('Order status updated');
-      fetchData();
+      setOrders(prev => prev.map(o =>
+        o.id === orderId ? { ...o, status } : o
+      ).filter(orderFilterRef.current));
     } catch (error) {
       toast.error('Failed to update status');
     }
@@ -381,7 +499,9 @@ const Admin = () => {
                 </div>
                 <div>
                   <p className="text-sm text-stone-500">Total Orders</p>
-                  <p className="font-display text-2xl font-bold text-stone-900">{orders.length}</p>
+                  <p className="font-display text-2xl font-bold text-stone-900">
+                    {summary ? summary.totals.orders : orders.length}
+                  </p>
                 </div>
               </div>
             </CardContent>
@@ -395,7 +515,9 @@ const Admin = () => {
                 <div>
                   <p className="text-sm text-stone-500">Pending Orders</p>
                   <p className="font-display text-2xl font-bold text-stone-900">
-                    {orders.filter(o => o.status === 'pending').length}
+                    {summary
+                      ? summary.totals.statuses.pending?.orders || 0
+                      : orders.filter(o => o.status === 'pending').length}
                   </p>
                 </div>
               </div>
@@ -477,7 +599,7 @@ const Admin = () => {
                 </div>
               </CardHeader>
               <CardContent>
-                {filteredOrders.length === 0 ? (
+                {orders.length === 0 ? (
                   <div className="text-center py-12 text-stone-500">
                     <ShoppingCart className="w-12 h-12 mx-auto mb-4 text-stone-300" />
                     <p>No orders found</p>
@@ -497,7 +619,7 @@ const Admin = () => {
                         </TableRow>
                       </TableHeader>
                       <TableBody>
-                        {filteredOrders.map((order) => (
+                        {orders.map((order) => (
                           <TableRow key={order.id}>
                             <TableCell className="font-mono text-xs">
                               {order.id.slice(0, 8)}...
@@ -547,6 +669,18 @@ const Admin = () => {
                         ))}
                       </TableBody>
                     </Table>
+                    {ordersCursor && (
+                      <div className="flex justify-center pt-4">
+                        <Button
+                          variant="outline"
+                          onClick={handleLoadMoreOrders}
+                          disabled={loadingMoreOrders}
+                          data-testid="load-more-orders-btn"
+                        >
+                          {loadingMoreOrders ? 'Loading...' : 'Load More Orders'}
+                        </Button>
+                      </div>
+                    )}
                   </div>
                 )}
               </CardContent>
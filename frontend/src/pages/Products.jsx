@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useMemo } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useSearchParams } from 'react-router-dom';
 import axios from 'axios';
 import { Search, Filter, X } from 'lucide-react';
@@ -15,67 +15,95 @@ import {
 } from '../components/ui/select';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const SEARCH_DEBOUNCE_MS = 250;
+const SEARCH_PAGE_SIZE = 48;
+const SORT_PARAMS = { name: 'name', 'price-low': 'price', 'price-high': '-price' };
+
+const sortProducts = (products, sortBy) => [...products].sort((a, b) => {
+  switch (sortBy) {
+    case 'price-low':
+      return a.price - b.price;
+    case 'price-high':
+      return b.price - a.price;
+    case 'name':
+    default:
+      return a.name.localeCompare(b.name);
+  }
+});
+
+const searchParamsFor = (query, sortBy, category, offset) => {
+  const params = { q: query, sort: SORT_PARAMS[sortBy] || 'name', limit: SEARCH_PAGE_SIZE, offset };
+  if (category !== 'All') params.category = category;
+  return params;
+};
 
 const Products = () => {
   const [searchParams, setSearchParams] = useSearchParams();
   const [products, setProducts] = useState([]);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [hasMore, setHasMore] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
   const [sortBy, setSortBy] = useState('name');
 
   const selectedCategory = searchParams.get('category') || 'All';
 
   useEffect(() => {
-    const fetchData = async () => {
+    axios.get(`${API}/categories`)
+      .then(res => setCategories(res.data))
+      .catch(error => console.error('Error fetching categories:', error));
+  }, []);
+
+  // Browsing uses the cached catalog (/api/products, ETag/304); a search query
+  // goes to /api/products/search a page at a time, debounced while typing
+  useEffect(() => {
+    let cancelled = false;
+    const query = searchQuery.trim();
+
+    const timer = setTimeout(async () => {
       try {
-        const [productsRes, categoriesRes] = await Promise.all([
-          axios.get(`${API}/products`),
-          axios.get(`${API}/categories`)
-        ]);
-        setProducts(productsRes.data);
-        setCategories(categoriesRes.data);
+        if (query) {
+          const res = await axios.get(`${API}/products/search`, {
+            params: searchParamsFor(query, sortBy, selectedCategory, 0)
+          });
+          if (cancelled) return;
+          setProducts(res.data);
+          setHasMore(res.data.length === SEARCH_PAGE_SIZE);
+        } else {
+          const params = selectedCategory !== 'All' ? { category: selectedCategory } : {};
+          const res = await axios.get(`${API}/products`, { params });
+          if (cancelled) return;
+          setProducts(sortProducts(res.data, sortBy));
+          setHasMore(false);
+        }
       } catch (error) {
         console.error('Error fetching products:', error);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
-    };
-    fetchData();
-  }, []);
+    }, query ? SEARCH_DEBOUNCE_MS : 0);
 
-  const filteredProducts = useMemo(() => {
-    let result = [...products];
-
-    // Filter by category
-    if (selectedCategory !== 'All') {
-      result = result.filter(p => p.category === selectedCategory);
-    }
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [selectedCategory, searchQuery, sortBy]);
 
-    // Filter by search query
-    if (searchQuery) {
-      const query = searchQuery.toLowerCase();
-      result = result.filter(p =>
-        p.name.toLowerCase().includes(query) ||
-        p.description?.toLowerCase().includes(query)
-      );
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await axios.get(`${API}/products/search`, {
+        params: searchParamsFor(searchQuery.trim(), sortBy, selectedCategory, products.length)
+      });
+      setProducts(prev => [...prev, ...res.data]);
+      setHasMore(res.data.length === SEARCH_PAGE_SIZE);
+    } catch (error) {
+      console.error('Error fetching more products:', error);
+    } finally {
+      setLoadingMore(false);
     }
-
-    // Sort
-    result.sort((a, b) => {
-      switch (sortBy) {
-        case 'price-low':
-          return a.price - b.price;
-        case 'price-high':
-          return b.price - a.price;
-        case 'name':
-        default:
-          return a.name.localeCompare(b.name);
-      }
-    });
-
-    return result;
-  }, [products, selectedCategory, searchQuery, sortBy]);
+  };
 
   const handleCategoryChange = (category) => {
     if (category === 'All') {
@@ -104,7 +132,7 @@ const Products = () => {
             {selectedCategory === 'All' ? 'All Products' : selectedCategory}
           </h1>
           <p className="text-stone-600">
-            {filteredProducts.length} products available
+            {products.length}{hasMore ? '+' : ''} products available
           </p>
         </div>
 
@@ -206,7 +234,7 @@ const Products = () => {
               <div key={i} className="bg-white aspect-square rounded-sm animate-pulse" />
             ))}
           </div>
-        ) : filteredProducts.length === 0 ? (
+        ) : products.length === 0 ? (
           <div className="text-center py-16">
             <div className="w-24 h-24 mx-auto mb-6 bg-stone-100 rounded-full flex items-center justify-center">
               <Search className="w-12 h-12 text-stone-300" />
@@ -226,11 +254,25 @@ const Products = () => {
           </div>
         ) : (
           <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-            {filteredProducts.map((product) => (
+            {products.map((product) => (
               <ProductCard key={product.id} product={product} />
             ))}
           </div>
         )}
+
+        {!loading && hasMore && (
+          <div className="text-center mt-8">
+            <Button
+              onClick={loadMore}
+              disabled={loadingMore}
+              variant="outline"
+              className="border-stone-300"
+              data-testid="load-more-products"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </Button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -0,0 +1,476 @@
+"""
+Hermetic backend for the API tests.
+
+A session fixture starts a throwaway mongod and boots the backend through
+backend/server.py on a free port. WhatsApp (CallMeBot) and SMTP are pointed
+at local sinks that record what they receive, so the suite runs offline and
+never touches real services or the credentials in backend/.env.
+
+Requirements: backend/node_modules (npm install in backend/), node and mongod
+on PATH (or MONGOD=/path/to/mongod, or TEST_MONGO_URL for an existing
+server). Missing pieces skip the suite instead of failing it.
+
+Runs in parallel with pytest-xdist (pytest -n auto): each xdist worker gets
+its own backend and database.
+"""
+import contextlib
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from email import message_from_bytes, policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+STARTUP_TIMEOUT = 60.0
+DIGEST_WINDOW_MS = 3000
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for(predicate, timeout=10.0, interval=0.05):
+    """Poll predicate until it returns something truthy; returns that value or None"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(interval)
+    return None
+
+
+def wait_for_port(port, timeout):
+    def accepting():
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            return False
+    return wait_for(accepting, timeout=timeout, interval=0.1)
+
+
+class Recorder:
+    """Thread-safe list of captured requests/messages"""
+
+    def __init__(self):
+        self._items = []
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        with self._lock:
+            self._items.append(item)
+
+    def items(self):
+        with self._lock:
+            return list(self._items)
+
+    def wait_for(self, predicate, timeout=10.0):
+        """First captured item matching predicate, waiting for it to arrive"""
+        return wait_for(lambda: next((item for item in self.items() if predicate(item)), None), timeout)
+
+
+class HTTPSink:
+    """Stands in for the CallMeBot API: answers 200 and records each GET"""
+
+    def __init__(self):
+        self.requests = Recorder()
+        recorder = self.requests
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                recorder.add({"path": url.path, "query": {k: v[0] for k, v in parse_qs(url.query).items()}})
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.end_headers()
+                self.wfile.write(b"Message queued")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/whatsapp.php"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def parse_message(raw):
+    """Subject and decoded text of every text/* part (bodies are usually
+    quoted-printable, which can wrap an order id across lines)"""
+    message = message_from_bytes(raw, policy=policy.default)
+    text = [part.get_content() for part in message.walk() if part.get_content_maintype() == "text"]
+    return {"subject": str(message.get("Subject", "")), "text": "\n".join(text)}
+
+
+class SMTPSink:
+    """Minimal SMTP server that accepts every message and records it.
+    It advertises neither AUTH nor STARTTLS, so nodemailer sends in plain text
+    without logging in."""
+
+    def __init__(self):
+        self.messages = Recorder()
+        recorder = self.messages
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self):
+                self.reply("220 localhost ESMTP test sink")
+                envelope = {"from": None, "to": []}
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode("utf-8", "replace").strip()
+                    verb = command[:4].upper()
+                    if verb == "EHLO":
+                        self.reply("250-localhost")
+                        self.reply("250 8BITMIME")
+                    elif verb == "MAIL":
+                        envelope = {"from": command[10:].strip(), "to": []}
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        envelope["to"].append(command[8:].strip())
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        chunks = []
+                        for data_line in self.rfile:
+                            if data_line in (b".\r\n", b".\n"):
+                                break
+                            chunks.append(data_line)
+                        recorder.add({**envelope, **parse_message(b"".join(chunks))})
+                        self.reply("250 OK queued")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    elif verb in ("HELO", "RSET", "NOOP"):
+                        self.reply("250 OK")
+                    else:
+                        self.reply("502 Command not implemented")
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SocketClient:
+    """Minimal Socket.IO v4 client over HTTP long-polling, enough to join the
+    admin room the way the dashboard does. The backend only allows polling
+    with a single worker, which is what the suite runs.
+
+    A background thread keeps one poll open: received events are recorded as
+    {"event", "args"}, acks are matched to emit() calls, and server pings are
+    answered so the session stays up."""
+
+    SEPARATOR = "\x1e"
+
+    def __init__(self, base_url, auth=None):
+        self.url = f"{base_url}/socket.io/"
+        self.events = Recorder()
+        self.acks = {}
+        self.next_ack = 0
+        self.state = None  # "connected", or the connect_error message
+        self.closed = False
+
+        response = requests.get(self.url, params={"EIO": "4", "transport": "polling"}, timeout=10)
+        response.raise_for_status()
+        handshake = response.text.split(self.SEPARATOR)[0]
+        assert handshake.startswith("0"), handshake
+        self.sid = json.loads(handshake[1:])["sid"]
+
+        self.send("40" + (json.dumps(auth) if auth is not None else ""))
+        threading.Thread(target=self.poll, daemon=True).start()
+
+    def send(self, *packets):
+        response = requests.post(
+            self.url,
+            params={"EIO": "4", "transport": "polling", "sid": self.sid},
+            data=self.SEPARATOR.join(packets).encode(),
+            headers={"Content-Type": "text/plain;charset=UTF-8"},
+            timeout=10,
+        )
+        response.raise_for_status()
+
+    def poll(self):
+        while not self.closed:
+            try:
+                response = requests.get(self.url, params={"EIO": "4", "transport": "polling", "sid": self.sid}, timeout=60)
+            except requests.RequestException:
+                return
+            if response.status_code != 200:
+                return
+            for packet in response.text.split(self.SEPARATOR):
+                self.receive(packet)
+
+    def receive(self, packet):
+        if packet == "2":
+            self.send("3")
+        elif packet == "1":
+            self.closed = True
+        elif packet.startswith("40"):
+            self.state = "connected"
+        elif packet.startswith("44"):
+            self.state = json.loads(packet[2:]).get("message", "error")
+        elif packet.startswith("42"):
+            event, *args = json.loads(packet[2:])
+            self.events.add({"event": event, "args": args})
+        elif packet.startswith("43"):
+            start = packet.index("[")
+            self.acks[int(packet[2:start])] = json.loads(packet[start:])
+
+    def wait_connected(self, timeout=10.0):
+        """'connected', the connect_error message, or None on timeout"""
+        return wait_for(lambda: self.state, timeout)
+
+    def emit(self, event, *args, timeout=10.0):
+        """Send an event with an ack callback; returns the ack's arguments"""
+        ack_id = self.next_ack
+        self.next_ack += 1
+        self.send(f"42{ack_id}" + json.dumps([event, *args]))
+        assert wait_for(lambda: ack_id in self.acks, timeout), f"no ack for {event}"
+        return self.acks.pop(ack_id)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.send("41", "1")
+            except requests.RequestException:
+                pass
+
+
+# Inserts stdin's JSON documents with the backend's own mongoose, so tests can
+# seed data the API can't create (fixed timestamps, orders without rollups)
+INSERT_SCRIPT = """
+import mongoose from 'mongoose';
+const { url, db, collection, documents } = JSON.parse(await new Promise(resolve => {
+  let input = '';
+  process.stdin.on('data', chunk => { input += chunk; }).on('end', () => resolve(input));
+}));
+await mongoose.connect(url, { dbName: db });
+await mongoose.connection.collection(collection).insertMany(documents);
+await mongoose.disconnect();
+"""
+
+
+class Backend:
+    def __init__(self, base_url, whatsapp, smtp, mongo_url, db_name):
+        self.base_url = base_url
+        self.api_url = f"{base_url}/api"
+        self.whatsapp = whatsapp
+        self.smtp = smtp
+        self.mongo_url = mongo_url
+        self.db_name = db_name
+
+    def insert(self, collection, documents):
+        """Write documents straight into the backend's database"""
+        payload = {"url": self.mongo_url, "db": self.db_name, "collection": collection, "documents": documents}
+        subprocess.run(
+            ["node", "--input-type=module", "-e", INSERT_SCRIPT],
+            cwd=str(BACKEND_DIR),
+            input=json.dumps(payload).encode(),
+            check=True,
+            timeout=30,
+        )
+
+    def socket(self, auth=None):
+        """Socket.IO connection with the given handshake auth; close() it when done"""
+        return SocketClient(self.base_url, auth)
+
+
+@pytest.fixture(scope="session")
+def mongo_url(tmp_path_factory):
+    if os.environ.get("TEST_MONGO_URL"):
+        yield os.environ["TEST_MONGO_URL"].rstrip("/")
+        return
+
+    mongod = os.environ.get("MONGOD") or shutil.which("mongod")
+    if not mongod:
+        pytest.skip("mongod not found (install MongoDB, or set MONGOD or TEST_MONGO_URL)")
+
+    port = free_port()
+    dbpath = tmp_path_factory.mktemp("mongo")
+    process = subprocess.Popen(
+        [mongod, "--dbpath", str(dbpath), "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+        if not wait_for_port(port, timeout=30):
+            pytest.fail("mongod did not start within 30s")
+        yield f"mongodb://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@contextlib.contextmanager
+def run_backend(mongo_url, run_dir, **overrides):
+    """Boot backend/server.py with its own database and sinks; yields a
+    Backend. overrides replace variables of the test environment below."""
+    whatsapp = HTTPSink()
+    smtp = SMTPSink()
+    port = free_port()
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    db_name = f"api_test_{worker}_{uuid.uuid4().hex[:8]}"
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        BACKEND_WORKERS="1",
+        MONGO_URL=mongo_url,
+        DB_NAME=db_name,
+        CORS_ORIGINS="*",
+        ADMIN_PIN="4242",
+        WHATSAPP_API_URL=whatsapp.url,
+        WHATSAPP_API_KEY="test-key",
+        WHATSAPP_PHONE="+910000000000",
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=str(smtp.port),
+        SMTP_SECURE="false",
+        EMAIL_USER="shop@example.test",
+        EMAIL_PASS="unused",
+        ADMIN_EMAIL="admin@example.test",
+        EMAIL_DIGEST_THRESHOLD="0",
+        UPLOAD_MAX_BYTES=str(1024 * 1024),
+        OUTBOX_POLL_MS="200",
+        # Other tests keep placing orders; rollup rebuilds only need a 1ms lull
+        ROLLUP_REBUILD_QUIET_MS="1",
+        ORDER_JOURNAL_DIR=str(run_dir / "logs"),
+    )
+    env.update(overrides)
+    log_path = run_dir / "backend.log"
+    log_file = open(log_path, "wb")
+    process = subprocess.Popen(
+        [sys.executable, "server.py"],
+        cwd=str(BACKEND_DIR),
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    def ready():
+        if process.poll() is not None:
+            return True
+        try:
+            return requests.get(f"{base_url}/api/ready", timeout=1).status_code == 200
+        except requests.RequestException:
+            return False
+
+    try:
+        if not wait_for(ready, timeout=STARTUP_TIMEOUT, interval=0.2) or process.poll() is not None:
+            log_file.flush()
+            output = log_path.read_text(errors="replace")[-4000:]
+            pytest.fail(f"backend did not become ready:\n{output}")
+        yield Backend(base_url, whatsapp, smtp, mongo_url, db_name)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log_file.close()
+        whatsapp.close()
+        smtp.close()
+
+
+@pytest.fixture(scope="session")
+def backend(request, tmp_path_factory):
+    if not (BACKEND_DIR / "node_modules").is_dir():
+        pytest.skip("backend/node_modules missing (run npm install in backend/)")
+    if not shutil.which("node"):
+        pytest.skip("node not found on PATH")
+    # Only start mongod once the backend can actually run
+    mongo_url = request.getfixturevalue("mongo_url")
+    with run_backend(mongo_url, tmp_path_factory.mktemp("backend")) as started:
+        yield started
+
+
+@pytest.fixture(scope="session")
+def digest_backend(backend, tmp_path_factory):
+    """A second backend with email digests on: from the second order within
+    DIGEST_WINDOW_MS, order emails are held and sent as one digest when the
+    window closes. It has its own database and sinks."""
+    with run_backend(
+        backend.mongo_url,
+        tmp_path_factory.mktemp("digest_backend"),
+        EMAIL_DIGEST_THRESHOLD="2",
+        EMAIL_DIGEST_WINDOW_MS=str(DIGEST_WINDOW_MS),
+    ) as started:
+        yield started
+
+
+class Client:
+    """requests.Session bound to the backend's /api prefix"""
+
+    def __init__(self, api_url):
+        self.api_url = api_url
+        self.session = requests.Session()
+
+    def request(self, method, endpoint, **kwargs):
+        kwargs.setdefault("timeout", 30)
+        return self.session.request(method, f"{self.api_url}{endpoint}", **kwargs)
+
+    def get(self, endpoint, **kwargs):
+        return self.request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint, **kwargs):
+        return self.request("POST", endpoint, **kwargs)
+
+    def put(self, endpoint, **kwargs):
+        return self.request("PUT", endpoint, **kwargs)
+
+    def delete(self, endpoint, **kwargs):
+        return self.request("DELETE", endpoint, **kwargs)
+
+
+@pytest.fixture
+def api(backend):
+    client = Client(backend.api_url)
+    # Tests reach the backend from 127.0.0.1, a trusted proxy by default; each
+    # test is a customer of its own behind it, so per-IP limits don't add up
+    client.session.headers["X-Forwarded-For"] = f"198.18.{random.randint(0, 255)}.{random.randint(1, 254)}"
+    yield client
+    client.session.close()
+
+
+@pytest.fixture(scope="session")
+def seeded(backend):
+    """Default categories, products and pincodes from POST /api/init-data"""
+    response = requests.post(f"{backend.api_url}/init-data", timeout=30)
+    assert response.status_code == 200, response.text
+    return response.json()
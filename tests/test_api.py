@@ -0,0 +1,716 @@
+"""
+API checks from backend_test.py's APITester, run against the hermetic backend
+in conftest.py. Every test creates its own data (unique names and codes), so
+tests are independent of each other and safe to run with pytest -n auto.
+"""
+import csv
+import datetime
+import io
+import json
+import random
+import re
+import struct
+import time
+import uuid
+import zlib
+
+import requests
+
+from .conftest import DIGEST_WINDOW_MS, Client, wait_for
+
+ORDER_ITEMS = [
+    {"product_id": "chicken-breast-001", "name": "Chicken Breast", "price": 250, "quantity": 2, "unit": "500g"},
+    {"product_id": "mutton-curry-002", "name": "Mutton Curry Cut", "price": 450, "quantity": 1, "unit": "1kg"},
+]
+
+
+def unique(prefix):
+    return f"{prefix} {uuid.uuid4().hex[:8]}"
+
+
+def unused_pincode():
+    # Seeded pincodes are 5000xx; tests pick from a range nothing else uses
+    return str(random.randint(700000, 799999))
+
+
+def make_order(**overrides):
+    order = {
+        "customer_name": unique("Customer"),
+        "phone": "9876543210",
+        "address": "123 MG Road, Bangalore",
+        "pincode": "500001",
+        "items": ORDER_ITEMS,
+        "total": 950,
+    }
+    order.update(overrides)
+    return order
+
+
+def unused_day():
+    # Seeded orders live on past days nothing else creates orders on
+    day = datetime.date(1990, 1, 1) + datetime.timedelta(days=random.randint(0, 7000))
+    return day.isoformat()
+
+
+def seed_orders(backend, created_at_values, **overrides):
+    """Insert orders with fixed created_at values; returns their ids"""
+    orders = [
+        dict(make_order(**overrides), id=str(uuid.uuid4()), status="pending",
+             payment_mode="Cash on Delivery", created_at=created_at)
+        for created_at in created_at_values
+    ]
+    backend.insert("orders", orders)
+    return [order["id"] for order in orders]
+
+
+def make_png(width, height):
+    """An RGB gradient PNG; the same size always gives the same bytes"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(
+        b"\0" + bytes(channel for x in range(width) for channel in (x % 256, y % 256, (x + y) % 256))
+        for y in range(height)
+    )
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def test_root_api(api):
+    response = api.get("")
+    assert response.status_code == 200
+    assert response.json() == {"message": "Fresh Meat Hub API"}
+
+
+def test_health_endpoint(api):
+    response = api.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+
+
+def test_ready_endpoint(api):
+    response = api.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert all(body["checks"].values())
+
+
+def scrape_metrics(api):
+    """GET /metrics as {series: value}, e.g. {'pincode_index_size': 3.0}"""
+    response = api.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+
+def test_metrics_count_requests_by_route_pattern(api, seeded):
+    missing = str(uuid.uuid4())
+    status_series = 'http_requests_total{method="PUT",route="/api/orders/:orderId/status",status="404"}'
+    before = scrape_metrics(api)
+
+    api.get("/products")
+    api.get("/products")
+    assert api.put(f"/orders/{missing}/status", json={"status": "confirmed"}).status_code == 404
+
+    after = scrape_metrics(api)
+    assert after[status_series] - before.get(status_series, 0) == 1
+    # Series are keyed by route pattern, never by the raw URL
+    assert not any(missing in series for series in after)
+    assert after['http_requests_total{method="GET",route="/api/products",status="200"}'] >= 2
+
+    bucket = 'http_request_duration_seconds_bucket{method="GET",route="/api/products",le="+Inf"}'
+    assert after[bucket] == after['http_request_duration_seconds_count{method="GET",route="/api/products"}']
+    assert after['catalog_cache_lookups_total{result="hit"}'] > before.get('catalog_cache_lookups_total{result="hit"}', 0)
+    assert after["pincode_index_size"] >= 1
+    assert "socketio_connected_clients" in after
+    mongo_series = 'mongodb_command_duration_seconds_count{command="findAndModify",collection="orders"}'
+    assert after[mongo_series] - before.get(mongo_series, 0) >= 1
+
+
+def test_admin_auth_valid_pin(api):
+    response = api.post("/admin/verify", json={"pin": "4242"})
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+    # Signed with the per-boot secret server.py hands the workers
+    assert response.json()["token"]
+
+
+def test_admin_auth_invalid_pin(api):
+    response = api.post("/admin/verify", json={"pin": "1234"})
+    assert response.status_code == 401
+
+
+def test_admin_socket_rejects_a_bad_token(backend):
+    socket = backend.socket(auth={"token": f"{int(time.time() * 1000) + 60000}.forged"})
+    try:
+        assert socket.wait_connected() == "Unauthorized"
+    finally:
+        socket.close()
+
+
+def test_admin_socket_gets_orders_and_catches_up(api, backend):
+    token = api.post("/admin/verify", json={"pin": "4242"}).json()["token"]
+    socket = backend.socket(auth={"token": token})
+    try:
+        assert socket.wait_connected() == "connected"
+        since = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+        response = api.post("/orders", json=make_order())
+        assert response.status_code == 201
+        order_id = response.json()["id"]
+        placed = socket.events.wait_for(lambda event: event["event"] == "orderPlaced" and event["args"][0]["id"] == order_id)
+        assert placed is not None, "orderPlaced not delivered to the admin room"
+
+        assert api.put(f"/orders/{order_id}/status", json={"status": "confirmed"}).status_code == 200
+        updated = socket.events.wait_for(lambda event: event["event"] == "orderStatusUpdated" and event["args"][0]["order_id"] == order_id)
+        assert updated is not None and updated["args"][0]["status"] == "confirmed"
+
+        # What a reconnecting dashboard asks for
+        [catch_up] = socket.emit("orders:since", since)
+        assert catch_up["reset"] is False
+        caught = next(order for order in catch_up["orders"] if order["id"] == order_id)
+        assert caught["status"] == "confirmed"
+
+        assert socket.emit("orders:since", "not a date") == [{"error": "Invalid cursor"}]
+    finally:
+        socket.close()
+
+
+def test_admin_verify_is_rate_limited(api):
+    statuses = [api.post("/admin/verify", json={"pin": "0000"}).status_code for _ in range(6)]
+    assert statuses[:5] == [401] * 5
+    assert statuses[5] == 429
+
+    response = api.post("/admin/verify", json={"pin": "4242"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_order_rate_limit_is_per_client_behind_the_proxy(api):
+    # Default burst is 5 orders per client IP
+    first = {"X-Forwarded-For": f"203.0.113.{random.randint(1, 254)}"}
+    statuses = [api.post("/orders", json=make_order(), headers=first).status_code for _ in range(6)]
+    assert statuses == [201] * 5 + [429]
+
+    # Another customer arriving through the same proxy is unaffected
+    second = {"X-Forwarded-For": f"198.51.100.{random.randint(1, 254)}"}
+    assert api.post("/orders", json=make_order(), headers=second).status_code == 201
+
+
+def test_init_data_is_idempotent(api, seeded):
+    response = api.post("/init-data")
+    assert response.status_code == 200
+    assert response.json()["message"] == "Data already initialized"
+
+
+def test_categories_crud(api):
+    response = api.get("/categories")
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+
+    response = api.post("/categories", json={"name": unique("Category")})
+    assert response.status_code == 201
+    category_id = response.json()["id"]
+
+    response = api.delete(f"/categories/{category_id}")
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+
+def test_products_list(api, seeded):
+    response = api.get("/products")
+    assert response.status_code == 200
+    products = response.json()
+    assert isinstance(products, list) and products
+    assert all("_id" not in product for product in products)
+
+
+def test_products_field_selection(api, seeded):
+    response = api.get("/products", params={"fields": "name,id,bogus"})
+    assert response.status_code == 200
+    products = response.json()
+    assert products and all(set(product) == {"id", "name"} for product in products)
+
+
+def test_products_list_is_compressed(api, seeded):
+    response = api.get("/products", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert isinstance(response.json(), list)
+
+    etag = response.headers["ETag"]
+    response = api.get("/products", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_products_cache_keys_do_not_collide(api, seeded):
+    everything = api.get("/products").json()
+    assert everything
+
+    # A category literally named "*" is just an empty filter, not the full list
+    assert api.get("/products", params={"category": "*"}).json() == []
+    assert api.get("/products").json() == everything
+
+    # Operator objects aren't categories
+    assert api.get("/products?category[$ne]=x").status_code == 400
+    assert api.get("/products").json() == everything
+
+
+def test_products_by_category(api, seeded):
+    response = api.get("/products", params={"category": "Chicken"})
+    assert response.status_code == 200
+    products = response.json()
+    assert products and all(product["category"] == "Chicken" for product in products)
+
+
+def test_products_crud(api):
+    product = {"name": unique("Product"), "price": 100, "category": "Chicken",
+               "description": "Test product for API testing"}
+    response = api.post("/products", json=product)
+    assert response.status_code == 201
+    product_id = response.json()["id"]
+
+    response = api.put(f"/products/{product_id}", json={"price": 150, "description": "Updated test product"})
+    assert response.status_code == 200
+    assert response.json()["price"] == 150
+
+    response = api.delete(f"/products/{product_id}")
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+    assert api.get(f"/products/{product_id}").status_code == 404
+
+
+def test_upload_stores_immutable_variants(api, backend):
+    image = make_png(800, 60)
+    response = api.post("/upload", files={"file": ("photo.png", image, "image/png")})
+    assert response.status_code == 200
+    body = response.json()
+    assert re.fullmatch(r"[0-9a-f]{16}-640w\.jpg", body["filename"])
+    assert body["url"] == f"/uploads/{body['filename']}"
+
+    prefix = f"/uploads/{body['filename'][:16]}"
+    assert body["variants"] == {
+        "src": body["url"],
+        "thumb": f"{prefix}-thumb.jpg",
+        "thumb_webp": f"{prefix}-thumb.webp",
+        "srcset_webp": f"{prefix}-320w.webp 320w, {prefix}-640w.webp 640w, {prefix}-1024w.webp 1024w",
+        "srcset_jpeg": f"{prefix}-320w.jpg 320w, {prefix}-640w.jpg 640w, {prefix}-1024w.jpg 1024w",
+    }
+
+    for path, content_type in [(body["url"], "image/jpeg"), (f"{prefix}-320w.webp", "image/webp"),
+                               (f"{prefix}-thumb.jpg", "image/jpeg")]:
+        variant = requests.get(f"{backend.base_url}{path}", timeout=30)
+        assert variant.status_code == 200, path
+        assert variant.headers["Content-Type"] == content_type
+        assert variant.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+
+    # Same bytes, same content-addressed name
+    again = api.post("/upload", files={"file": ("copy.png", image, "image/png")})
+    assert again.json()["filename"] == body["filename"]
+
+
+def test_upload_rejects_oversized_and_non_images(api):
+    # conftest.py sets UPLOAD_MAX_BYTES to 1 MB
+    response = api.post("/upload", files={"file": ("huge.png", b"\0" * (1024 * 1024 + 1), "image/png")})
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Image must be at most 1 MB"
+
+    response = api.post("/upload", files={"file": ("notes.txt", b"hello", "text/plain")})
+    assert response.status_code == 400
+
+    response = api.post("/upload", files={"file": ("broken.png", b"not really a png", "image/png")})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Could not decode image"
+
+
+def test_product_search_and_autocomplete(api):
+    word = f"zq{uuid.uuid4().hex[:6]}"
+    cheap = api.post("/products", json={"name": f"{word} Wings", "price": 120, "category": "Chicken"}).json()
+    dear = api.post("/products", json={"name": f"Smoked {word}", "price": 480, "category": "Chicken",
+                                       "in_stock": False}).json()
+    try:
+        # Writes rebuild the index, so new products are searchable right away
+        response = api.get("/products/autocomplete", params={"q": word[:5]})
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()] == [cheap["id"], dear["id"]]
+
+        response = api.get("/products/search", params={"q": f"{word} wi"})
+        assert [item["id"] for item in response.json()] == [cheap["id"]]
+
+        response = api.get("/products/search", params={"q": word, "sort": "-price"})
+        assert [item["id"] for item in response.json()] == [dear["id"], cheap["id"]]
+
+        # Pages through results instead of truncating them
+        pages = [api.get("/products/search", params={"q": word, "sort": "price", "limit": 1, "offset": offset}).json()
+                 for offset in (0, 1, 2)]
+        assert [[item["id"] for item in page] for page in pages] == [[cheap["id"]], [dear["id"]], []]
+
+        response = api.get("/products/search", params={"q": word, "in_stock": "true", "max_price": 200})
+        assert [item["id"] for item in response.json()] == [cheap["id"]]
+
+        assert api.get("/products/search", params={"sort": "bogus"}).status_code == 400
+    finally:
+        api.delete(f"/products/{cheap['id']}")
+        api.delete(f"/products/{dear['id']}")
+
+
+def test_products_bulk_json_and_csv(api):
+    existing = api.post("/products", json={"name": unique("Product"), "price": 100, "category": "Chicken"}).json()
+    doomed = api.post("/products", json={"name": unique("Product"), "price": 100, "category": "Chicken"}).json()
+
+    response = api.post("/products/bulk", json=[
+        {"name": unique("Bulk"), "price": 199, "category": "Mutton"},
+        {"id": existing["id"], "price": 120, "in_stock": False},
+        {"id": doomed["id"], "op": "delete"},
+        {"id": "no-such-product", "price": 1},
+        {"name": "Missing price", "category": "Chicken"},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == ["created", "updated", "deleted", "not_found", "invalid"]
+    assert body["summary"]["invalid"] == 1
+    created_id = body["results"][0]["id"]
+
+    product = api.get(f"/products/{existing['id']}").json()
+    assert product["price"] == 120 and product["in_stock"] is False
+    assert api.get(f"/products/{doomed['id']}").status_code == 404
+    # One invalidation covers the cached catalog
+    assert any(item["id"] == created_id for item in api.get("/products").json())
+
+    csv = f'id,price,description\r\n{existing["id"]},135,"Fresh, cleaned ""daily"""\r\n'
+    response = api.post("/products/bulk", data=csv, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json()["summary"]["updated"] == 1
+    product = api.get(f"/products/{existing['id']}").json()
+    assert product["price"] == 135 and product["description"] == 'Fresh, cleaned "daily"'
+
+    assert api.post("/products/bulk", json=[]).status_code == 400
+    for product_id in (existing["id"], created_id):
+        api.delete(f"/products/{product_id}")
+
+
+def test_orders_list(api):
+    response = api.get("/orders")
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+
+
+def test_orders_cursor_pagination(api, backend):
+    day = unused_day()
+    tied = f"{day}T10:00:00.000Z"
+    early, late = f"{day}T08:00:00.000Z", f"{day}T15:00:00.000Z"
+    created = [early, tied, tied, tied, late]
+    seeded_orders = dict(zip(seed_orders(backend, created), created))
+    newest_first = sorted(seeded_orders, key=lambda order_id: (seeded_orders[order_id], order_id), reverse=True)
+
+    # Walking the cursor visits every order once, newest first, with ties
+    # on created_at broken by id
+    pages, cursor = [], None
+    while True:
+        params = {"from": day, "to": day, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = api.get("/orders", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["orders"]) <= 2
+        pages.append([order["id"] for order in body["orders"]])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+        # Opaque to clients: no raw timestamps or ids in the token
+        assert tied not in cursor and not any(order_id in cursor for order_id in seeded_orders)
+    assert [order_id for page in pages for order_id in page] == newest_first
+    assert len(pages) == 3
+
+    # from is inclusive; a timestamp `to` is exclusive, a date `to` covers the whole day
+    def ids(**params):
+        return {order["id"] for order in api.get("/orders", params=params).json()}
+
+    assert ids(**{"from": tied, "to": day}) == {i for i, at in seeded_orders.items() if at >= tied}
+    assert ids(**{"from": day, "to": tied}) == {i for i, at in seeded_orders.items() if at < tied}
+    assert ids(date=day) == set(seeded_orders)
+    previous_day = (datetime.date.fromisoformat(day) - datetime.timedelta(days=1)).isoformat()
+    assert ids(to=previous_day).isdisjoint(seeded_orders)
+
+
+def test_orders_invalid_cursor_and_range(api):
+    for cursor in ("not-a-cursor", "WzEsMl0"):  # garbage, and base64 of [1,2]
+        response = api.get("/orders", params={"cursor": cursor})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+    response = api.get("/orders", params={"from": "yesterday", "limit": 5})
+    assert response.status_code == 400
+
+
+def test_orders_export_ndjson_and_csv(api, backend):
+    day = unused_day()
+    plain = seed_orders(backend, [f"{day}T09:00:00.000Z"], phone="+91 98765 43210")[0]
+    formula = seed_orders(
+        backend, [f"{day}T11:00:00.000Z"],
+        customer_name='=HYPERLINK("http://evil.test","x")', address="-2+3", items=ORDER_ITEMS[:1], total=500,
+    )[0]
+
+    response = api.get("/orders/export", params={"from": day, "to": day})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("application/x-ndjson")
+    assert f'filename="orders_{day}_to_{day}.ndjson"' in response.headers["Content-Disposition"]
+    orders = [json.loads(line) for line in response.text.splitlines()]
+    assert [order["id"] for order in orders] == [plain, formula]
+    assert "_id" not in orders[0] and orders[0]["items"] == ORDER_ITEMS
+
+    response = api.get("/orders/export", params={"from": day, "to": day, "format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    # One row per line item, oldest order first
+    assert [row["order_id"] for row in rows] == [plain, plain, formula]
+    assert [row["line_total"] for row in rows] == ["500", "450", "500"]
+    # Spreadsheet formulas are neutralised; phone numbers are left alone
+    assert rows[2]["customer_name"] == '\'=HYPERLINK("http://evil.test","x")'
+    assert rows[2]["address"] == "'-2+3"
+    assert rows[0]["phone"] == "+91 98765 43210"
+
+    # An empty range still gets the CSV header
+    response = api.get("/orders/export", params={"date": unused_day(), "format": "csv"})
+    assert response.status_code == 200
+    assert response.text.startswith("order_id,created_at,status,")
+
+    assert api.get("/orders/export", params={"from": "not-a-date"}).status_code == 400
+
+
+def test_order_with_location(api):
+    response = api.post("/orders", json=make_order(latitude=17.385044, longitude=78.486671))
+    assert response.status_code == 201
+    order = response.json()
+    assert order["latitude"] == 17.385044
+    assert order["longitude"] == 78.486671
+
+
+def test_order_without_location_and_status_update(api):
+    response = api.post("/orders", json=make_order(pincode="500002"))
+    assert response.status_code == 201
+    order = response.json()
+    assert order["latitude"] is None and order["longitude"] is None
+
+    response = api.put(f"/orders/{order['id']}/status", json={"status": "confirmed"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "confirmed"
+
+    response = api.put(f"/orders/{order['id']}/status", json={"status": "shipped"})
+    assert response.status_code == 400
+
+
+def test_delivery_batches_group_nearby_orders(api):
+    # Two orders a few hundred metres apart, far from anything else the suite creates
+    near = [api.post("/orders", json=make_order(latitude=26.9124 + offset, longitude=75.7873)).json()["id"]
+            for offset in (0, 0.003)]
+    code = unused_pincode()
+    unlocated = api.post("/orders", json=make_order(pincode=code)).json()["id"]
+
+    response = api.get("/orders/delivery-batches", params={"lat": 26.9, "lng": 75.78, "radius_km": 1})
+    assert response.status_code == 200
+    batches = response.json()["batches"]
+    batch_of = {stop["id"]: batch for batch in batches for stop in batch["stops"]}
+    assert batch_of[near[0]]["batch"] == batch_of[near[1]]["batch"]
+    assert batch_of[near[0]]["kind"] == "proximity"
+    assert batch_of[unlocated]["kind"] == "pincode" and batch_of[unlocated]["pincodes"] == [code]
+    assert [stop["sequence"] for stop in batch_of[near[0]]["stops"]] == list(range(1, batch_of[near[0]]["stop_count"] + 1))
+
+    assert api.get("/orders/delivery-batches", params={"radius_km": 0}).status_code == 400
+
+
+def test_dashboard_rollups_follow_status_changes(api, backend):
+    day = unused_day()
+    first, second = seed_orders(backend, [f"{day}T09:30:00.000Z", f"{day}T18:00:00.000Z"], total=950)
+
+    def summary(for_day=day, **params):
+        response = api.get("/dashboard/summary", params={"from": for_day, "to": for_day, **params})
+        assert response.status_code == 200
+        return response.json()
+
+    def statuses(for_day=day):
+        buckets = summary(for_day)["totals"]["statuses"]
+        assert all(bucket["orders"] >= 0 for bucket in buckets.values())
+        return {name: bucket["orders"] for name, bucket in buckets.items() if bucket["orders"]}
+
+    # Inserted directly, so only a rebuild counts them
+    assert summary()["totals"]["orders"] == 0
+    response = api.post("/dashboard/rollups/rebuild")
+    assert response.status_code == 200
+    assert response.json()["orders"] >= 2
+    body = summary()
+    assert body["totals"]["orders"] == 2
+    assert body["totals"]["revenue"] == 1900
+    assert body["hours"]["09"]["orders"] == 1 and body["hours"]["18"]["orders"] == 1
+    assert statuses() == {"pending": 2}
+
+    # Status changes move orders between buckets
+    assert api.put(f"/orders/{first}/status", json={"status": "confirmed"}).status_code == 200
+    assert wait_for(lambda: statuses() == {"confirmed": 1, "pending": 1})
+    assert api.put(f"/orders/{second}/status", json={"status": "completed"}).status_code == 200
+    assert wait_for(lambda: statuses() == {"confirmed": 1, "completed": 1})
+    assert summary()["totals"]["orders"] == 2
+
+    # An order the rollups never counted doesn't drive a bucket negative
+    other_day = unused_day()
+    uncounted = seed_orders(backend, [f"{other_day}T12:00:00.000Z"])[0]
+    assert api.put(f"/orders/{uncounted}/status", json={"status": "confirmed"}).status_code == 200
+    time.sleep(0.5)
+    assert statuses(other_day) == {}
+
+    # Top lists hold at least one entry whatever the limit
+    assert len(summary(limit=-3)["top_products"]) == 1
+    assert len(summary(limit=1000)["top_products"]) == 2
+
+    response = api.get("/dashboard/summary", params={"from": "last week"})
+    assert response.status_code == 400
+
+
+def test_dashboard_rollups_rebuild_is_rate_limited(api):
+    statuses = [api.post("/dashboard/rollups/rebuild").status_code for _ in range(3)]
+    assert 429 in statuses
+
+
+def test_order_requires_fields(api):
+    response = api.post("/orders", json={"customer_name": "Incomplete"})
+    assert response.status_code == 400
+
+
+def test_pincodes_crud(api):
+    response = api.get("/pincodes")
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+
+    code = unused_pincode()
+    response = api.post("/pincodes", json={"code": code})
+    assert response.status_code == 201
+    pincode_id = response.json()["id"]
+    assert api.get(f"/pincodes/verify/{code}").json()["valid"] is True
+
+    response = api.delete(f"/pincodes/{pincode_id}")
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+    assert api.get(f"/pincodes/verify/{code}").json()["valid"] is False
+
+
+def test_pincode_verify_valid(api, seeded):
+    response = api.get("/pincodes/verify/500001")
+    assert response.status_code == 200
+    assert response.json()["valid"] is True
+
+
+def test_pincode_verify_invalid(api):
+    response = api.get("/pincodes/verify/999999")
+    assert response.status_code == 200
+    assert response.json()["valid"] is False
+
+
+def test_pincodes_import_overlapping_csv(api):
+    first, shared, second = random.sample(range(700000, 800000), 3)
+    response = api.post(
+        "/pincodes/import",
+        data=f"code\n{first}\n{shared}\n",
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 201
+    # "code" is a header, not a pincode
+    assert response.json()["inserted"] == 2
+    assert response.json()["duplicates"] == 0
+    assert response.json()["invalid"] == 1
+
+    # Re-importing an overlapping file adds only the new code
+    response = api.post(
+        "/pincodes/import",
+        data=f"{shared},{second}\n{first}\n",
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 201
+    assert response.json()["inserted"] == 1
+    assert response.json()["duplicates"] == 2
+    assert api.get(f"/pincodes/verify/{second}").json()["valid"] is True
+
+    codes = [pincode["code"] for pincode in api.get("/pincodes", params={"fields": "code"}).json()]
+    for code in (first, shared, second):
+        assert codes.count(str(code)) == 1
+
+
+def test_pincodes_batch_verify(api, seeded):
+    code = unused_pincode()
+    response = api.post("/pincodes/verify", json={"codes": ["500001", code, " 500001 "]})
+    assert response.status_code == 200
+    assert response.json()["results"] == {"500001": True, code: False}
+
+    response = api.post("/pincodes/verify", json={"codes": "500001"})
+    assert response.status_code == 400
+
+
+def test_email_health_endpoint(api):
+    response = api.get("/orders/email/health")
+    assert response.status_code == 200
+    assert response.json()["ok"] is True
+
+
+def test_email_test_endpoint(api, backend):
+    response = api.post("/orders/email/test")
+    assert response.status_code == 200
+    assert response.json()["ok"] is True
+    assert backend.smtp.messages.wait_for(lambda message: "admin@example.test" in " ".join(message["to"]))
+
+
+def test_order_creation_does_not_wait_on_notifications(api):
+    start = time.monotonic()
+    response = api.post("/orders", json=make_order(latitude=12.9716, longitude=77.5946))
+    elapsed = time.monotonic() - start
+    assert response.status_code == 201
+    # Notifications go through the outbox, so checkout never waits on SMTP/WhatsApp
+    assert elapsed < 5, f"order creation took {elapsed:.2f}s"
+
+
+def test_order_notifications_are_delivered(api, backend):
+    response = api.post("/orders", json=make_order())
+    assert response.status_code == 201
+    order_id = response.json()["id"]
+    assert "notifications_pending" not in response.json()
+
+    whatsapp = backend.whatsapp.requests.wait_for(lambda request: order_id in request["query"].get("text", ""))
+    assert whatsapp is not None, "no WhatsApp request for the order"
+    assert whatsapp["query"]["apikey"] == "test-key"
+
+    email = backend.smtp.messages.wait_for(lambda message: order_id in message["text"])
+    assert email is not None, "no email for the order"
+
+
+def test_order_emails_in_a_burst_share_one_digest(digest_backend):
+    client = Client(digest_backend.api_url)
+    client.session.headers["X-Forwarded-For"] = f"198.18.{random.randint(0, 255)}.{random.randint(1, 254)}"
+    # Digest windows are aligned to the clock; start early in one so the burst can't straddle two
+    into_window = time.time() * 1000 % DIGEST_WINDOW_MS
+    if into_window > DIGEST_WINDOW_MS / 3:
+        time.sleep((DIGEST_WINDOW_MS - into_window) / 1000 + 0.05)
+
+    order_ids = []
+    for _ in range(3):
+        response = client.post("/orders", json=make_order())
+        assert response.status_code == 201
+        order_ids.append(response.json()["id"])
+    client.session.close()
+
+    messages = digest_backend.smtp.messages
+    # The first order is below the threshold and goes out on its own
+    single = messages.wait_for(lambda message: order_ids[0] in message["text"])
+    assert single is not None and order_ids[1] not in single["text"]
+
+    digest = messages.wait_for(lambda message: order_ids[1] in message["text"], timeout=DIGEST_WINDOW_MS / 1000 + 10)
+    assert digest is not None, "no digest email"
+    assert digest["subject"] == "🛒 2 New Orders - ₹1900"
+    assert order_ids[2] in digest["text"]
+    assert [message for message in messages.items() if order_ids[2] in message["text"]] == [digest]
@@ -0,0 +1,115 @@
+"""
+backend/order_journal.py: legacy orders.txt parsing, journal file ordering
+and status replay. Pure Python, no backend or MongoDB needed.
+"""
+import importlib.util
+import json
+import os
+from datetime import datetime, timezone
+
+from .conftest import BACKEND_DIR
+
+spec = importlib.util.spec_from_file_location("order_journal", BACKEND_DIR / "order_journal.py")
+order_journal = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(order_journal)
+
+
+def write_journal(path, events, mtime=None):
+    path.write_text("".join(json.dumps(event) + "\n" for event in events), encoding="utf-8")
+    if mtime:
+        stamp = datetime.fromisoformat(mtime).replace(tzinfo=timezone.utc).timestamp()
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+def created(order_id, at):
+    return {"v": 1, "type": "order.created", "at": at, "order": {"id": order_id, "total": 100, "created_at": at}}
+
+
+def status(order_id, value, at):
+    return {"v": 1, "type": "order.status", "at": at, "order_id": order_id, "status": value}
+
+
+def test_legacy_orders_txt_parses():
+    events = list(order_journal.read_legacy(BACKEND_DIR / "logs" / "orders.txt"))
+    assert len(events) == 8
+    assert all(event["type"] == "order.created" and event["source"] == "legacy" for event in events)
+    assert len({event["order"]["id"] for event in events}) == 8
+
+    first = events[0]["order"]
+    assert first == {
+        "id": "bed746ed-d104-48c5-a53a-cdd51f73b383",
+        "created_at": "2025-12-15T09:04:24.270875+00:00",
+        "customer_name": "hjgj",
+        "phone": "7986955634",
+        # Commas in the address survive; only the trailing Pincode is split off
+        "address": "06, Tenepally, kummari gudem Gurrampode Nalgonda Telangana India, 508256",
+        "pincode": "500001",
+        "items": [{"name": "Mutton Keema", "quantity": 1}, {"name": "Mutton Keema", "quantity": 1}],
+        "total": 1400.0,
+        "payment_mode": "Cash on Delivery",
+        "status": "pending",
+    }
+    multi_item = next(event["order"] for event in events if event["order"]["id"].startswith("0df28805"))
+    assert multi_item["items"] == [{"name": "Chicken Breast", "quantity": 2}, {"name": "Mutton Curry Cut", "quantity": 1}]
+    assert multi_item["total"] == 950.0
+    assert all(len(event["order"]["pincode"]) == 6 for event in events)
+
+
+def test_journal_files_oldest_first(tmp_path):
+    names = [
+        "orders-w0-100-20250101T090000000Z.jsonl",
+        "orders-w0-100-20250101T090000000Z-1.jsonl",
+        "orders-w1-200-20250101T100000000Z.jsonl",
+        "orders-w1-200.jsonl",     # live, last written 2025-01-01 11:00
+        "orders-w0-300.jsonl",     # live, last written 2025-01-02
+        "orders-20241231T235959999Z.jsonl",
+    ]
+    mtimes = {"orders-w1-200.jsonl": "2025-01-01T11:00:00", "orders-w0-300.jsonl": "2025-01-02T00:00:00"}
+    for name in names:
+        write_journal(tmp_path / name, [], mtimes.get(name))
+    (tmp_path / "orders.txt").write_text("", encoding="utf-8")
+
+    assert [path.name for path in order_journal.journal_files(tmp_path)] == [
+        "orders-20241231T235959999Z.jsonl",
+        "orders-w0-100-20250101T090000000Z.jsonl",
+        "orders-w0-100-20250101T090000000Z-1.jsonl",
+        "orders-w1-200-20250101T100000000Z.jsonl",
+        "orders-w1-200.jsonl",
+        "orders-w0-300.jsonl",
+    ]
+
+
+def test_replay_keeps_latest_status_across_worker_files(tmp_path, capsys):
+    # Worker 0's file sorts first but holds the newest status change
+    write_journal(tmp_path / "orders-w0-100-20250101T090000000Z.jsonl", [
+        created("a", "2025-01-01T08:00:00.000Z"),
+        status("a", "completed", "2025-01-01T08:30:00.000Z"),
+        status("b", "confirmed", "2025-01-01T08:10:00.000Z"),
+    ])
+    path = write_journal(tmp_path / "orders-w1-200.jsonl", [
+        created("b", "2025-01-01T08:05:00.000Z"),
+        status("a", "packed", "2025-01-01T08:20:00.000Z"),
+        status("b", "cancelled", "2025-01-01T08:15:00.000Z"),
+    ], mtime="2025-01-01T12:00:00")
+    # A crash mid-write leaves a truncated last line
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"v":1,"type":"order.sta')
+
+    orders, statuses = order_journal.replay(tmp_path, legacy=False)
+    assert [order["id"] for order in orders] == ["a", "b"]
+    assert {order_id: value for order_id, (_, value) in statuses.items()} == {"a": "completed", "b": "cancelled"}
+    assert "unparseable line skipped" in capsys.readouterr().err
+
+
+def test_dump_streams_legacy_then_journal(tmp_path, capsys):
+    (tmp_path / "orders.txt").write_bytes((BACKEND_DIR / "logs" / "orders.txt").read_bytes())
+    write_journal(tmp_path / "orders.jsonl", [created("new", "2026-01-01T00:00:00.000Z")])
+
+    assert order_journal.main(["dump", "--logs-dir", str(tmp_path)]) == 0
+    assert [json.loads(line)["order"]["id"] for line in capsys.readouterr().out.splitlines()] == ["new"]
+
+    assert order_journal.main(["dump", "--legacy", "--logs-dir", str(tmp_path)]) == 0
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(events) == 9
+    assert [event["v"] for event in events] == [0] * 8 + [1]